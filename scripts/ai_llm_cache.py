@@ -0,0 +1,108 @@
+"""On-disk cache of LLM responses."""  # noqa: INP001
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger()  # get base logger
+
+MAX_SIZE = 100 * 1024 * 1024  # bytes of cached responses
+
+
+class ResponseCache:
+    """
+    Cache of LLM responses in a sqlite file.
+
+    keyed by hash of provider, model, instruction and prompt,
+    so identical calls are answered from disk without any request
+    the least recently used responses are removed, if max_size is exceeded
+    """
+
+    def __init__(self, p: Path, max_size: int = MAX_SIZE) -> None:  # noqa: D107
+        p.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        # one connection for all threads, guarded by the lock
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(p, check_same_thread=False)
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT, tokens INTEGER, "
+            "size INTEGER, last_used REAL)"
+        )
+        self._con.commit()
+
+    @staticmethod
+    def key(provider: str, model: str, instruction: str, prompt: str) -> str:
+        """Return hash of the call."""
+        return hashlib.sha256(
+            json.dumps([provider, model, instruction, prompt]).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> tuple[str, int] | None:
+        """Return cached response and its tokens, None if not cached."""
+        with self._lock:
+            row = self._con.execute(
+                "SELECT response, tokens FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._con.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._con.commit()
+            self.hits += 1
+            self.tokens_saved += row[1]
+            return row[0], row[1]
+
+    def put(self, key: str, response: str, tokens: int) -> None:
+        """Store response and remove the least recently used, if too large."""
+        size = len(response.encode())
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, tokens, size, time.time()),
+            )
+            self._evict()
+            self._con.commit()
+
+    def _evict(self) -> None:
+        total = self._con.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = self._con.execute(
+            "SELECT key, size FROM responses ORDER BY last_used DESC"
+        ).fetchall()
+        # keep the most recently used, up to max_size
+        keep = 0
+        for i, (_, size) in enumerate(rows):
+            if keep + size > self.max_size:
+                self._con.executemany(
+                    "DELETE FROM responses WHERE key = ?", [(k,) for k, _ in rows[i:]]
+                )
+                logger.info("cache: %d responses evicted", len(rows) - i)
+                return
+            keep += size
+
+    def __len__(self) -> int:  # noqa: D105
+        with self._lock:
+            return self._con.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> str:
+        """Return hits, misses and tokens saved."""
+        return (
+            f"cache: {self.hits} hits, {self.misses} misses, "
+            f"{self.tokens_saved} tokens saved"
+        )
+
+    def close(self) -> None:
+        """Close the sqlite file."""
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,43 @@
+# ruff: noqa: D103, INP001
+"""Tests for ai_llm_cache.py."""
+
+from pathlib import Path
+
+from ai_llm_cache import ResponseCache
+from ai_llm_provider import MockProvider
+
+
+def test_cache(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    key = ResponseCache.key("Mock", "random", "instruction", "prompt")
+    assert key != ResponseCache.key("Mock", "random", "instruction2", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, "response", 42)
+    assert cache.get(key) == ("response", 42)
+    assert cache.stats() == "cache: 1 hits, 1 misses, 42 tokens saved"
+    cache.close()
+    # persistent
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    assert cache.get(key) == ("response", 42)
+
+
+def test_cache_eviction(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_size=10)
+    for key in ("a", "b", "c"):
+        cache.put(key, "1234", 1)
+    assert len(cache) == 2  # noqa: PLR2004
+    assert cache.get("a") is None
+    # recently used are kept
+    assert cache.get("b") is not None
+    cache.put("d", "1234", 1)
+    assert cache.get("c") is None
+    assert cache.get("b") is not None
+
+
+def test_provider_with_cache(tmp_path: Path) -> None:
+    llm_provider = MockProvider()
+    llm_provider.cache = ResponseCache(tmp_path / "cache.sqlite")
+    assert llm_provider.call("random", "i", "x") == ("Mocked x response", 51)
+    # from cache, no tokens consumed
+    assert llm_provider.call("random", "i", "x") == ("Mocked x response", 0)
+    assert llm_provider.cache.tokens_saved == 51  # noqa: PLR2004
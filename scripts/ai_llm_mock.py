@@ -0,0 +1,197 @@
+"""Simulated LLM provider, for tests and benchmarks without any requests."""  # noqa: INP001
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from types import SimpleNamespace
+
+from ai_llm_provider import LLMProvider, Usage, estimate_tokens
+from ai_llm_rate_limit import RateLimiter
+
+
+class FakeClock:
+    """Clock advanced by sleep, for tests without waiting."""
+
+    def __init__(self) -> None:  # noqa: D107
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        """Return the time, in seconds."""
+        return self.t
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the time."""
+        self.t += seconds
+
+
+class SimulatedError(Exception):
+    """Error like raised by the SDKs, with status code and retry-after header."""
+
+    def __init__(self, status_code: int, retry_after: float | None = None) -> None:  # noqa: D107
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": f"{retry_after:.1f}"} if retry_after else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class SimulatedProvider(LLMProvider):
+    """
+    LLM provider simulated in-process, with latency, errors and rate limits.
+
+    the response is the prompt, so a review changes nothing
+    latency: log-normal distributed time to first token, plus the output tokens
+    at tokens_per_second
+    errors: random 500 and 429 errors at error_rate and rate_limit_rate, and
+    429 errors, if the requests or tokens per minute of the account are exceeded
+    clock and sleep are used for the rate limiter of the client too, so the
+    time can be sped up or faked for tests
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        latency_median: float = 1.0,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = 200.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        server_requests_per_minute: int | None = None,
+        server_tokens_per_minute: int | None = None,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        seed: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Init the simulation.
+
+        server_*: limits of the simulated account, exceeding them causes 429 errors
+        requests_per_minute, tokens_per_minute: limits of the client, like for the
+        real providers
+        """
+        super().__init__(provider="Simulated", models=[])
+        # own rate limiter, not shared by provider name like for the real providers
+        self.rate_limiter = RateLimiter(
+            requests_per_minute, tokens_per_minute, clock, sleep
+        )
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.server_requests_per_minute = server_requests_per_minute
+        self.server_tokens_per_minute = server_tokens_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random.Random(seed)  # noqa: S311
+        self._lock = threading.Lock()
+        self._window: deque[tuple[float, int]] = deque()  # requests of last minute
+        # accounting
+        self.count_requests = 0  # incl. failed
+        self.count_errors = 0
+        self.count_rate_limited = 0
+        self.tokens_used = 0
+        self.request_seconds = 0.0  # of successful requests, incl. streaming
+        self.count_calls_failed = 0
+        self.call_latencies: list[float] = []  # incl. waits and retries
+        self.first_part_latencies: list[float] = []  # of streamed calls
+
+    def check_model_valid(self, model: str) -> None:
+        """Accept any model, to simulate the chunks of the configured model."""
+
+    def _admit(self, tokens: int) -> float:
+        """Raise the simulated errors, return the latency of an accepted request."""
+        with self._lock:
+            now = self.clock()
+            self.count_requests += 1
+            while self._window and self._window[0][0] <= now - 60:
+                self._window.popleft()
+            if (
+                self.server_requests_per_minute
+                and len(self._window) >= self.server_requests_per_minute
+            ) or (
+                self.server_tokens_per_minute
+                and sum(t for _, t in self._window) + tokens
+                > self.server_tokens_per_minute
+            ):
+                self.count_rate_limited += 1
+                raise SimulatedError(
+                    429,
+                    retry_after=self._window[0][0] + 60 - now if self._window else None,
+                )
+            if self.random.random() < self.rate_limit_rate:
+                self.count_rate_limited += 1
+                raise SimulatedError(429)
+            if self.random.random() < self.error_rate:
+                self.count_errors += 1
+                raise SimulatedError(500)
+            self._window.append((now, tokens))
+            self.tokens_used += tokens
+            return self.random.lognormvariate(
+                math.log(self.latency_median), self.latency_sigma
+            )
+
+    def _record(self, latency: list[float], time_start: float) -> None:
+        with self._lock:
+            latency.append(self.clock() - time_start)
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:  # noqa: ARG002
+        """Simulate a request."""
+        tokens = estimate_tokens(instruction, prompt)
+        time_start = self.clock()
+        latency = self._admit(tokens)
+        self.sleep(latency + len(prompt.encode()) / 4 / self.tokens_per_second)
+        with self._lock:
+            self.request_seconds += self.clock() - time_start
+        return prompt, tokens
+
+    def request_stream(
+        self,
+        model: str,  # noqa: ARG002
+        instruction: str,
+        prompt: str,
+    ) -> Iterator[str | Usage]:
+        """Simulate a streamed request, line by line."""
+        tokens = estimate_tokens(instruction, prompt)
+        time_start = self.clock()
+        self.sleep(self._admit(tokens))
+        for line in prompt.splitlines(keepends=True):
+            self.sleep(len(line.encode()) / 4 / self.tokens_per_second)
+            yield line
+        with self._lock:
+            self.request_seconds += self.clock() - time_start
+        yield Usage(tokens)
+
+    def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
+        """Call like the real providers, recording the latency."""
+        time_start = self.clock()
+        try:
+            result = super().call(model, instruction, prompt)
+        except Exception:
+            with self._lock:
+                self.count_calls_failed += 1
+            raise
+        self._record(self.call_latencies, time_start)
+        return result
+
+    def call_stream(
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        """Call streaming like the real providers, recording the latencies."""
+        time_start = self.clock()
+        is_first = True
+        try:
+            for part in super().call_stream(model, instruction, prompt):
+                if is_first:
+                    self._record(self.first_part_latencies, time_start)
+                    is_first = False
+                yield part
+        except Exception:
+            with self._lock:
+                self.count_calls_failed += 1
+            raise
+        self._record(self.call_latencies, time_start)
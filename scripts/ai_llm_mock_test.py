@@ -0,0 +1,73 @@
+# ruff: noqa: D103, INP001, PLR2004
+"""Tests for ai_llm_mock.py."""
+
+import pytest
+from ai_llm_mock import FakeClock, SimulatedError, SimulatedProvider
+from ai_llm_provider import Usage
+from ai_llm_rate_limit import is_rate_limit_error, retry_after
+
+
+def test_latency() -> None:
+    clock = FakeClock()
+    llm_provider = SimulatedProvider(
+        latency_median=2.0,
+        latency_sigma=0.0,
+        tokens_per_second=1.0,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    assert llm_provider.call("any", "", "12345678") == ("12345678", 4)
+    # 2s to first token + 2 tokens of output
+    assert clock.t == pytest.approx(4.0)
+    assert llm_provider.call_latencies == [pytest.approx(4.0)]
+    assert llm_provider.tokens_used == 4
+
+
+def test_stream() -> None:
+    clock = FakeClock()
+    llm_provider = SimulatedProvider(
+        latency_median=2.0, latency_sigma=0.0, clock=clock, sleep=clock.sleep
+    )
+    parts = list(llm_provider.call_stream("any", "", "a\nb\n"))
+    assert parts == ["a\n", "b\n", Usage(2)]
+    assert llm_provider.first_part_latencies[0] > 2.0
+    assert len(llm_provider.call_latencies) == 1
+
+
+def test_errors() -> None:
+    clock = FakeClock()
+    llm_provider = SimulatedProvider(
+        error_rate=1.0, seed=1, clock=clock, sleep=clock.sleep
+    )
+    with pytest.raises(SimulatedError) as e:
+        llm_provider.call("any", "", "x")
+    assert not is_rate_limit_error(e.value)
+    assert llm_provider.count_calls_failed == 1
+    # 429 errors are retried, till RETRIES_MAX
+    llm_provider = SimulatedProvider(
+        rate_limit_rate=1.0, seed=1, clock=clock, sleep=clock.sleep
+    )
+    with pytest.raises(SimulatedError) as e:
+        llm_provider.call("any", "", "x")
+    assert is_rate_limit_error(e.value)
+    assert llm_provider.count_rate_limited == llm_provider.count_requests == 6
+
+
+def test_server_rate_limit() -> None:
+    clock = FakeClock()
+    llm_provider = SimulatedProvider(
+        server_requests_per_minute=2,
+        latency_median=1.0,
+        latency_sigma=0.0,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    llm_provider.call("any", "", "x")
+    llm_provider.call("any", "", "x")
+    with pytest.raises(SimulatedError) as e:
+        llm_provider.request("any", "", "x")
+    assert retry_after(e.value) == pytest.approx(58.0, abs=0.1)
+    # retried after the retry-after of the error
+    llm_provider.call("any", "", "x")
+    assert clock.t > 60
+    assert llm_provider.count_rate_limited == 2
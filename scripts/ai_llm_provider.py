@@ -1,15 +1,75 @@
 """Classes for different LLM providers."""  # noqa: INP001
 
+import hashlib
+import json
 import logging
 import os
+import re
+import threading
 import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
 
+from ai_llm_cache import ResponseCache
+from ai_llm_rate_limit import RateLimiter, is_rate_limit_error, retry_after
 from dotenv import load_dotenv  # pip install dotenv
 
 # load .env file
 load_dotenv()
 logger = logging.getLogger()  # get base logger
 
+# retries after 429 / overload errors
+RETRIES_MAX = 6
+
+BATCH_POLL_INTERVAL = 60  # seconds, batch jobs take minutes to hours
+
+
+class Usage(NamedTuple):
+    """Tokens consumed by a streamed response, its last part."""
+
+    tokens: int
+
+
+def estimate_tokens(instruction: str, prompt: str) -> int:
+    """Estimate tokens of a call, 4 bytes per token, response of size of prompt."""
+    return (len(instruction.encode()) + 2 * len(prompt.encode())) // 4
+
+
+# one rate limiter per provider, shared by all its instances
+_rate_limiters: dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    provider: str, requests_per_minute: float | None, tokens_per_minute: float | None
+) -> RateLimiter:
+    """Return the rate limiter of the provider, created on first use."""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = RateLimiter(
+                requests_per_minute, tokens_per_minute
+            )
+        return _rate_limiters[provider]
+
+
+def batch_chat_completion_result(record: dict) -> tuple[str, str | None, int]:
+    """
+    Parse a line of a batch output file with a chat completion.
+
+    Returns custom id, response text, None if the request failed, and tokens.
+    """
+    response = record.get("response") or {}
+    body = response.get("body")
+    if record.get("error") or response.get("status_code") != 200 or not body:  # noqa: PLR2004
+        return record["custom_id"], None, 0
+    usage = body.get("usage") or {}
+    return (
+        record["custom_id"],
+        body["choices"][0]["message"]["content"] or "",
+        usage.get("total_tokens", 0),
+    )
+
 
 def my_getenv(key: str) -> str:
     """Wrap for getenv that throws Exception."""
@@ -26,10 +86,29 @@ def my_getenv(key: str) -> str:
 class LLMProvider:
     """Class for different LLM providers."""
 
-    def __init__(self, provider: str, models: list[str]) -> None:
-        """Init the LLM with model and context instruction."""
+    def __init__(
+        self,
+        provider: str,
+        models: list[str],
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ) -> None:
+        """
+        Init the LLM with model and context instruction.
+
+        requests_per_minute and tokens_per_minute: limits of the account, None for
+        no limit, the defaults of the providers are for the free/lowest tier
+        """
         self.provider = provider
         self.models = models
+        self.rate_limiter = get_rate_limiter(
+            provider, requests_per_minute, tokens_per_minute
+        )
+        self._client: Any = None
+        self._client_lock = threading.Lock()
+        self.cache: ResponseCache | None = None
+        # calls of the same key are routed to the same prompt cache, if supported
+        self.prompt_cache_key: str | None = None
 
     def check_model_valid(self, model: str) -> None:
         """Raise ValueError if model is not valid."""
@@ -44,14 +123,255 @@ def get_models(self) -> list[str]:
         """Return list of available models."""
         return self.models
 
+    def client(self) -> Any:  # noqa: ANN401
+        """
+        Return the SDK client, created on first use.
+
+        the client is reused for all calls, also from several threads,
+        so its http connections are kept alive and the auth is done only once
+        no conversation state is stored in the client, each call sends all messages
+        """
+        with self._client_lock:
+            if self._client is None:
+                self._client = self.create_client()
+            return self._client
+
+    def create_client(self) -> Any:  # noqa: ANN401
+        """Create the SDK client."""
+        raise NotImplementedError
+
     def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
         """
         Call the LLM model with instruction and prompt.
 
+        the response cache is consulted first, cached responses consume no tokens
+        Returns a tuple containing the response text and the number of tokens consumed.
+        """
+        if self.cache is None:
+            return self.request_rate_limited(model, instruction, prompt)
+        key = ResponseCache.key(self.provider, model, instruction, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached[0], 0
+        response, tokens = self.request_rate_limited(model, instruction, prompt)
+        if response:
+            self.cache.put(key, response, tokens)
+        return response, tokens
+
+    def call_stream(
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        """
+        Call the LLM model with instruction and prompt, streaming the response.
+
+        yields the response text in parts, as they arrive, and finally the usage
+        the response is cached like for call, once it is complete
+        """
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.key(self.provider, model, instruction, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached[0]
+                yield Usage(0)
+                return
+        tokens_estimated = estimate_tokens(instruction, prompt)
+        parts: list[str] = []
+        usage = Usage(0)
+        attempt = 1
+        while True:
+            self._wait_for_rate_limit(tokens_estimated)
+            try:
+                for part in self.request_stream(model, instruction, prompt):
+                    if isinstance(part, Usage):
+                        usage = part
+                    else:
+                        parts.append(part)
+                        yield part
+            except Exception as e:
+                # parts already yielded can not be taken back
+                if parts:
+                    raise
+                self._backoff(e, attempt)
+                attempt += 1
+                continue
+            break
+        self.rate_limiter.success(usage.tokens, tokens_estimated)
+        response = "".join(parts)
+        if self.cache is not None and key is not None and response:
+            self.cache.put(key, response, usage.tokens)
+        yield usage
+
+    def request_rate_limited(
+        self, model: str, instruction: str, prompt: str
+    ) -> tuple[str, int]:
+        """Send within the rate limits, retry after 429 / overload errors."""
+        tokens_estimated = estimate_tokens(instruction, prompt)
+        attempt = 1
+        while True:
+            self._wait_for_rate_limit(tokens_estimated)
+            try:
+                response, tokens = self.request(model, instruction, prompt)
+            # raised again by _backoff, if not to retry
+            except Exception as e:  # noqa: BLE001
+                self._backoff(e, attempt)
+                attempt += 1
+                continue
+            self.rate_limiter.success(tokens, tokens_estimated)
+            return response, tokens
+
+    def _wait_for_rate_limit(self, tokens_estimated: int) -> None:
+        waited = self.rate_limiter.acquire(tokens_estimated)
+        if waited >= 1:
+            logger.info("%s: waited %ds for rate limit", self.provider, waited)
+
+    def _backoff(self, e: Exception, attempt: int) -> None:
+        """Raise e, if it is no 429 / overload error or the last attempt."""
+        if attempt == RETRIES_MAX or not is_rate_limit_error(e):
+            raise e
+        delay = self.rate_limiter.backoff(retry_after(e))
+        logger.warning(
+            "%s: %s, retry (%d/%d) in %ds",
+            self.provider,
+            e,
+            attempt + 1,
+            RETRIES_MAX,
+            delay,
+        )
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
+        """
+        Send instruction and prompt to the LLM model.
+
         Returns a tuple containing the response text and the number of tokens consumed.
         """
         raise NotImplementedError
 
+    def request_stream(
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        """
+        Send instruction and prompt to the LLM model, streaming the response.
+
+        yields parts of the response text and finally the usage
+        for providers without streaming, the complete response is a single part
+        """
+        response, tokens = self.request(model, instruction, prompt)
+        yield response
+        yield Usage(tokens)
+
+    def call_batch(
+        self,
+        model: str,
+        prompts: dict[str, tuple[str, str]],
+        batch_dir: Path,
+        *,
+        poll_interval: float = BATCH_POLL_INTERVAL,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> dict[str, tuple[str, int]]:
+        """
+        Call the LLM model for many prompts as a single batch job.
+
+        prompts: custom id -> instruction and prompt
+        the requests are written to a JSONL file in batch_dir, submitted and polled
+        until the job is done, the job id is stored next to the file, so an
+        interrupted run continues with the job submitted before
+        Returns custom id -> response text and tokens, failed requests are missing.
+        """
+        results: dict[str, tuple[str, int]] = {}
+        keys: dict[str, str] = {}
+        lines = []
+        for custom_id, (instruction, prompt) in prompts.items():
+            if self.cache is not None:
+                keys[custom_id] = ResponseCache.key(
+                    self.provider, model, instruction, prompt
+                )
+                cached = self.cache.get(keys[custom_id])
+                if cached is not None:
+                    results[custom_id] = (cached[0], 0)
+                    continue
+            lines.append(
+                json.dumps(self.batch_request(model, instruction, custom_id, prompt))
+            )
+        if not lines:
+            return results
+
+        output = self._run_batch_job(model, lines, batch_dir, poll_interval, sleep)
+        count_failed = 0
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            custom_id, response, tokens = self.batch_result(json.loads(line))
+            if response is None:
+                count_failed += 1
+                continue
+            results[custom_id] = (response, tokens)
+            if self.cache is not None and response:
+                self.cache.put(keys[custom_id], response, tokens)
+        logger.info("%s: batch job done, %d failed", self.provider, count_failed)
+        return results
+
+    def _run_batch_job(
+        self,
+        model: str,
+        lines: list[str],
+        batch_dir: Path,
+        poll_interval: float,
+        sleep: Callable[[float], None],
+    ) -> str:
+        """Submit or continue the batch job, wait for it and return its output."""
+        cont = "\n".join(lines) + "\n"
+        digest = hashlib.sha256(cont.encode()).hexdigest()[:16]
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        p = batch_dir / f"{self.provider}-{digest}.jsonl"
+        p_job = p.with_suffix(".job")
+        if p_job.is_file():
+            job_id = p_job.read_text(encoding="utf-8").strip()
+            logger.info("%s: continuing batch job %s", self.provider, job_id)
+        else:
+            p.write_text(cont, encoding="utf-8")
+            job_id = self.batch_submit(model, p)
+            p_job.write_text(job_id, encoding="utf-8")
+            logger.info(
+                "%s: batch job %s submitted, %d requests",
+                self.provider,
+                job_id,
+                len(lines),
+            )
+        while (status := self.batch_status(job_id)) == "running":
+            sleep(poll_interval)
+        p_job.unlink()
+        if status != "completed":
+            msg = f"{self.provider}: batch job {job_id} {status}"
+            raise RuntimeError(msg)
+
+        output = self.batch_output(job_id)
+        p.with_suffix(".output.jsonl").write_text(output, encoding="utf-8")
+        return output
+
+    def batch_request(
+        self, model: str, instruction: str, custom_id: str, prompt: str
+    ) -> dict:
+        """Return a line of the batch input file."""
+        msg = f"{self.provider} has no batch support"
+        raise NotImplementedError(msg)
+
+    def batch_submit(self, model: str, p: Path) -> str:
+        """Upload the batch input file, create the job and return its id."""
+        raise NotImplementedError
+
+    def batch_status(self, job_id: str) -> str:
+        """Return "running", "completed" or the reason the job failed."""
+        raise NotImplementedError
+
+    def batch_output(self, job_id: str) -> str:
+        """Return the contents of the batch output file."""
+        raise NotImplementedError
+
+    def batch_result(self, record: dict) -> tuple[str, str | None, int]:
+        """Parse a line of the batch output file, see batch_chat_completion_result."""
+        return batch_chat_completion_result(record)
+
 
 class MockProvider(LLMProvider):
     """Mocking LLM provider for local dev and tests."""
@@ -60,12 +380,77 @@ def __init__(self) -> None:  # noqa: D107
         super().__init__(provider="Mocked", models=["random"])
         self.check_model_valid("random")
 
-    def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:  # noqa: ARG002
-        """Call the LLM."""
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:  # noqa: ARG002
+        """Send to the LLM."""
         tokens = 51  # random number, chosen by fair dice roll
         response = f"Mocked {prompt} response"
         return response, tokens
 
+    def request_stream(  # noqa: D102
+        self,
+        model: str,  # noqa: ARG002
+        instruction: str,  # noqa: ARG002
+        prompt: str,
+    ) -> Iterator[str | Usage]:
+        tokens = 51
+        yield "Mocked "
+        # word by word
+        yield from re.findall(r"\S+\s*|\s+", prompt)
+        yield " response"
+        yield Usage(tokens)
+
+    # the batch jobs are processed locally, via files next to the input file
+
+    def batch_request(  # noqa: D102
+        self, model: str, instruction: str, custom_id: str, prompt: str
+    ) -> dict:
+        return {
+            "custom_id": custom_id,
+            "body": {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": instruction},
+                    {"role": "user", "content": prompt},
+                ],
+            },
+        }
+
+    def batch_submit(self, model: str, p: Path) -> str:  # noqa: ARG002, D102
+        return str(p)
+
+    def batch_status(self, job_id: str) -> str:  # noqa: D102
+        p_out = Path(job_id).with_suffix(".mock-output.jsonl")
+        if p_out.is_file():
+            return "completed"
+        # processed on first poll
+        lines = []
+        for line in Path(job_id).read_text(encoding="utf-8").splitlines():
+            request = json.loads(line)
+            messages = request["body"]["messages"]
+            response, tokens = self.request(
+                request["body"]["model"], messages[0]["content"], messages[1]["content"]
+            )
+            body = {
+                "choices": [{"message": {"role": "assistant", "content": response}}],
+                "usage": {"total_tokens": tokens},
+            }
+            lines.append(
+                json.dumps(
+                    {
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "body": body},
+                        "error": None,
+                    }
+                )
+            )
+        p_out.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return "running"
+
+    def batch_output(self, job_id: str) -> str:  # noqa: D102
+        return (
+            Path(job_id).with_suffix(".mock-output.jsonl").read_text(encoding="utf-8")
+        )
+
 
 class OllamaProvider(LLMProvider):  # noqa: D101
     def __init__(self) -> None:  # noqa: D107
@@ -80,12 +465,15 @@ def __init__(self) -> None:  # noqa: D107
             ],
         )
 
-    def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
-        """Call the LLM."""
-        from ollama import ChatResponse, chat  # pip install ollama  # noqa: PLC0415
+    def create_client(self) -> Any:  # noqa: ANN401, D102
+        from ollama import Client  # pip install ollama  # noqa: PLC0415
+
+        return Client()
 
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
+        """Send to the LLM."""
         self.check_model_valid(model)
-        response: ChatResponse = chat(
+        response = self.client().chat(
             model=model,
             stream=False,
             # think=True,
@@ -97,6 +485,21 @@ def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
         tokens = 0  # not returned by ollama
         return str(response.message.content), tokens
 
+    def request_stream(  # noqa: D102
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        self.check_model_valid(model)
+        for chunk in self.client().chat(
+            model=model,
+            stream=True,
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": prompt},
+            ],
+        ):
+            yield str(chunk.message.content or "")
+        yield Usage(0)  # not returned by ollama
+
 
 class MistralProvider(LLMProvider):  # noqa: D101
     def __init__(self) -> None:  # noqa: D107
@@ -106,15 +509,19 @@ def __init__(self) -> None:  # noqa: D107
                 "mistral-medium-latest",
                 "mistral-large-latest",
             ],
+            requests_per_minute=60,
+            tokens_per_minute=500_000,
         )
 
-    def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
-        """Call the LLM."""
+    def create_client(self) -> Any:  # noqa: ANN401, D102
         from mistralai.client import Mistral  # pip install mistralai  # noqa: PLC0415
 
+        return Mistral(api_key=my_getenv("MISTRAL_API_KEY"))
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
+        """Send to the LLM."""
         self.check_model_valid(model)
-        client = Mistral(api_key=my_getenv("MISTRAL_API_KEY"))
-        response = client.chat.complete(
+        response = self.client().chat.complete(
             model=model,
             messages=[
                 {"role": "system", "content": instruction},
@@ -139,6 +546,92 @@ def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
         )
         return s, tokens
 
+    def request_stream(  # noqa: D102
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        self.check_model_valid(model)
+        tokens = 0
+        with self.client().chat.stream(
+            model=model,
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": prompt},
+            ],
+        ) as stream:
+            for event in stream:
+                chunk = event.data
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield str(chunk.choices[0].delta.content)
+                if chunk.usage:
+                    tokens = chunk.usage.total_tokens
+        yield Usage(tokens)
+
+    def batch_request(  # noqa: D102
+        self, model: str, instruction: str, custom_id: str, prompt: str
+    ) -> dict:
+        self.check_model_valid(model)
+        # the model is set for the job
+        return {
+            "custom_id": custom_id,
+            "body": {
+                "messages": [
+                    {"role": "system", "content": instruction},
+                    {"role": "user", "content": prompt},
+                ],
+            },
+        }
+
+    def batch_submit(self, model: str, p: Path) -> str:  # noqa: D102
+        client = self.client()
+        with p.open("rb") as fh:
+            file = client.files.upload(
+                file={"file_name": p.name, "content": fh}, purpose="batch"
+            )
+        return client.batch.jobs.create(
+            input_files=[file.id], model=model, endpoint="/v1/chat/completions"
+        ).id
+
+    def batch_status(self, job_id: str) -> str:  # noqa: D102
+        status = self.client().batch.jobs.get(job_id=job_id).status
+        if status in ("QUEUED", "RUNNING"):
+            return "running"
+        return "completed" if status == "SUCCESS" else status.lower()
+
+    def batch_output(self, job_id: str) -> str:  # noqa: D102
+        client = self.client()
+        job = client.batch.jobs.get(job_id=job_id)
+        if not job.output_file:
+            return ""
+        return client.files.download(file_id=job.output_file).read().decode()
+
+
+# OpenAI and Azure OpenAI share the files and batches API
+
+OPENAI_BATCH_RUNNING = ("validating", "in_progress", "finalizing")
+
+
+def openai_batch_submit(client: Any, p: Path, endpoint: str) -> str:  # noqa: ANN401
+    """Upload the batch input file, create the job and return its id."""
+    with p.open("rb") as fh:
+        file = client.files.create(file=fh, purpose="batch")
+    return client.batches.create(
+        input_file_id=file.id, endpoint=endpoint, completion_window="24h"
+    ).id
+
+
+def openai_batch_status(client: Any, job_id: str) -> str:  # noqa: ANN401
+    """Return "running", "completed" or the reason the job failed."""
+    status = client.batches.retrieve(job_id).status
+    return "running" if status in OPENAI_BATCH_RUNNING else status
+
+
+def openai_batch_output(client: Any, job_id: str) -> str:  # noqa: ANN401
+    """Return the contents of the batch output file."""
+    batch = client.batches.retrieve(job_id)
+    if not batch.output_file_id:
+        return ""
+    return client.files.content(batch.output_file_id).text
+
 
 class OpenAIProvider(LLMProvider):  # noqa: D101
     def __init__(self) -> None:  # noqa: D107
@@ -150,28 +643,45 @@ def __init__(self) -> None:  # noqa: D107
                 "gpt-5",
                 "gpt-4o-mini",
             ],
+            requests_per_minute=500,
+            tokens_per_minute=200_000,
         )
 
-    def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
-        """Call the LLM."""
+    def create_client(self) -> Any:  # noqa: ANN401, D102
         from openai import (  # noqa: PLC0415
             OpenAI,  # pip install openai
         )
 
+        return OpenAI(api_key=my_getenv("OPENAI_API_KEY"))
+
+    def _prompt_cache_kwargs(self) -> dict[str, str]:
+        """
+        Return the prompt cache key parameter, if set.
+
+        prompts of 1024+ tokens are cached automatically, by their common prefix
+        the key routes the calls sharing the prefix to the same cache
+        """
+        return (
+            {"prompt_cache_key": self.prompt_cache_key} if self.prompt_cache_key else {}
+        )
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
+        """Send to the LLM."""
         self.check_model_valid(model)
-        client = OpenAI(api_key=my_getenv("OPENAI_API_KEY"))
         tokens = 0
-        response = client.responses.create(
+        response = self.client().responses.create(
             model=model,
             input=[
                 {"role": "developer", "content": instruction},
                 {"role": "user", "content": prompt},
             ],
+            **self._prompt_cache_kwargs(),
         )
         if response and response.usage and response.usage.input_tokens:
             logger.info(
-                "tokens: %d input + %d output = %d total",
+                "tokens: %d input (%d cached) + %d output = %d total",
                 response.usage.input_tokens,
+                response.usage.input_tokens_details.cached_tokens,
                 response.usage.output_tokens,
                 response.usage.total_tokens,
             )
@@ -180,6 +690,70 @@ def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
             logger.warning("No token consumption retrieved.")
         return response.output_text, tokens
 
+    def request_stream(  # noqa: D102
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        self.check_model_valid(model)
+        tokens = 0
+        with self.client().responses.create(
+            model=model,
+            input=[
+                {"role": "developer", "content": instruction},
+                {"role": "user", "content": prompt},
+            ],
+            stream=True,
+            **self._prompt_cache_kwargs(),
+        ) as stream:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed" and event.response.usage:
+                    tokens = event.response.usage.total_tokens
+        yield Usage(tokens)
+
+    def batch_request(  # noqa: D102
+        self, model: str, instruction: str, custom_id: str, prompt: str
+    ) -> dict:
+        self.check_model_valid(model)
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/responses",
+            "body": {
+                "model": model,
+                "input": [
+                    {"role": "developer", "content": instruction},
+                    {"role": "user", "content": prompt},
+                ],
+                **self._prompt_cache_kwargs(),
+            },
+        }
+
+    def batch_submit(self, model: str, p: Path) -> str:  # noqa: ARG002, D102
+        return openai_batch_submit(self.client(), p, "/v1/responses")
+
+    def batch_status(self, job_id: str) -> str:  # noqa: D102
+        return openai_batch_status(self.client(), job_id)
+
+    def batch_output(self, job_id: str) -> str:  # noqa: D102
+        return openai_batch_output(self.client(), job_id)
+
+    def batch_result(self, record: dict) -> tuple[str, str | None, int]:  # noqa: D102
+        response = record.get("response") or {}
+        body = response.get("body")
+        if record.get("error") or response.get("status_code") != 200 or not body:  # noqa: PLR2004
+            return record["custom_id"], None, 0
+        # output_text of the SDK is not part of the json
+        text = "".join(
+            content["text"]
+            for output in body.get("output", [])
+            if output.get("type") == "message"
+            for content in output.get("content", [])
+            if content.get("type") == "output_text"
+        )
+        usage = body.get("usage") or {}
+        return record["custom_id"], text, usage.get("total_tokens", 0)
+
 
 class GeminiProvider(LLMProvider):  # noqa: D101
     def __init__(self) -> None:  # noqa: D107
@@ -190,47 +764,40 @@ def __init__(self) -> None:  # noqa: D107
                 "gemini-2.5-flash",
                 "gemini-2.5-pro",
             ],
+            requests_per_minute=10,
+            tokens_per_minute=250_000,
         )
 
-    def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
-        """Call the LLM."""
+    def create_client(self) -> Any:  # noqa: ANN401, D102
         from google import genai  # pip install google-genai  # noqa: PLC0415
+
+        return genai.Client(api_key=my_getenv("GEMINI_API_KEY"))
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
+        """Send to the LLM."""
         from google.genai import types as genai_types  # noqa: PLC0415
 
         self.check_model_valid(model)
-        client = genai.Client(api_key=my_getenv("GEMINI_API_KEY"))
+        client = self.client()
 
-        response = None
         tokens = 0
-        retries_max = 3
-        for attempt in range(retries_max):
-            try:
-                response = client.models.generate_content(
-                    model=model,
-                    config=genai_types.GenerateContentConfig(
-                        system_instruction=instruction
-                    ),
-                    contents=prompt,
-                )
-                break  # Exit retry loop if successful
-            except Exception as e:
-                if attempt < retries_max and "The model is overloaded" in str(e):
-                    wait_time = 2**attempt
-                    logger.warning(
-                        "Model overloaded, retrying in %d seconds...", wait_time
-                    )
-                    time.sleep(wait_time)
-                else:
-                    raise
+        # "The model is overloaded" is retried by request_rate_limited
+        response = client.models.generate_content(
+            model=model,
+            config=genai_types.GenerateContentConfig(system_instruction=instruction),
+            contents=prompt,
+        )
 
         if (
             response
             and response.usage_metadata
             and response.usage_metadata.total_token_count
         ):
+            # the common prefix of the prompts is cached implicitly by Gemini 2.5
             logger.info(
-                "tokens: %d prompt + %d candidates = %d",
+                "tokens: %d prompt (%d cached) + %d candidates = %d",
                 response.usage_metadata.prompt_token_count,
+                response.usage_metadata.cached_content_token_count or 0,
                 response.usage_metadata.candidates_token_count,
                 response.usage_metadata.total_token_count,
             )
@@ -240,17 +807,37 @@ def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
         s = str(response.text) if response else ""
         return s, tokens
 
+    def request_stream(  # noqa: D102
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        from google.genai import types as genai_types  # noqa: PLC0415
+
+        self.check_model_valid(model)
+        tokens = 0
+        for chunk in self.client().models.generate_content_stream(
+            model=model,
+            config=genai_types.GenerateContentConfig(system_instruction=instruction),
+            contents=prompt,
+        ):
+            if chunk.text:
+                yield chunk.text
+            if chunk.usage_metadata and chunk.usage_metadata.total_token_count:
+                tokens = chunk.usage_metadata.total_token_count
+        yield Usage(tokens)
+
 
 class AzureOpenAIProvider(LLMProvider):
     """Azure OpenAI LLM provider."""
 
     def __init__(self) -> None:  # noqa: D107
         super().__init__(
-            provider="AzureOpenAI", models=["gpt-5-nano", "gpt-5-mini", "gpt-5"]
+            provider="AzureOpenAI",
+            models=["gpt-5-nano", "gpt-5-mini", "gpt-5"],
+            requests_per_minute=300,
+            tokens_per_minute=50_000,
         )
 
-    def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
-        """Call the LLM with retry logic."""
+    def create_client(self) -> Any:  # noqa: ANN401, D102
         from azure.identity import (  # pip install azure-identity  # noqa: PLC0415
             DefaultAzureCredential,
             get_bearer_token_provider,
@@ -259,14 +846,19 @@ def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
             AzureOpenAI,  # pip install openai
         )
 
-        self.check_model_valid(model)
-        client = AzureOpenAI(
+        # the token provider caches the token and refreshes it before it expires
+        return AzureOpenAI(
             api_version=my_getenv("AZURE_API_VERSION"),
             azure_endpoint=my_getenv("AZURE_API_URL"),
             azure_ad_token_provider=get_bearer_token_provider(
                 DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
             ),
         )
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
+        """Send to the LLM."""
+        self.check_model_valid(model)
+        client = self.client()
         messages = [
             {"role": "system", "content": instruction},
             {"role": "user", "content": prompt},
@@ -286,23 +878,83 @@ def call(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:
         )
         return s, tokens
 
-
-def create_llm_provider(provider_name: str) -> LLMProvider:
-    """Create LLM provider, based on string name."""
-    if provider_name == "Mock":
-        return MockProvider()
-    if provider_name == "Ollama":
-        return OllamaProvider()
-    if provider_name == "Mistral":
-        return MistralProvider()
-    if provider_name == "OpenAI":
-        return OpenAIProvider()
-    if provider_name == "Gemini":
-        return GeminiProvider()
-    if provider_name == "AzureOpenAI":
-        return AzureOpenAIProvider()
-    msg = f"Unknown LLM {provider_name}"
-    raise ValueError(msg)
+    def request_stream(  # noqa: D102
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        self.check_model_valid(model)
+        tokens = 0
+        with self.client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": prompt},
+            ],  # type: ignore
+            reasoning_effort="low",
+            stream=True,
+            stream_options={"include_usage": True},
+        ) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if chunk.usage:
+                    tokens = chunk.usage.total_tokens
+        yield Usage(tokens)
+
+    def batch_request(  # noqa: D102
+        self, model: str, instruction: str, custom_id: str, prompt: str
+    ) -> dict:
+        self.check_model_valid(model)
+        # model is the name of a global batch deployment
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": instruction},
+                    {"role": "user", "content": prompt},
+                ],
+                "reasoning_effort": "low",
+            },
+        }
+
+    def batch_submit(self, model: str, p: Path) -> str:  # noqa: ARG002, D102
+        return openai_batch_submit(self.client(), p, "/chat/completions")
+
+    def batch_status(self, job_id: str) -> str:  # noqa: D102
+        return openai_batch_status(self.client(), job_id)
+
+    def batch_output(self, job_id: str) -> str:  # noqa: D102
+        return openai_batch_output(self.client(), job_id)
+
+
+def create_llm_provider(
+    provider_name: str,
+    cache: ResponseCache | None = None,
+    prompt_cache_key: str | None = None,
+) -> LLMProvider:
+    """
+    Create LLM provider, based on string name, optionally with response cache.
+
+    prompt_cache_key: calls with the same key share the provider's prompt cache,
+    supported by OpenAI
+    """
+    providers: dict[str, type[LLMProvider]] = {
+        "Mock": MockProvider,
+        "Ollama": OllamaProvider,
+        "Mistral": MistralProvider,
+        "OpenAI": OpenAIProvider,
+        "Gemini": GeminiProvider,
+        "AzureOpenAI": AzureOpenAIProvider,
+    }
+    if provider_name not in providers:
+        msg = f"Unknown LLM {provider_name}"
+        raise ValueError(msg)
+    llm_provider = providers[provider_name]()
+    llm_provider.cache = cache
+    llm_provider.prompt_cache_key = prompt_cache_key
+    return llm_provider
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+# ruff: noqa: D103, INP001
+"""Tests for ai_llm_provider.py."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from ai_llm_cache import ResponseCache
+from ai_llm_provider import (
+    LLMProvider,
+    MockProvider,
+    Usage,
+    batch_chat_completion_result,
+    create_llm_provider,
+)
+
+
+class CountingProvider(LLMProvider):
+    """Provider counting the created clients."""
+
+    def __init__(self) -> None:  # noqa: D107
+        super().__init__(provider="Counting", models=["m"])
+        self.clients_created = 0
+
+    def create_client(self) -> object:  # noqa: D102
+        self.clients_created += 1
+        return object()
+
+
+def test_client_reused() -> None:
+    llm_provider = CountingProvider()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: llm_provider.client(), range(100)))
+    assert llm_provider.clients_created == 1
+    assert all(c is clients[0] for c in clients)
+
+
+def test_create_llm_provider() -> None:
+    assert isinstance(create_llm_provider("Mock"), MockProvider)
+    with pytest.raises(ValueError, match="Unknown LLM"):
+        create_llm_provider("Foo")
+
+
+def test_check_model_valid() -> None:
+    llm_provider = MockProvider()
+    assert llm_provider.call("random", "instruction", "x") == ("Mocked x response", 51)
+    with pytest.raises(ValueError, match="not a valid model"):
+        llm_provider.check_model_valid("foo")
+
+
+def test_call_stream(tmp_path: Path) -> None:
+    llm_provider = MockProvider()
+    parts = list(llm_provider.call_stream("random", "instruction", "a b\nc"))
+    assert parts == ["Mocked ", "a ", "b\n", "c", " response", Usage(51)]
+    # cached as a whole
+    llm_provider.cache = ResponseCache(tmp_path / "cache.sqlite")
+    list(llm_provider.call_stream("random", "instruction", "x"))
+    parts = list(llm_provider.call_stream("random", "instruction", "x"))
+    assert parts == ["Mocked x response", Usage(0)]
+    assert llm_provider.call("random", "instruction", "x") == ("Mocked x response", 0)
+    llm_provider.cache.close()
+
+
+class NonStreamingProvider(LLMProvider):
+    """Provider without streaming."""
+
+    def __init__(self) -> None:  # noqa: D107
+        super().__init__(provider="NonStreaming", models=["m"])
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:  # noqa: ARG002, D102
+        return prompt.upper(), 3
+
+
+def test_call_stream_fallback() -> None:
+    llm_provider = NonStreamingProvider()
+    assert list(llm_provider.call_stream("m", "instruction", "x y")) == [
+        "X Y",
+        Usage(3),
+    ]
+
+
+def test_call_batch(tmp_path: Path) -> None:
+    llm_provider = MockProvider()
+    prompts = {"001-000": ("instruction", "a"), "001-001": ("instruction", "b")}
+
+    def interrupt(_: float) -> None:
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        llm_provider.call_batch("random", prompts, tmp_path, sleep=interrupt)
+    assert len(list(tmp_path.glob("*.job"))) == 1
+    # the interrupted job is continued
+    results = llm_provider.call_batch("random", prompts, tmp_path, poll_interval=0)
+    assert results == {
+        "001-000": ("Mocked a response", 51),
+        "001-001": ("Mocked b response", 51),
+    }
+    assert not list(tmp_path.glob("*.job"))
+    assert len(list(tmp_path.glob("*.output.jsonl"))) == 1
+    # all answered from cache, no job
+    llm_provider.cache = ResponseCache(tmp_path / "cache.sqlite")
+    llm_provider.call_batch("random", prompts, tmp_path / "1", poll_interval=0)
+    results = llm_provider.call_batch("random", prompts, tmp_path / "2")
+    assert results["001-000"] == ("Mocked a response", 0)
+    assert not (tmp_path / "2").exists()
+    llm_provider.cache.close()
+
+
+def test_batch_chat_completion_result() -> None:
+    record = {
+        "custom_id": "x",
+        "response": {"status_code": 429, "body": {}},
+        "error": None,
+    }
+    assert batch_chat_completion_result(record) == ("x", None, 0)
+    record["response"] = {
+        "status_code": 200,
+        "body": {
+            "choices": [{"message": {"content": "y"}}],
+            "usage": {"total_tokens": 3},
+        },
+    }
+    assert batch_chat_completion_result(record) == ("x", "y", 3)
@@ -0,0 +1,152 @@
+"""Rate limiter for LLM providers."""  # noqa: INP001
+
+import threading
+import time
+from collections.abc import Callable
+
+BACKOFF_MIN = 2.0  # seconds
+BACKOFF_MAX = 300.0  # seconds
+
+# 429 too many requests, 503 unavailable, 529 overloaded (Anthropic)
+RATE_LIMIT_STATUS_CODES = (429, 503, 529)
+RATE_LIMIT_STATUSES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE")
+RATE_LIMIT_ERROR_TYPES = ("RateLimitError", "OverloadedError")
+RATE_LIMIT_PHRASES = (
+    "rate limit exceeded",
+    "rate_limit_exceeded",
+    "the model is overloaded",
+    "overloaded_error",
+)
+
+
+class TokenBucket:
+    """Bucket refilled by rate per minute, up to one minute of capacity."""
+
+    def __init__(self, per_minute: float, now: float) -> None:  # noqa: D107
+        self.per_minute = per_minute  # the configured limit
+        self.rate = per_minute / 60  # per second, reduced by backoff
+        self.level = per_minute
+        self.t = now
+
+    def _capped(self, amount: float) -> float:
+        # a single request larger than the capacity must not wait forever,
+        # nor block the following requests for long
+        return min(amount, self.per_minute)
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Return seconds until amount is available, 0 if available now."""
+        self.level = min(self.per_minute, self.level + (now - self.t) * self.rate)
+        self.t = now
+        amount = self._capped(amount)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Take amount, capped like by wait_time."""
+        self.level -= self._capped(amount)
+
+
+class RateLimiter:
+    """
+    Limit requests and tokens per minute, shared by all threads.
+
+    on 429 / overload errors, all requests are paused with exponential backoff
+    and the request rate is halved, it recovers slowly with each success
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None,
+        tokens_per_minute: float | None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """None means no limit, clock and sleep can be replaced for tests."""
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self.requests = (
+            TokenBucket(requests_per_minute, now) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        self.backoff_delay = 0.0
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """Wait until a request of tokens is allowed, return seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1, now) if self.requests else 0.0,
+                    self.tokens.wait_time(tokens, now) if self.tokens else 0.0,
+                )
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.take(1)
+                    if self.tokens:
+                        self.tokens.take(tokens)
+                    return waited
+            self.sleep(wait)
+            waited += wait
+
+    def success(self, tokens_used: int, tokens_estimated: int) -> None:
+        """Correct the estimated tokens and recover the request rate."""
+        with self._lock:
+            if self.tokens and tokens_used:
+                self.tokens.level -= tokens_used - tokens_estimated
+            self.backoff_delay = 0.0
+            if self.requests:
+                self.requests.rate = min(
+                    self.requests.per_minute / 60,
+                    self.requests.rate + self.requests.per_minute / 60 / 10,
+                )
+
+    def backoff(self, retry_after: float | None = None) -> float:
+        """Pause all requests after a 429 / overload error, return the delay."""
+        with self._lock:
+            self.backoff_delay = min(
+                max(self.backoff_delay * 2, BACKOFF_MIN), BACKOFF_MAX
+            )
+            delay = retry_after or self.backoff_delay
+            self.paused_until = max(self.paused_until, self.clock() + delay)
+            if self.requests:
+                self.requests.rate = max(
+                    self.requests.rate / 2, self.requests.per_minute / 60 / 16
+                )
+            return delay
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """
+    Return True for 429 / overload errors of the SDKs, that are worth a retry.
+
+    checks the status code, then the exception types, the SDKs are not imported,
+    as they are optional, then a few exact overload phrases of the messages
+    """
+    for attr in ("status_code", "code"):
+        status = getattr(e, attr, None)
+        # openai uses code for strings like "rate_limit_exceeded"
+        if isinstance(status, int) and not isinstance(status, bool):
+            return status in RATE_LIMIT_STATUS_CODES
+    # google genai: status "RESOURCE_EXHAUSTED", "UNAVAILABLE"
+    if getattr(e, "status", None) in RATE_LIMIT_STATUSES:
+        return True
+    if any(cls.__name__ in RATE_LIMIT_ERROR_TYPES for cls in type(e).__mro__):
+        return True
+    s = str(e).lower()
+    return any(phrase in s for phrase in RATE_LIMIT_PHRASES)
+
+
+def retry_after(e: Exception) -> float | None:
+    """Return seconds of the retry-after header of the error response, if any."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after", ""))
+    except ValueError:
+        return None
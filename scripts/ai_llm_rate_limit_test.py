@@ -0,0 +1,103 @@
+# ruff: noqa: D103, INP001, PLR2004
+"""Tests for ai_llm_rate_limit.py."""
+
+import pytest
+from ai_llm_mock import FakeClock
+from ai_llm_provider import LLMProvider
+from ai_llm_rate_limit import RateLimiter, is_rate_limit_error, retry_after
+
+
+def test_requests_per_minute() -> None:
+    clock = FakeClock()
+    limiter = RateLimiter(60, None, clock, clock.sleep)
+    # one minute of capacity, then one per second
+    assert [limiter.acquire(1) for _ in range(60)] == [0.0] * 60
+    assert limiter.acquire(1) == pytest.approx(1.0)
+    assert clock.t == pytest.approx(1.0)
+
+
+def test_tokens_per_minute() -> None:
+    clock = FakeClock()
+    limiter = RateLimiter(None, 6000, clock, clock.sleep)
+    assert limiter.acquire(6000) == 0.0
+    assert limiter.acquire(3000) == pytest.approx(30.0)
+    # actual tokens used are less than estimated
+    limiter.success(1000, 3000)
+    assert limiter.acquire(2000) == pytest.approx(0.0)
+    # larger than the capacity, waits for a full bucket only
+    assert limiter.acquire(100_000) == pytest.approx(60.0)
+    # and takes only the capacity, the next request waits for its own tokens
+    assert limiter.acquire(600) == pytest.approx(6.0)
+
+
+def test_backoff() -> None:
+    clock = FakeClock()
+    limiter = RateLimiter(60, None, clock, clock.sleep)
+    assert limiter.backoff() == 2.0
+    assert limiter.backoff() == 4.0
+    assert limiter.backoff(retry_after=10) == 10
+    assert limiter.requests is not None
+    assert limiter.requests.rate == pytest.approx(1 / 8)
+    assert limiter.acquire(1) == pytest.approx(10.0)
+    limiter.success(0, 0)
+    assert limiter.backoff_delay == 0.0
+    assert limiter.requests.rate == pytest.approx(1 / 8 + 1 / 10)
+
+
+class OverloadedError(Exception):
+    """Error like raised by the SDKs."""
+
+    status_code = 429
+
+    class response:  # noqa: N801
+        """Response with headers."""
+
+        headers = {"retry-after": "3"}  # noqa: RUF012
+
+
+def _error(msg: str = "", **attrs: object) -> Exception:
+    e = Exception(msg)
+    for name, value in attrs.items():
+        setattr(e, name, value)
+    return e
+
+
+def test_is_rate_limit_error() -> None:
+    assert is_rate_limit_error(OverloadedError())
+    assert is_rate_limit_error(Exception("503 UNAVAILABLE. The model is overloaded."))
+    assert not is_rate_limit_error(ValueError("Model 'x' is not a valid model"))
+    # status code, status and type of the SDKs
+    assert is_rate_limit_error(_error(status_code=503))
+    assert not is_rate_limit_error(_error(status_code=400))
+    assert not is_rate_limit_error(_error(status_code=500))
+    assert is_rate_limit_error(_error(code=429))
+    assert is_rate_limit_error(_error(status="RESOURCE_EXHAUSTED"))
+    assert is_rate_limit_error(type("RateLimitError", (Exception,), {})())
+    # numbers and words in other messages
+    assert not is_rate_limit_error(ValueError("chapter 429 not found"))
+    assert not is_rate_limit_error(ValueError("image unavailable"))
+    assert not is_rate_limit_error(_error(code=400, msg="429"))
+    assert retry_after(OverloadedError()) == 3.0
+    assert retry_after(Exception()) is None
+
+
+class FlakyProvider(LLMProvider):
+    """Provider failing with 429 for the first calls."""
+
+    def __init__(self, failures: int) -> None:  # noqa: D107
+        super().__init__(provider="Flaky", models=["m"])
+        clock = FakeClock()
+        self.rate_limiter = RateLimiter(None, None, clock, clock.sleep)
+        self.failures = failures
+
+    def request(self, model: str, instruction: str, prompt: str) -> tuple[str, int]:  # noqa: ARG002, D102
+        if self.failures:
+            self.failures -= 1
+            raise OverloadedError
+        return prompt, 1
+
+
+def test_request_retry() -> None:
+    assert FlakyProvider(failures=2).call("m", "i", "x") == ("x", 1)
+    with pytest.raises(OverloadedError):
+        FlakyProvider(failures=10).call("m", "i", "x")
@@ -1,11 +1,20 @@
 """LLM/AI review of the translation."""  # noqa: INP001
 
+import contextlib
+import functools
+import hashlib
 import logging
 import re
+import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from ai_llm_provider import create_llm_provider
+from ai_llm_cache import ResponseCache
+from ai_llm_provider import LLMProvider, Usage, create_llm_provider
+from ai_review_glossary import Glossary
+from ai_review_ledger import ReviewLedger
 
 # Logging format: log level names to single letters
 logging.addLevelName(logging.DEBUG, "D:")
@@ -30,26 +39,58 @@
 # LLM_PROVIDER, MODEL = ("AzureOpenAI", "gpt-5")
 
 MAX_LINES_PER_LLM_CALL = 200
+# max estimated tokens of a chunk, per model
+# the response is of the same size and must fit into the output limit of the model
+MAX_TOKENS_PER_LLM_CALL = {
+    "llama3.2:1b": 1000,  # default context of ollama: 2048 tokens
+    "llama3.2:3b": 1000,
+    "deepseek-r1:1.5b": 1000,
+    "deepseek-r1:8b": 1000,
+    "deepseek-r1:7b": 1000,
+}
+MAX_TOKENS_PER_LLM_CALL_DEFAULT = 6000
 SKIP_COMMENTS = False
 
-CHAPTER_RANGE = range(40, 45)
-
+# review only the paragraphs, that were not reviewed by MODEL and the prompt before
+REVIEW_CHANGED_ONLY = False
+# the reviewed paragraphs are recorded here, only with REVIEW_CHANGED_ONLY
+# not in tmp/, as that is removed by cleanup.sh, ignored by git
+LEDGER_FILE: Path | None = Path("scripts/ai_review_ledger.json")
+
+# stream the responses, the .ai.tex file is written while the LLM is generating
+STREAM = True
+# abort a streamed response, if it grows larger than this ratio of the chunk
+# (the model is looping), and retry
+MAX_OUTPUT_RATIO = 2.0
+
+# send the chunks of all chapters as a single batch job, for bulk reviews
+# cheaper and higher limits, but the job might take up to 24h
+# supported by Mistral, OpenAI and AzureOpenAI (global batch deployment)
+BATCH = False
+BATCH_DIR = Path("tmp/ai-batch")
+BATCH_POLL_INTERVAL = 60  # seconds
+
+# identical calls are answered from this cache, set to None to disable
+CACHE_FILE: Path | None = Path("tmp/ai-review-cache.sqlite")
+
+# max number of concurrent LLM calls, chunks of all chapters are sent in parallel
+# the requests and tokens per minute are limited in ai_llm_provider
+MAX_CONCURRENT_CALLS = {
+    "Mock": 8,
+    "Ollama": 1,  # local model
+    "Mistral": 4,
+    "OpenAI": 8,
+    "Gemini": 2,
+    "AzureOpenAI": 8,
+}
+
+# send only the glossary entries, whose EN or DE term occurs in the chunk
+FILTER_GLOSSARY = True
 
-def _format_glossary(csv_text: str) -> str:
-    """Parse glossary CSV and format it clearly for the LLM."""
-    lines = []
-    for row in csv_text.strip().splitlines():
-        if not row.strip() or row.startswith(("==", "EN,DE")):
-            continue
-        parts = row.split(",", 1)
-        if len(parts) == 2 and parts[0].strip() and parts[1].strip():  # noqa: PLR2004
-            lines.append(f"  {parts[0].strip()} → {parts[1].strip()}")
-    return "\n".join(lines)
+CHAPTER_RANGE = range(40, 45)
 
 
-GLOSSARY = _format_glossary(
-    Path("chapters/0woerterbuch.csv").read_text(encoding="utf-8")
-)
+GLOSSARY = Glossary(Path("chapters/0woerterbuch.csv").read_text(encoding="utf-8"))
 
 
 def read_latest_prompt_from_file() -> str:
@@ -64,32 +105,71 @@ def read_latest_prompt_from_file() -> str:
     return s
 
 
-# INSTRUCTION = read_latest_prompt_from_file()
-INSTRUCTION = f"{read_latest_prompt_from_file()}\n\n## Glossary\n{GLOSSARY}"
+PROMPT = read_latest_prompt_from_file()
+# the full instruction, identifies the prompt in the ledger
+# INSTRUCTION = PROMPT
+INSTRUCTION = f"{PROMPT}\n\n## Glossary\n{GLOSSARY.format()}"
+# the prompt is the common prefix of all calls, cached by OpenAI under this key
+PROMPT_CACHE_KEY = f"hpmor-review-{hashlib.sha256(PROMPT.encode()).hexdigest()[:16]}"
+
+
+def instruction_for(chunk_in: str) -> str:
+    """
+    Return the instruction for a chunk.
+
+    with FILTER_GLOSSARY, only the glossary entries used in the chunk are
+    included, after the prompt, so the prompt stays a common prefix for the
+    prompt caching of the providers
+    """
+    if not FILTER_GLOSSARY:
+        return INSTRUCTION
+    return f"{PROMPT}\n\n## Glossary\n{GLOSSARY.format_used(chunk_in)}"
+
+
+def estimate_tokens(s: str) -> int:
+    """Estimate number of tokens of a line, about 4 bytes per token."""
+    return len(s.encode()) // 4 + 1
 
 
-def split_into_chunks(lines: list[str], max_lines: int) -> list[str]:
-    """Split list of lines to chunks of max_lines length."""
+def split_into_blocks(lines: list[str]) -> list[list[str]]:
+    """
+    Split list of lines to blocks, separated by empty lines.
+
+    a block is an EN comment with its DE paragraph, incl. the empty lines after it
+    """
+    blocks: list[list[str]] = []
+    block: list[str] = []
+    for line in lines:
+        if line.strip() and block and block[-1].strip() == "":
+            blocks.append(block)
+            block = []
+        block.append(line)
+    if block:
+        blocks.append(block)
+    return blocks
+
+
+def split_into_chunks(lines: list[str], max_tokens: int, max_lines: int) -> list[str]:
+    """
+    Split list of lines to chunks of max_tokens and max_lines.
+
+    blocks are not split, so a block exceeding the limits becomes a single chunk
+    """
     chunks = []
-    n = len(lines)
-    i = 0
-    while i < n:
-        end = min(i + max_lines, n)
-        chunk = lines[i:end]
-        # Find last empty line in chunk to split more naturally
-        split_idx = None
-        for j in range(len(chunk) - 1, -1, -1):
-            if chunk[j].strip() == "":
-                split_idx = j + 1
-                break
-        if split_idx is not None and split_idx != 0:
-            chunk_lines = chunk[:split_idx]
-            next_i = i + split_idx
-        else:
-            chunk_lines = chunk
-            next_i = end
-        chunks.append("\n".join(chunk_lines))
-        i = next_i
+    chunk: list[str] = []
+    tokens = 0
+    for block in split_into_blocks(lines):
+        block_tokens = sum(estimate_tokens(line) for line in block)
+        if chunk and (
+            tokens + block_tokens > max_tokens or len(chunk) + len(block) > max_lines
+        ):
+            chunks.append("\n".join(chunk))
+            chunk = []
+            tokens = 0
+        chunk.extend(block)
+        tokens += block_tokens
+    if chunk:
+        chunks.append("\n".join(chunk))
     return chunks
 
 
@@ -158,90 +238,409 @@ def _restore_comments_from_refs(lines: list[str], ref_map: dict[int, str]) -> li
     return result
 
 
-def review_chapter(chapter_no: int) -> None:
-    """Read chapter, split into chunks, review chunks by LLM."""
-    p = Path("chapters") / f"hpmor-chapter-{chapter_no:03}.tex"
-    logger.info("# %s", p.name)
-    cont_raw = p.read_text(encoding="utf-8")
-    count_chars_total = len(cont_raw)
-    cont = cont_raw.split("\n")
-    comment_ref_map: dict[int, str] | None = None
-    if SKIP_COMMENTS:
-        cont, comment_ref_map = _replace_comments_with_refs(cont)
-    del cont_raw
-    count_lines_total = len(cont)
-    logger.info("%d lines, %d chars.", count_lines_total, count_chars_total)
-    chunks_in = split_into_chunks(cont, MAX_LINES_PER_LLM_CALL)
-
-    chunks_out: list[str] = []
-    time_start = time.time()
+def _call_stream(
+    llm_provider: LLMProvider,
+    chunk_in: str,
+    on_stream: Callable[[str], None] | None,
+) -> tuple[str, int] | None:
+    """
+    Call the LLM streaming, pass the text received so far to on_stream.
+
+    Returns None, if the response was aborted for exceeding MAX_OUTPUT_RATIO.
+    """
+    max_len = MAX_OUTPUT_RATIO * len(chunk_in) + 200
+    chunk_out = ""
+    tokens_used = 0
+    with contextlib.closing(
+        llm_provider.call_stream(MODEL, instruction_for(chunk_in), chunk_in)
+    ) as stream:
+        for part in stream:
+            if isinstance(part, Usage):
+                tokens_used = part.tokens
+                continue
+            chunk_out += part
+            if len(chunk_out) > max_len:
+                # closing the stream closes the connection of the SDK
+                return None
+            if on_stream is not None:
+                on_stream(chunk_out)
+    return chunk_out, tokens_used
+
+
+def review_chunk(  # noqa: PLR0913
+    llm_provider: LLMProvider,
+    name: str,
+    chunk_no: int,
+    chunk_count: int,
+    chunk_in: str,
+    *,
+    on_stream: Callable[[str], None] | None = None,
+) -> tuple[str, int, bool]:
+    """
+    Review a chunk by LLM, retry if the comments got lost.
+
+    with STREAM, on_stream is called with the text received so far
+    if all responses were aborted, the chunk is returned unchanged
+    Returns the reviewed chunk, the tokens used and True, if the review
+    succeeded, False if all responses were aborted or lost the comments.
+    """
+    chunk_out = ""
     tokens_used_total = 0
     retries_max = 1 if SKIP_COMMENTS else 3
+    aborted = False
+
+    for retry_no in range(retries_max):
+        if retry_no > 0 and not aborted:
+            print(f"WARN: no comments, retry ({retry_no + 1}/{retries_max})")
+
+        logger.info(
+            "## %s %d/%d: %d lines, %d char",
+            name,
+            chunk_no + 1,
+            chunk_count,
+            len(chunk_in.split("\n")),
+            len(chunk_in),
+        )
+        time_start_chunk = time.time()
+
+        # here the AI magic happens
+        if STREAM:
+            result = _call_stream(llm_provider, chunk_in, on_stream)
+            aborted = result is None
+            if result is None:
+                logger.warning(
+                    "%s %d/%d: response too long, aborted",
+                    name,
+                    chunk_no + 1,
+                    chunk_count,
+                )
+                chunk_out = chunk_in
+                continue
+            chunk_out, tokens_used = result
+        else:
+            chunk_out, tokens_used = llm_provider.call(
+                MODEL, instruction_for(chunk_in), chunk_in
+            )
+        tokens_used_total += tokens_used
+
+        logger.info(
+            "%s %d/%d in %ds",
+            name,
+            chunk_no + 1,
+            chunk_count,
+            (time.time() - time_start_chunk),
+        )
+
+        # break the retry logic if comments survived in the output, otherwise retry
+        if comments_kept(chunk_in, chunk_out):
+            break
+    reviewed = not aborted and comments_kept(chunk_in, chunk_out)
+    return chunk_out, tokens_used_total, reviewed
+
+
+def comments_kept(chunk_in: str, chunk_out: str) -> bool:
+    """Return True, if at least half of the comment lines survived the review."""
+    input_comment_count = sum(
+        1 for ln in chunk_in.split("\n") if ln.lstrip().startswith("%")
+    )
+    output_comment_count = sum(
+        1 for ln in chunk_out.split("\n") if ln.lstrip().startswith("%")
+    )
+    return input_comment_count == 0 or output_comment_count >= input_comment_count * 0.5
+
+
+class ChapterReview:
+    """Chunks of a chapter and their reviewed versions, in order."""
+
+    def __init__(self, chapter_no: int, ledger: ReviewLedger | None = None) -> None:
+        """
+        Read chapter and split into chunks.
+
+        ledger: given with REVIEW_CHANGED_ONLY, the blocks found in it are kept as
+        they are
+        """
+        self.p = Path("chapters") / f"hpmor-chapter-{chapter_no:03}.tex"
+        self.ledger = ledger
+        cont_raw = self.p.read_text(encoding="utf-8")
+        self.count_chars_total = len(cont_raw)
+        cont = cont_raw.split("\n")
+        self.comment_ref_map: dict[int, str] | None = None
+        if SKIP_COMMENTS:
+            cont, self.comment_ref_map = _replace_comments_with_refs(cont)
+        del cont_raw
+        self.count_lines_total = len(cont)
+
+        # the chapter as segments: the kept blocks and the chunks to review
+        self.segments_out: list[str | None] = []
+        self.chunks_in: list[str] = []
+        self.chunk_segments: list[int] = []  # segment of each chunk
+        count_blocks_kept = 0
+        lines_to_review: list[str] = []
+        for block in split_into_blocks(cont):
+            if ledger is not None and ledger.is_reviewed(block):
+                self._add_chunks(lines_to_review)
+                lines_to_review = []
+                self.segments_out.append("\n".join(block))
+                count_blocks_kept += 1
+            else:
+                lines_to_review.extend(block)
+        self._add_chunks(lines_to_review)
+
+        self.count_written = 0
+        # streamed text of the next segment, already in the .ai.tex file
+        self.streamed = ""
+        self._lock = threading.Lock()
+        self.tokens_used_total = 0
+        self.time_start = time.time()
+        logger.info(
+            "# %s: %d lines, %d chars, %d chunks, %d blocks kept.",
+            self.p.name,
+            self.count_lines_total,
+            self.count_chars_total,
+            len(self.chunks_in),
+            count_blocks_kept,
+        )
+
+    def _add_chunks(self, lines: list[str]) -> None:
+        for chunk in split_into_chunks(
+            lines,
+            MAX_TOKENS_PER_LLM_CALL.get(MODEL, MAX_TOKENS_PER_LLM_CALL_DEFAULT),
+            MAX_LINES_PER_LLM_CALL,
+        ):
+            self.chunk_segments.append(len(self.segments_out))
+            self.chunks_in.append(chunk)
+            self.segments_out.append(None)
+
+    @property
+    def done(self) -> bool:
+        """True, if all chunks are reviewed and written."""
+        return self.count_written == len(self.segments_out)
+
+    def _written_text(self) -> str:
+        return "\n".join(
+            s for s in self.segments_out[: self.count_written] if s is not None
+        )
+
+    def stream(self, chunk_no: int, text: str) -> None:
+        """
+        Append streamed text of a chunk to the .ai.tex file.
+
+        only the chunk following the written ones is streamed, called from the
+        worker threads with the text received so far
+        """
+        with self._lock:
+            if self.chunk_segments[chunk_no] != self.count_written or not text:
+                return
+            p_out = self.p.with_suffix(".ai.tex")
+            if self.streamed and text.startswith(self.streamed):
+                with p_out.open("a", encoding="utf-8") as fh:
+                    fh.write(text[len(self.streamed) :])
+            else:
+                # first part or response retried
+                sep = "\n" if self.count_written > 0 else ""
+                p_out.write_text(self._written_text() + sep + text, encoding="utf-8")
+            self.streamed = text
+
+    def discard_stream(self, chunk_no: int) -> None:
+        """
+        Remove the streamed text of a failed chunk from the .ai.tex file.
+
+        the file is removed, if nothing else was written, so the chapter is not
+        taken as done by the next run
+        """
+        with self._lock:
+            if not self.streamed or self.chunk_segments[chunk_no] != self.count_written:
+                return
+            p_out = self.p.with_suffix(".ai.tex")
+            if self.count_written == 0:
+                p_out.unlink(missing_ok=True)
+            else:
+                p_out.write_text(self._written_text(), encoding="utf-8")
+            self.streamed = ""
+
+    def add_result(
+        self, chunk_no: int, chunk_out: str, tokens_used: int, *, reviewed: bool = True
+    ) -> None:
+        """
+        Store reviewed chunk.
+
+        the chunks are written in order, as soon as all previous chunks are done
+        only reviewed chunks are recorded in the ledger, chunks kept unchanged
+        after a failed review are reviewed again on the next run
+        """
+        with self._lock:
+            self._add_result(chunk_no, chunk_out, tokens_used, reviewed=reviewed)
+
+    def _add_result(
+        self, chunk_no: int, chunk_out: str, tokens_used: int, *, reviewed: bool
+    ) -> None:
+        self.segments_out[self.chunk_segments[chunk_no]] = chunk_out
+        self.tokens_used_total += tokens_used
+        if self.ledger is not None and reviewed:
+            # the paragraphs sent and the ones returned by the LLM
+            self.ledger.add(split_into_blocks(self.chunks_in[chunk_no].split("\n")))
+            self.ledger.add(split_into_blocks(chunk_out.split("\n")))
+        count_ready = self.count_written
+        while (
+            count_ready < len(self.segments_out)
+            and self.segments_out[count_ready] is not None
+        ):
+            count_ready += 1
+        if count_ready == self.count_written:
+            return
+        self.count_written = count_ready
+        self.streamed = ""
+
+        # Write progress; restore refs only when all chunks are done
+        output_text = self._written_text()
+        if self.done and self.comment_ref_map is not None:
+            output_lines = output_text.split("\n")
+            output_lines = _restore_comments_from_refs(
+                output_lines, self.comment_ref_map
+            )
+            output_text = "\n".join(output_lines)
 
-    for chunk_no in range(len(chunks_in)):
-        chunk_out = ""
-        for retry_no in range(retries_max):
-            if retry_no > 0:
-                print(f"WARN: no comments, retry ({retry_no + 1}/{retries_max})")
+        # Write the AI output to a new file
+        self.p.with_suffix(".ai.tex").write_text(output_text, encoding="utf-8")
 
-            chunk_in = chunks_in[chunk_no]
-            count_chunk_char = len(chunk_in)
+        if self.done:
+            if self.ledger is not None:
+                self.ledger.save()
+            time_total = max(round(time.time() - self.time_start), 1)
             logger.info(
-                "## %d/%d: %d lines, %d char",
-                chunk_no + 1,
-                len(chunks_in),
-                len(chunk_in.split("\n")),
-                count_chunk_char,
+                "%s: %d lines reviewed in %ds, %d tokens, %d char/s, %.1f token/char.",
+                self.p.name,
+                self.count_lines_total,
+                time_total,
+                self.tokens_used_total,
+                (self.count_chars_total / time_total),
+                (self.count_chars_total / max(self.tokens_used_total, 1)),
             )
-            # recreate llm for each chunk speeds-up processing
-            #  by dropping the old contents
-            llm_provider = create_llm_provider(provider_name=LLM_PROVIDER)
 
-            time_start_chunk = time.time()
 
-            # here the AI magic happens
-            chunk_out, tokens_used = llm_provider.call(MODEL, INSTRUCTION, chunk_in)
-            tokens_used_total += tokens_used
+def review_chapters(
+    chapter_numbers: list[int],
+    *,
+    llm_provider: LLMProvider | None = None,
+    max_workers: int | None = None,
+) -> None:
+    """
+    Review chapters by LLM, the chunks of all chapters are sent concurrently.
 
-            logger.info("in %ds", (time.time() - time_start_chunk))
+    at most MAX_CONCURRENT_CALLS of the provider at the same time
+    llm_provider and max_workers replace LLM_PROVIDER and MAX_CONCURRENT_CALLS,
+    see ai_review_benchmark.py
+    """
+    reviews = list(_chapter_reviews(chapter_numbers).values())
+    # one provider for all chunks, its client keeps the connections alive
+    # each call sends instruction and chunk only, no old contents
+    cache = None
+    if llm_provider is None:
+        cache = ResponseCache(CACHE_FILE) if CACHE_FILE else None
+        llm_provider = create_llm_provider(
+            provider_name=LLM_PROVIDER, cache=cache, prompt_cache_key=PROMPT_CACHE_KEY
+        )
+    if max_workers is None:
+        max_workers = MAX_CONCURRENT_CALLS.get(LLM_PROVIDER, 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # submitted in order, so the first chapters are done first
+        futures = {
+            executor.submit(
+                review_chunk,
+                llm_provider,
+                review.p.name,
+                chunk_no,
+                len(review.chunks_in),
+                chunk_in,
+                on_stream=functools.partial(review.stream, chunk_no),
+            ): (review, chunk_no)
+            for review in reviews
+            for chunk_no, chunk_in in enumerate(review.chunks_in)
+        }
+        for future in as_completed(futures):
+            review, chunk_no = futures[future]
+            try:
+                chunk_out, tokens_used, reviewed = future.result()
+            except Exception as e:
+                logger.exception("Exception caught in %s", review.p.name)
+                review.discard_stream(chunk_no)
+                # Gemini quota exceeded
+                if "You exceeded your current quota" in str(e):
+                    executor.shutdown(cancel_futures=True)
+                    raise
+                # keep the chunk unchanged, so the following chunks are written
+                review.add_result(
+                    chunk_no, review.chunks_in[chunk_no], 0, reviewed=False
+                )
+                continue
+            review.add_result(chunk_no, chunk_out, tokens_used, reviewed=reviewed)
+    if cache is not None:
+        logger.info("%s", cache.stats())
+        cache.close()
+
+
+def _chapter_reviews(chapter_numbers: list[int]) -> dict[int, ChapterReview]:
+    """Return the chapters with chunks to review."""
+    ledger = (
+        ReviewLedger(LEDGER_FILE, MODEL, INSTRUCTION)
+        if REVIEW_CHANGED_ONLY and LEDGER_FILE
+        else None
+    )
+    reviews = {}
+    for i in chapter_numbers:
+        review = ChapterReview(i, ledger)
+        if review.chunks_in:
+            reviews[i] = review
+        else:
+            logger.info("%s: nothing to review", review.p.name)
+    return reviews
 
-            # manually delete the llm to free resources
-            del llm_provider
 
-            # break the retry logic if comments survived in the output, otherwise retry
-            input_comment_count = sum(
-                1 for ln in chunk_in.split("\n") if ln.lstrip().startswith("%")
-            )
-            output_comment_count = sum(
-                1 for ln in chunk_out.split("\n") if ln.lstrip().startswith("%")
-            )
-            if (
-                input_comment_count == 0
-                or output_comment_count >= input_comment_count * 0.5
-            ):
-                break
+def review_chapters_batch(chapter_numbers: list[int]) -> None:
+    """
+    Review chapters by a batch job of the provider, for bulk reviews.
 
-        chunks_out.append(chunk_out)
+    the results are mapped back to chapter and chunk via the custom id
+    chunks failed in the batch or that lost their comments are reviewed by
+    interactive calls afterwards
+    """
+    reviews = _chapter_reviews(chapter_numbers)
+    cache = ResponseCache(CACHE_FILE) if CACHE_FILE else None
+    llm_provider = create_llm_provider(
+        provider_name=LLM_PROVIDER, cache=cache, prompt_cache_key=PROMPT_CACHE_KEY
+    )
+    prompts = {
+        f"{chapter_no:03}-{chunk_no:03}": (instruction_for(chunk_in), chunk_in)
+        for chapter_no, review in reviews.items()
+        for chunk_no, chunk_in in enumerate(review.chunks_in)
+    }
+    results = llm_provider.call_batch(
+        MODEL, prompts, BATCH_DIR, poll_interval=BATCH_POLL_INTERVAL
+    )
+    for custom_id, (_, chunk_in) in prompts.items():
+        chapter_no, chunk_no = map(int, custom_id.split("-"))
+        review = reviews[chapter_no]
+        result = results.get(custom_id)
+        if result is not None and comments_kept(chunk_in, result[0]):
+            review.add_result(chunk_no, *result)
+            continue
+        logger.warning("%s: %s failed in batch, retry", review.p.name, custom_id)
+        chunk_out, tokens_used, reviewed = review_chunk(
+            llm_provider,
+            review.p.name,
+            chunk_no,
+            len(review.chunks_in),
+            chunk_in,
+        )
+        review.add_result(chunk_no, chunk_out, tokens_used, reviewed=reviewed)
+    if cache is not None:
+        logger.info("%s", cache.stats())
+        cache.close()
 
-        # Write progress after each chunk; restore refs only on final chunk
-        output_text = "\n".join(chunks_out)
-        if chunk_no == len(chunks_in) - 1 and comment_ref_map is not None:
-            output_lines = output_text.split("\n")
-            output_lines = _restore_comments_from_refs(output_lines, comment_ref_map)
-            output_text = "\n".join(output_lines)
 
-        # Write the AI output to a new file
-        p.with_suffix(".ai.tex").write_text(output_text, encoding="utf-8")
-
-    time_total = max(round(time.time() - time_start), 1)
-    logger.info(
-        "%d lines reviewed in %ds, %d tokens, %d char/s, %.1f token/char.",
-        count_lines_total,
-        time_total,
-        tokens_used_total,
-        (count_chars_total / time_total),
-        (count_chars_total / max(tokens_used_total, 1)),
-    )
+def review_chapter(chapter_no: int) -> None:
+    """Read chapter, split into chunks, review chunks by LLM."""
+    review_chapters([chapter_no])
 
 
 if __name__ == "__main__":
@@ -252,20 +651,16 @@ def review_chapter(chapter_no: int) -> None:
     # exit()
 
     # multiple chapters
+    chapter_numbers = []
     for i in CHAPTER_RANGE:
         p = (Path("chapters") / f"hpmor-chapter-{i:03}.tex").with_suffix(".ai.tex")
         if p.is_file():
             logger.info("skipping %s", p.name)
             continue
+        chapter_numbers.append(i)
 
-        logger.info("")
-        try:
-            review_chapter(i)
-            if LLM_PROVIDER == "Gemini":
-                logger.info("Sleeping for 5min")
-                time.sleep(300)
-        except Exception as e:
-            logger.exception("Exception caught")
-            # Gemini quota exceeded
-            if "You exceeded your current quota" in str(e):
-                raise
+    if BATCH:
+        review_chapters_batch(chapter_numbers)
+    else:
+        # the requests and tokens per minute are limited by the provider
+        review_chapters(chapter_numbers)
@@ -0,0 +1,175 @@
+"""
+Benchmark of ai_review against the simulated LLM provider.
+
+measures throughput, tail latency and retry overhead of review_chapters, for
+tuning MAX_CONCURRENT_CALLS and the rate limits without any requests
+the chapters are copied to a temp dir, the times are simulated seconds
+
+python3 scripts/ai_review_benchmark.py --chapters 1-5 --concurrency 1,2,4,8
+python3 scripts/ai_review_benchmark.py --rate-limit-rate 0.1 --server-rpm 60
+"""  # noqa: INP001
+
+import argparse
+import contextlib
+import logging
+import math
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import ai_review
+from ai_llm_mock import SimulatedProvider
+
+
+class BenchmarkResult(NamedTuple):
+    """Measurements of a benchmark run."""
+
+    concurrency: int
+    chunks: int
+    chunks_failed: int
+    seconds: float
+    chars_per_second: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    first_output_p50: float  # time to first output of streamed calls
+    requests: int
+    errors: int
+    rate_limited: int
+    retry_overhead: float  # share of the call time not spent in successful requests
+
+    def __str__(self) -> str:  # noqa: D105
+        return (
+            f"{self.concurrency:>4} {self.chunks:>6} {self.chunks_failed:>6}"
+            f" {self.seconds:>8.1f} {self.chars_per_second:>8.0f}"
+            f" {self.latency_p50:>6.1f} {self.latency_p95:>6.1f}"
+            f" {self.latency_p99:>6.1f} {self.first_output_p50:>6.1f}"
+            f" {self.requests:>5} {self.errors:>5}"
+            f" {self.rate_limited:>5} {self.retry_overhead:>7.1%}"
+        )
+
+
+HEADER = (
+    "conc chunks failed  seconds  chars/s    p50    p95    p99  first  reqs  errs   429"
+    " overhead"
+)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Return the q-th percentile (nearest rank), 0 for no values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+def run_benchmark(
+    chapter_numbers: list[int],
+    max_workers: int,
+    speedup: float = 1.0,
+    **simulation: float | None,
+) -> BenchmarkResult:
+    """
+    Review the chapters by the simulated provider and return the measurements.
+
+    speedup: the simulated time runs faster than the real time
+    simulation: parameters of SimulatedProvider
+    """
+    llm_provider = SimulatedProvider(
+        clock=lambda: time.monotonic() * speedup,
+        sleep=lambda seconds: time.sleep(seconds / speedup),
+        **simulation,  # type: ignore[arg-type]
+    )
+    count_chars = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the .ai.tex files, cache and ledger are written to the temp dir
+        (Path(tmp_dir) / "chapters").mkdir()
+        for i in chapter_numbers:
+            p = Path("chapters") / f"hpmor-chapter-{i:03}.tex"
+            count_chars += len(p.read_text(encoding="utf-8"))
+            shutil.copy(p, Path(tmp_dir) / p)
+        with contextlib.chdir(tmp_dir):
+            # all chunks submitted, incl. failed ones
+            chunks = sum(
+                len(ai_review.ChapterReview(i).chunks_in) for i in chapter_numbers
+            )
+            time_start = llm_provider.clock()
+            ai_review.review_chapters(
+                chapter_numbers, llm_provider=llm_provider, max_workers=max_workers
+            )
+            seconds = llm_provider.clock() - time_start
+    latencies = llm_provider.call_latencies
+    time_calls = sum(latencies)
+    return BenchmarkResult(
+        concurrency=max_workers,
+        chunks=chunks,
+        chunks_failed=llm_provider.count_calls_failed,
+        seconds=seconds,
+        chars_per_second=count_chars / max(seconds, 1e-6),
+        latency_p50=percentile(latencies, 50),
+        latency_p95=percentile(latencies, 95),
+        latency_p99=percentile(latencies, 99),
+        first_output_p50=percentile(llm_provider.first_part_latencies, 50),
+        requests=llm_provider.count_requests,
+        errors=llm_provider.count_errors,
+        rate_limited=llm_provider.count_rate_limited,
+        retry_overhead=(
+            1 - llm_provider.request_seconds / time_calls if time_calls else 0.0
+        ),
+    )
+
+
+def parse_range(s: str) -> list[int]:
+    """Parse "1-5" or "1,3,7" to list of numbers."""
+    if "-" in s:
+        first, last = s.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(x) for x in s.split(",")]
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    arg_parser.add_argument("--chapters", default="1-5", help="e.g. 1-5 or 1,3,7")
+    arg_parser.add_argument("--concurrency", default="1,2,4,8")
+    arg_parser.add_argument("--speedup", type=float, default=10.0)
+    arg_parser.add_argument("--latency", type=float, default=1.0, help="median, s")
+    arg_parser.add_argument("--latency-sigma", type=float, default=0.5)
+    arg_parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    arg_parser.add_argument("--server-rpm", type=int, help="account limit")
+    arg_parser.add_argument("--server-tpm", type=int, help="account limit")
+    arg_parser.add_argument("--rpm", type=float, help="client limit")
+    arg_parser.add_argument("--tpm", type=float, help="client limit")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--no-stream", action="store_true")
+    arg_parser.add_argument("--verbose", action="store_true")
+    args = arg_parser.parse_args()
+
+    if not args.verbose:
+        # the failed chunks are logged with traceback
+        logging.getLogger().setLevel(logging.CRITICAL)
+    ai_review.STREAM = not args.no_stream
+
+    print(HEADER)
+    for max_workers in parse_range(args.concurrency):
+        result = run_benchmark(
+            parse_range(args.chapters),
+            max_workers,
+            args.speedup,
+            latency_median=args.latency,
+            latency_sigma=args.latency_sigma,
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            server_requests_per_minute=args.server_rpm,
+            server_tokens_per_minute=args.server_tpm,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            seed=args.seed,
+        )
+        print(result)
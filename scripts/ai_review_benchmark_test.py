@@ -0,0 +1,49 @@
+# ruff: noqa: D103, INP001, PLR2004
+"""Tests for ai_review_benchmark.py."""
+
+import contextlib
+from pathlib import Path
+
+from ai_review_benchmark import parse_range, percentile, run_benchmark
+
+
+def test_percentile() -> None:
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_parse_range() -> None:
+    assert parse_range("1-3") == [1, 2, 3]
+    assert parse_range("1,5") == [1, 5]
+
+
+def test_run_benchmark(tmp_path: Path) -> None:
+    (tmp_path / "chapters").mkdir()
+    (tmp_path / "chapters" / "hpmor-chapter-001.tex").write_text(
+        "% EN a\nDE a\n\n% EN b\nDE b\n", encoding="utf-8"
+    )
+    with contextlib.chdir(tmp_path):
+        result = run_benchmark(
+            [1], 2, speedup=1000, latency_median=0.5, rate_limit_rate=0.5, seed=1
+        )
+    assert result.chunks == 1
+    assert result.chunks_failed == 0
+    assert result.requests == result.rate_limited + 1
+    assert result.retry_overhead > 0
+    # the chapters are not changed
+    assert not (tmp_path / "chapters" / "hpmor-chapter-001.ai.tex").exists()
+
+
+def test_run_benchmark_failed(tmp_path: Path) -> None:
+    (tmp_path / "chapters").mkdir()
+    (tmp_path / "chapters" / "hpmor-chapter-001.tex").write_text(
+        "% EN a\nDE a\n", encoding="utf-8"
+    )
+    with contextlib.chdir(tmp_path):
+        result = run_benchmark([1], 1, speedup=1000, error_rate=1.0, seed=1)
+    # failed chunks are part of the total
+    assert result.chunks == 1
+    assert result.chunks_failed == 1
@@ -0,0 +1,74 @@
+"""Glossary of the LLM review, filtered to the terms used in a chunk."""  # noqa: INP001
+
+import re
+from collections.abc import Iterable
+
+RE_PARENTHESES = re.compile(r"\([^)]*\)")
+RE_SPACE = re.compile(r"[\s~]+")  # ~ is a non-breaking space in LaTeX
+
+
+def _terms(s: str) -> list[str]:
+    """Return the terms to match of a glossary column."""
+    # "Nachwirkungen -> Nachspiel", "Dad (Papa)", "pop(s)"
+    return [
+        term
+        for alternative in s.split("->")
+        if (term := RE_SPACE.sub(" ", RE_PARENTHESES.sub("", alternative)).strip())
+    ]
+
+
+class Glossary:
+    """
+    Entries of the glossary csv, EN -> DE.
+
+    all EN and DE terms are matched by a single precompiled regex, case-insensitive
+    and as word prefix, so "Death Eater" matches "Death Eaters" and "death~eater"
+    text in parentheses is not matched, "->" separates alternatives
+    entries without letters, like quotation marks, are always used
+    """
+
+    def __init__(self, csv_text: str) -> None:  # noqa: D107
+        self.entries: list[tuple[str, str]] = []
+        for row in csv_text.strip().splitlines():
+            if not row.strip() or row.startswith(("==", "EN,DE")):
+                continue
+            parts = row.split(",", 1)
+            if len(parts) == 2 and parts[0].strip() and parts[1].strip():  # noqa: PLR2004
+                self.entries.append((parts[0].strip(), parts[1].strip()))
+
+        self.always: set[int] = set()
+        # lower case term -> entries
+        self.term_entries: dict[str, set[int]] = {}
+        for i, (en, de) in enumerate(self.entries):
+            if not any(c.isalpha() for c in en + de):
+                self.always.add(i)
+                continue
+            for term in _terms(en) + _terms(de):
+                self.term_entries.setdefault(term.lower(), set()).add(i)
+        # longest first, so "Most Ancient Hall" is preferred to "Most Ancient"
+        terms = sorted(self.term_entries, key=len, reverse=True)
+        self.matcher = re.compile(
+            r"(?<!\w)(?:"
+            + "|".join(re.escape(t).replace(r"\ ", r"[\s~]+") for t in terms)
+            + ")",
+            flags=re.IGNORECASE,
+        )
+
+    def entries_used(self, text: str) -> set[int]:
+        """Return the entries whose EN or DE term occurs in text."""
+        used = set(self.always)
+        for m in self.matcher.finditer(text):
+            used |= self.term_entries[RE_SPACE.sub(" ", m.group(0)).lower()]
+        return used
+
+    def format(self, indices: Iterable[int] | None = None) -> str:
+        """Format the entries clearly for the LLM, all if indices is None."""
+        entries = (
+            self.entries if indices is None else [self.entries[i] for i in indices]
+        )
+        # duplicates removed, keeping the order of the csv
+        return "\n".join(dict.fromkeys(f"  {en} → {de}" for en, de in entries))
+
+    def format_used(self, text: str) -> str:
+        """Format the entries used in text, in the order of the csv."""
+        return self.format(sorted(self.entries_used(text)))
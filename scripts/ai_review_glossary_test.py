@@ -0,0 +1,50 @@
+# ruff: noqa: D103, INP001
+"""Tests for ai_review_glossary.py."""
+
+from ai_review_glossary import Glossary
+
+CSV = """EN,DE
+==,==
+“...”,„...“
+Death Eater,Todesser
+Most Ancient Hall,Ältestenhalle
+Most Ancient,Altehrwürdig
+aftermath,Nachwirkungen -> Nachspiel
+dad,Dad (Papa)
+Cloak of Invisibility,Tarnumhang
+invisibility cloak,Tarnumhang
+"""
+
+
+def test_entries() -> None:
+    glossary = Glossary(CSV)
+    assert glossary.entries[0] == ("“...”", "„...“")
+    assert len(glossary.entries) == 8  # noqa: PLR2004
+    assert glossary.format([1, 5]) == "  Death Eater → Todesser\n  dad → Dad (Papa)"
+
+
+def test_entries_used() -> None:
+    glossary = Glossary(CSV)
+    # quotation marks are always used
+    assert glossary.entries_used("nothing") == {0}
+    # prefix, case and LaTeX spaces
+    assert glossary.entries_used("two death~eaters") == {0, 1}
+    assert glossary.entries_used("Die Todesser\nkamen") == {0, 1}
+    # longest term first, words only
+    assert glossary.entries_used("the Most Ancient Hall") == {0, 2}
+    assert glossary.entries_used("granddad") == {0}
+    # alternatives, but not the text in parentheses
+    assert glossary.entries_used("das Nachspiel") == {0, 4}
+    assert glossary.entries_used("Papa") == {0}
+    # same term of several entries
+    assert glossary.entries_used("ein Tarnumhang") == {0, 6, 7}
+
+
+def test_format_used() -> None:
+    glossary = Glossary(CSV)
+    assert glossary.format_used("Dad und der Tarnumhang") == (
+        "  “...” → „...“\n"
+        "  dad → Dad (Papa)\n"
+        "  Cloak of Invisibility → Tarnumhang\n"
+        "  invisibility cloak → Tarnumhang"
+    )
@@ -0,0 +1,68 @@
+"""Ledger of the paragraphs reviewed by LLM."""  # noqa: INP001
+
+import datetime as dt
+import hashlib
+import json
+from pathlib import Path
+
+
+def paragraph_key(block: list[str]) -> str | None:
+    """
+    Return hash of the DE paragraph of a block, None if it has none.
+
+    comment lines (EN original) and empty lines are ignored
+    """
+    paragraph = "\n".join(
+        line.strip()
+        for line in block
+        if line.strip() and not line.lstrip().startswith("%")
+    )
+    if not paragraph:
+        return None
+    return hashlib.sha256(paragraph.encode()).hexdigest()
+
+
+class ReviewLedger:
+    """
+    Paragraphs reviewed by model and prompt, stored in a json file.
+
+    the paragraphs sent to the LLM and the paragraphs it returned are recorded,
+    so a paragraph is known as reviewed, until it is edited or the prompt changed
+    """
+
+    def __init__(self, p: Path, model: str, instruction: str) -> None:  # noqa: D107
+        self.p = p
+        self.model = model
+        self.prompt = hashlib.sha256(instruction.encode()).hexdigest()[:16]
+        self.data: dict[str, dict[str, str]] = (
+            json.loads(p.read_text(encoding="utf-8")) if p.is_file() else {}
+        )
+
+    def is_reviewed(self, block: list[str]) -> bool:
+        """Return True, if the block has no paragraph or was reviewed before."""
+        key = paragraph_key(block)
+        if key is None:
+            return True
+        entry = self.data.get(key)
+        return (
+            entry is not None
+            and entry["model"] == self.model
+            and entry["prompt"] == self.prompt
+        )
+
+    def add(self, blocks: list[list[str]]) -> None:
+        """Record blocks as reviewed."""
+        date_str = dt.datetime.now(dt.UTC).date().isoformat()
+        for block in blocks:
+            key = paragraph_key(block)
+            if key is not None:
+                self.data[key] = {
+                    "model": self.model,
+                    "prompt": self.prompt,
+                    "date": date_str,
+                }
+
+    def save(self) -> None:
+        """Save ledger to json file."""
+        self.p.parent.mkdir(parents=True, exist_ok=True)
+        self.p.write_text(json.dumps(self.data, indent=1), encoding="utf-8")
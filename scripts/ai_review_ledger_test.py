@@ -0,0 +1,26 @@
+# ruff: noqa: D103, INP001
+"""Tests for ai_review_ledger.py."""
+
+from pathlib import Path
+
+from ai_review_ledger import ReviewLedger, paragraph_key
+
+
+def test_paragraph_key() -> None:
+    assert paragraph_key(["% EN", ""]) is None
+    assert paragraph_key(["% EN", "DE", ""]) == paragraph_key(["% EN 2", " DE"])
+    assert paragraph_key(["% EN", "DE"]) != paragraph_key(["% EN", "DE 2"])
+
+
+def test_ledger(tmp_path: Path) -> None:
+    p = tmp_path / "ledger.json"
+    ledger = ReviewLedger(p, "model", "prompt")
+    assert ledger.is_reviewed(["% EN"])
+    assert not ledger.is_reviewed(["% EN", "DE"])
+    ledger.add([["% EN", "DE"]])
+    assert ledger.is_reviewed(["% EN", "DE", ""])
+    ledger.save()
+    assert ReviewLedger(p, "model", "prompt").is_reviewed(["DE"])
+    # other model or prompt
+    assert not ReviewLedger(p, "model2", "prompt").is_reviewed(["DE"])
+    assert not ReviewLedger(p, "model", "prompt2").is_reviewed(["DE"])
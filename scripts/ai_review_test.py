@@ -0,0 +1,231 @@
+# ruff: noqa: D103, INP001
+"""Tests for ai_review.py."""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import ai_review
+import pytest
+from ai_llm_provider import MockProvider, Usage
+from ai_review import (
+    ChapterReview,
+    estimate_tokens,
+    instruction_for,
+    review_chapters,
+    review_chapters_batch,
+    review_chunk,
+    split_into_blocks,
+    split_into_chunks,
+)
+from ai_review_ledger import ReviewLedger
+
+
+@pytest.fixture
+def chapter_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    (tmp_path / "chapters").mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ai_review, "LLM_PROVIDER", "Mock")
+    monkeypatch.setattr(ai_review, "MAX_LINES_PER_LLM_CALL", 2)
+    return tmp_path / "chapters"
+
+
+def test_estimate_tokens() -> None:
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("12345678") == 3  # noqa: PLR2004
+    assert estimate_tokens("äöüß") == 3  # noqa: PLR2004
+
+
+def test_instruction_for(monkeypatch: pytest.MonkeyPatch) -> None:
+    instruction = instruction_for("Harry und die Todesser")
+    assert instruction.startswith(ai_review.PROMPT)
+    assert "Death Eater → Todesser" in instruction
+    assert len(instruction) < len(ai_review.INSTRUCTION)
+    monkeypatch.setattr(ai_review, "FILTER_GLOSSARY", False)
+    assert instruction_for("x") == ai_review.INSTRUCTION
+
+
+def test_split_into_blocks() -> None:
+    lines = ["% EN a", "DE a", "", "", "% EN b", "DE b", "", "c"]
+    assert split_into_blocks(lines) == [
+        ["% EN a", "DE a", "", ""],
+        ["% EN b", "DE b", ""],
+        ["c"],
+    ]
+
+
+def test_split_into_chunks() -> None:
+    lines = ["a", "b", "", "c", "d", "e", "", "f"]
+    assert split_into_chunks(lines, 100, 4) == ["a\nb\n", "c\nd\ne\n", "f"]
+    # by tokens
+    assert split_into_chunks(lines, 4, 100) == ["a\nb\n", "c\nd\ne\n", "f"]
+    assert split_into_chunks(lines, 7, 100) == ["a\nb\n\nc\nd\ne\n", "f"]
+    # blocks are not split
+    assert split_into_chunks(lines, 1, 1) == ["a\nb\n", "c\nd\ne\n", "f"]
+
+
+def test_chapter_review_in_order(chapter_dir: Path) -> None:
+    (chapter_dir / "hpmor-chapter-001.tex").write_text("a\n\nb\n\nc", encoding="utf-8")
+    review = ChapterReview(1)
+    assert review.chunks_in == ["a\n", "b\n", "c"]
+    p_out = chapter_dir / "hpmor-chapter-001.ai.tex"
+    review.add_result(1, "B\n", 1)
+    assert not p_out.exists()
+    review.add_result(0, "A\n", 1)
+    assert p_out.read_text(encoding="utf-8") == "A\n\nB\n"
+    assert not review.done
+    review.add_result(2, "C", 1)
+    assert p_out.read_text(encoding="utf-8") == "A\n\nB\n\nC"
+    assert review.done
+    assert review.tokens_used_total == 3  # noqa: PLR2004
+
+
+def test_chapter_review_stream(chapter_dir: Path) -> None:
+    (chapter_dir / "hpmor-chapter-001.tex").write_text("a\n\nb\n\nc", encoding="utf-8")
+    review = ChapterReview(1)
+    p_out = chapter_dir / "hpmor-chapter-001.ai.tex"
+    # only the next chunk is streamed
+    review.stream(1, "B")
+    assert not p_out.exists()
+    review.stream(0, "A")
+    review.stream(0, "A x")
+    assert p_out.read_text(encoding="utf-8") == "A x"
+    # retried response
+    review.stream(0, "A")
+    assert p_out.read_text(encoding="utf-8") == "A"
+    review.add_result(0, "A\n", 1)
+    review.stream(1, "B")
+    assert p_out.read_text(encoding="utf-8") == "A\n\nB"
+    review.stream(1, "B\n")
+    assert p_out.read_text(encoding="utf-8") == "A\n\nB\n"
+    review.add_result(2, "C", 1)
+    review.add_result(1, "B\n", 1)
+    assert p_out.read_text(encoding="utf-8") == "A\n\nB\n\nC"
+
+
+def test_chapter_review_discard_stream(chapter_dir: Path) -> None:
+    (chapter_dir / "hpmor-chapter-001.tex").write_text("a\n\nb", encoding="utf-8")
+    review = ChapterReview(1)
+    p_out = chapter_dir / "hpmor-chapter-001.ai.tex"
+    review.stream(0, "A")
+    review.discard_stream(0)
+    assert not p_out.exists()
+    review.add_result(0, "A\n", 1)
+    review.stream(1, "B")
+    assert p_out.read_text(encoding="utf-8") == "A\n\nB"
+    review.discard_stream(1)
+    assert p_out.read_text(encoding="utf-8") == "A\n"
+
+
+def test_review_chunk_stream_aborted(
+    chapter_dir: Path,  # noqa: ARG001
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    texts: list[str] = []
+    # the mock keeps one of the two comments
+    chunk_in = "% EN a\nDE a\n\n% EN b\nDE b\n"
+    chunk_out, _, reviewed = review_chunk(
+        MockProvider(), "x", 0, 1, chunk_in, on_stream=texts.append
+    )
+    assert reviewed
+    assert chunk_out == f"Mocked {chunk_in} response"
+    assert texts[0] == "Mocked "
+    assert texts[-1] == chunk_out
+    # the mocked response is always too long
+    monkeypatch.setattr(ai_review, "MAX_OUTPUT_RATIO", -1000)
+    assert review_chunk(MockProvider(), "x", 0, 1, chunk_in) == (chunk_in, 0, False)
+
+
+def test_review_chapters(chapter_dir: Path) -> None:
+    for i in (1, 2):
+        (chapter_dir / f"hpmor-chapter-00{i}.tex").write_text(
+            f"% EN {i}\nDE {i}\n\nx\n", encoding="utf-8"
+        )
+    review_chapters([1, 2])
+    assert (chapter_dir / "hpmor-chapter-002.ai.tex").read_text(encoding="utf-8") == (
+        "Mocked % EN 2\nDE 2\n response\nMocked x\n response"
+    )
+
+
+def test_review_chapters_batch(
+    chapter_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ai_review, "BATCH_POLL_INTERVAL", 0)
+    for i in (1, 2):
+        (chapter_dir / f"hpmor-chapter-00{i}.tex").write_text(
+            f"% EN {i}\nDE {i}\n\nx\n", encoding="utf-8"
+        )
+    review_chapters_batch([1, 2])
+    assert (chapter_dir / "hpmor-chapter-002.ai.tex").read_text(encoding="utf-8") == (
+        "Mocked % EN 2\nDE 2\n response\nMocked x\n response"
+    )
+    assert len(list((chapter_dir.parent / "tmp/ai-batch").glob("*.jsonl"))) == 3  # noqa: PLR2004
+
+
+class FailingProvider(MockProvider):
+    """Mock failing for the prompt "b", while streaming."""
+
+    def request_stream(  # noqa: D102
+        self, model: str, instruction: str, prompt: str
+    ) -> Iterator[str | Usage]:
+        for part in super().request_stream(model, instruction, prompt):
+            yield part
+            if prompt.startswith("b"):
+                # after the first part
+                msg = "failed"
+                raise ValueError(msg)
+
+
+def test_review_chapters_chunk_failed(chapter_dir: Path) -> None:
+    (chapter_dir / "hpmor-chapter-001.tex").write_text(
+        "a\n\nb\n\nc\n\nd", encoding="utf-8"
+    )
+    review_chapters([1], llm_provider=FailingProvider())
+    # the failed chunk is kept unchanged
+    assert (chapter_dir / "hpmor-chapter-001.ai.tex").read_text(encoding="utf-8") == (
+        "Mocked a\n response\nb\n\nMocked c\n response\nMocked d response"
+    )
+
+
+def test_review_changed_only(
+    chapter_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ai_review, "REVIEW_CHANGED_ONLY", True)
+    monkeypatch.setattr(ai_review, "MAX_LINES_PER_LLM_CALL", 100)
+    p = chapter_dir / "hpmor-chapter-001.tex"
+    p_out = chapter_dir / "hpmor-chapter-001.ai.tex"
+    p.write_text("% EN a\nDE a\n\n% EN b\nDE b\n\n% EN c\nDE c\n", encoding="utf-8")
+    review_chapters([1])
+    assert p_out.read_text(encoding="utf-8") == (
+        "Mocked % EN a\nDE a\n\n% EN b\nDE b\n\n% EN c\nDE c\n response"
+    )
+    # only the edited paragraphs are sent
+    p.write_text(
+        "% EN a\nDE a\n\n% EN b\nDE b edited\n\n% EN c\nDE c edited\n",
+        encoding="utf-8",
+    )
+    review_chapters([1])
+    assert p_out.read_text(encoding="utf-8") == (
+        "% EN a\nDE a\n\nMocked % EN b\nDE b edited\n\n% EN c\nDE c edited\n response"
+    )
+    # nothing to review
+    p_out.unlink()
+    review_chapters([1])
+    assert not p_out.exists()
+
+
+def test_review_no_ledger(chapter_dir: Path) -> None:
+    (chapter_dir / "hpmor-chapter-001.tex").write_text("a\n\nb", encoding="utf-8")
+    review_chapters([1])
+    # the ledger is only used with REVIEW_CHANGED_ONLY
+    assert ai_review.LEDGER_FILE is not None
+    assert not ai_review.LEDGER_FILE.exists()
+
+
+def test_failed_review_not_in_ledger(chapter_dir: Path) -> None:
+    (chapter_dir / "hpmor-chapter-001.tex").write_text("a\n\nb", encoding="utf-8")
+    ledger = ReviewLedger(chapter_dir / "ledger.json", "m", "i")
+    review = ChapterReview(1, ledger)
+    review.add_result(0, "A\n", 1)
+    review.add_result(1, "b", 0, reviewed=False)
+    assert ledger.is_reviewed(["a", ""])
+    assert not ledger.is_reviewed(["b"])
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+"""
+Daemon watching the chapter files, to give feedback on edits in milliseconds.
+
+keeps the rules of check_chapters.py and the chapters in memory and checks
+only the chapter files that were changed
+chapters requested via preview are rendered again on each change
+the daemon is queried via a unix socket, using the same script as client
+
+python3 scripts/chapters_daemon.py start    (runs until stop or Ctrl+C)
+python3 scripts/chapters_daemon.py status   (files with issues)
+python3 scripts/chapters_daemon.py check chapters/hpmor-chapter-005.tex
+python3 scripts/chapters_daemon.py preview 5
+python3 scripts/chapters_daemon.py stop
+"""
+
+import argparse
+import difflib
+import json
+import selectors
+import socket
+import sys
+import time
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+from check_chapters import fix_text, get_list_of_chapter_files
+
+socket_file = Path("tmp/chapters-daemon.sock")
+
+POLL_INTERVAL = 0.2  # seconds
+TIMEOUT = 60  # seconds, for the client, a preview might need a while
+
+
+class ChapterState:
+    """Content and check result of a chapter file."""
+
+    __slots__ = ("cont", "cont_new", "mtime_ns")
+
+    def __init__(self, mtime_ns: int, cont: str, cont_new: str) -> None:  # noqa: D107
+        self.mtime_ns = mtime_ns
+        self.cont = cont
+        self.cont_new = cont_new
+
+    @property
+    def issues_found(self) -> bool:
+        """True, if the check proposes changes."""
+        return self.cont_new != self.cont
+
+    def delta(self) -> str:
+        """Proposed changes, like printed by check_chapters.py."""
+        diff = difflib.ndiff(
+            self.cont.splitlines(keepends=True), self.cont_new.splitlines(keepends=True)
+        )
+        return "".join(x for x in diff if x.startswith(("+ ", "- ")))
+
+
+class ChaptersDaemon:
+    """Watch the chapter files and answer requests."""
+
+    def __init__(self) -> None:  # noqa: D107
+        self.chapters: dict[Path, ChapterState] = {}
+        self.previews: dict[int, str] = {}  # chapter number -> last result
+        self.css: str | None = None
+        self.cache: dict[str, dict] = {}  # flatten cache of the preview
+        self.hpmor_mtime_ns = 0
+        self.files: list[Path] = []
+        self.running = False
+
+    def update(self) -> list[Path]:
+        """Check changed chapter files, return the changed files."""
+        mtime_ns = Path("hpmor.tex").stat().st_mtime_ns
+        if mtime_ns != self.hpmor_mtime_ns:
+            self.hpmor_mtime_ns = mtime_ns
+            self.files = get_list_of_chapter_files()
+            for p in set(self.chapters) - set(self.files):
+                del self.chapters[p]
+        changed: list[tuple[Path, int, str]] = []
+        for p in self.files:
+            try:
+                mtime_ns = p.stat().st_mtime_ns
+            except FileNotFoundError:
+                self.chapters.pop(p, None)
+                continue
+            state = self.chapters.get(p)
+            if state is not None and state.mtime_ns == mtime_ns:
+                continue
+            cont = p.read_text(encoding="utf-8")
+            if state is not None and state.cont == cont:
+                # touched only
+                state.mtime_ns = mtime_ns
+                continue
+            changed.append((p, mtime_ns, cont))
+        if len(changed) > 1:
+            # on start all files are checked, using multiprocessing
+            num_processes = min(cpu_count(), len(changed))
+            with Pool(processes=num_processes) as pool:
+                results = pool.map(fix_text, [cont for _, _, cont in changed])
+        else:
+            results = [fix_text(cont) for _, _, cont in changed]
+        for (p, mtime_ns, cont), cont_new in zip(changed, results, strict=True):
+            self.chapters[p] = ChapterState(mtime_ns, cont, cont_new)
+        return [p for p, _, _ in changed]
+
+    def on_change(self, changed: list[Path]) -> None:
+        """Print results of the changed files and render their previews."""
+        for p in changed:
+            state = self.chapters[p]
+            print(f"{p.name}: {'issues found!' if state.issues_found else 'ok'}")
+            m = p.stem.removeprefix("hpmor-chapter-")
+            if m.isdigit() and int(m) in self.previews:
+                self.preview(int(m))
+
+    def preview(self, number: int) -> str:
+        """Render the html preview of a chapter, return its path and time."""
+        # the ebook modules are imported on first use only
+        ebook_dir = str(Path("scripts/ebook").resolve())
+        if ebook_dir not in sys.path:
+            sys.path.insert(0, ebook_dir)
+        from preview import preview_chapter  # noqa: PLC0415
+
+        if self.css is None:
+            self.css = Path("scripts/ebook/html.css").read_text(encoding="utf-8")
+        time_start = time.time()
+        try:
+            target = preview_chapter(number, self.css, self.cache)
+        except (Exception, SystemExit) as e:  # noqa: BLE001
+            # keep the daemon running, the chapter might be fixed with the next save
+            # step_6.parse_html exits on malformed html
+            result = f"ERROR: {e}"
+        else:
+            result = f"{target} ({time.time() - time_start:.2f}s)"
+        self.previews[number] = result
+        print(result)
+        return result
+
+    def handle(self, request: dict) -> dict:  # noqa: PLR0911
+        """Answer a request of the client."""
+        cmd = request.get("cmd")
+        if cmd == "status":
+            issues = [str(p) for p, s in self.chapters.items() if s.issues_found]
+            return {"ok": True, "files": len(self.chapters), "issues": issues}
+        if cmd == "check":
+            state = self.chapters.get(Path(request["file"]))
+            if state is None:
+                return {"ok": False, "error": f"{request['file']} is not watched"}
+            return {
+                "ok": True,
+                "issues_found": state.issues_found,
+                "delta": state.delta(),
+            }
+        if cmd == "preview":
+            number = int(request["chapter"])
+            if not Path(f"chapters/hpmor-chapter-{number:03d}.tex").is_file():
+                return {"ok": False, "error": f"chapter {number} not found"}
+            return {"ok": True, "result": self.preview(number)}
+        if cmd == "stop":
+            self.running = False
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown command {cmd}"}
+
+    def _serve_client(self, server: socket.socket) -> None:
+        conn, _ = server.accept()
+        with conn, conn.makefile("rwb") as fh:
+            conn.settimeout(TIMEOUT)
+            try:
+                response = self.handle(json.loads(fh.readline()))
+            except (ValueError, KeyError, OSError) as e:
+                response = {"ok": False, "error": repr(e)}
+            fh.write(json.dumps(response).encode() + b"\n")
+
+    def serve(self, p: Path = socket_file) -> None:
+        """Watch the chapter files and answer requests, until stopped."""
+        time_start = time.time()
+        self.update()
+        print(
+            f"{len(self.chapters)} chapters checked ({time.time() - time_start:.1f}s),"
+            f" listening on {p}"
+        )
+        p.parent.mkdir(exist_ok=True)
+        p.unlink(missing_ok=True)
+        with (
+            socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server,
+            selectors.DefaultSelector() as sel,
+        ):
+            server.bind(str(p))
+            server.listen()
+            sel.register(server, selectors.EVENT_READ)
+            self.running = True
+            try:
+                while self.running:
+                    # checking the changes first, so requests get fresh results
+                    if changed := self.update():
+                        self.on_change(changed)
+                    if sel.select(timeout=POLL_INTERVAL):
+                        self._serve_client(server)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                p.unlink(missing_ok=True)
+
+
+def query(request: dict, p: Path = socket_file) -> dict:
+    """Send a request to the daemon and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(TIMEOUT)
+        client.connect(str(p))
+        with client.makefile("rwb") as fh:
+            fh.write(json.dumps(request).encode() + b"\n")
+            fh.flush()
+            return json.loads(fh.readline())
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    arg_parser.add_argument(
+        "cmd", choices=("start", "status", "check", "preview", "stop")
+    )
+    arg_parser.add_argument("arg", nargs="?", help="file for check, number for preview")
+    args = arg_parser.parse_args()
+
+    if args.cmd == "start":
+        ChaptersDaemon().serve()
+        sys.exit()
+
+    request: dict = {"cmd": args.cmd}
+    if args.cmd in ("check", "preview"):
+        if args.arg is None:
+            arg_parser.error(f"{args.cmd} needs an argument")
+        request["file" if args.cmd == "check" else "chapter"] = args.arg
+    try:
+        response = query(request)
+    except OSError:
+        print("daemon not running, start via: python3 scripts/chapters_daemon.py start")
+        sys.exit(1)
+
+    if not response["ok"]:
+        print(f"ERROR: {response['error']}")
+        sys.exit(1)
+    if args.cmd == "status":
+        print(
+            f"{response['files']} files watched, {len(response['issues'])} with issues"
+        )
+        print("\n".join(response["issues"]))
+    elif args.cmd == "check":
+        print(response["delta"] if response["issues_found"] else "ok")
+    elif args.cmd == "preview":
+        print(response["result"])
@@ -0,0 +1,62 @@
+# ruff: noqa: D103, INP001
+"""Tests for chapters_daemon.py."""
+
+import sys
+import types
+from pathlib import Path
+from unittest import mock
+
+from chapters_daemon import ChaptersDaemon, ChapterState
+from check_chapters import fix_text
+from check_chapters_settings import settings
+
+
+def state_of(cont: str) -> ChapterState:
+    return ChapterState(0, cont, fix_text(cont))
+
+
+def test_chapter_state() -> None:
+    settings["lang"] = "DE"
+    state = state_of("Text\n")
+    assert state.issues_found is False
+    assert state.delta() == ""
+    state = state_of("Text  mit Leerzeichen\n% Kommentar  bleibt\n")
+    assert state.issues_found is True
+    assert state.delta() == "- Text  mit Leerzeichen\n+ Text mit Leerzeichen\n"
+
+
+def test_handle() -> None:
+    settings["lang"] = "DE"
+    daemon = ChaptersDaemon()
+    daemon.chapters[Path("chapters/a.tex")] = state_of("Text\n")
+    daemon.chapters[Path("chapters/b.tex")] = state_of("Text  b\n")
+    assert daemon.handle({"cmd": "status"}) == {
+        "ok": True,
+        "files": 2,
+        "issues": [str(Path("chapters/b.tex"))],
+    }
+    assert daemon.handle({"cmd": "check", "file": "chapters/a.tex"}) == {
+        "ok": True,
+        "issues_found": False,
+        "delta": "",
+    }
+    assert daemon.handle({"cmd": "check", "file": "chapters/c.tex"})["ok"] is False
+    assert daemon.handle({"cmd": "preview", "chapter": "999"})["ok"] is False
+    assert daemon.handle({"cmd": "foo"})["ok"] is False
+    daemon.running = True
+    assert daemon.handle({"cmd": "stop"}) == {"ok": True}
+    assert daemon.running is False
+
+
+def test_preview_error() -> None:
+    def preview_chapter(number: int, css: str, cache: dict) -> Path:  # noqa: ARG001
+        sys.exit(1)
+
+    daemon = ChaptersDaemon()
+    daemon.css = ""
+    with mock.patch.dict(
+        sys.modules, {"preview": types.SimpleNamespace(preview_chapter=preview_chapter)}
+    ):
+        # the daemon keeps running
+        assert daemon.preview(5) == "ERROR: 1"
+    assert daemon.previews[5] == "ERROR: 1"
@@ -82,30 +82,9 @@ def process_file(file_in: Path) -> bool:
     returns issues_found = True if we have a finding
     a proposed fix is written to chapters/*-autofix.tex
     """
-    issues_found = False
     cont = file_in.read_text(encoding="utf-8")
-
-    cont_orig = cont
-    cont = multiline_check(s=cont_orig)
-    if cont != cont_orig:
-        issues_found = True
-    del cont_orig
-
-    # now split per line
-    cont_lines_orig = cont.split("\n")
-    del cont
-    cont_lines_new: list[str] = []
-    for line in cont_lines_orig:
-        line_orig = line
-        # keep commented-out lines as they are
-        if re.match(r"^\s*%", line):
-            cont_lines_new.append(line)
-        else:
-            # check not commented-out lines
-            line = fix_line(s=line)  # noqa: PLW2901
-            cont_lines_new.append(line)
-            if issues_found is False and line_orig != line:
-                issues_found = True
+    cont_new = fix_text(cont)
+    issues_found = cont_new != cont
     if issues_found:
         # write proposal to *-autofix.tex
         print(" issues found!")
@@ -117,7 +96,7 @@ def process_file(file_in: Path) -> bool:
             issues_found = False
 
         with file_out.open(mode="w", encoding="utf-8", newline="\n") as fh:
-            fh.write("\n".join(cont_lines_new))
+            fh.write(cont_new)
 
         if settings["print_diff"]:
             with (
@@ -131,6 +110,24 @@ def process_file(file_in: Path) -> bool:
     return issues_found
 
 
+def fix_text(s: str) -> str:
+    """
+    Apply all checks to the content of a file.
+
+    returns the fixed content, commented-out lines are kept as they are
+    """
+    s = multiline_check(s=s)
+    cont_lines_new: list[str] = []
+    for line in s.split("\n"):
+        # keep commented-out lines as they are
+        if re.match(r"^\s*%", line):
+            cont_lines_new.append(line)
+        else:
+            # check not commented-out lines
+            cont_lines_new.append(fix_line(s=line))
+    return "\n".join(cont_lines_new)
+
+
 def fix_line(s: str) -> str:
     """Apply all fix functions to each line."""
     # simple and safe
@@ -0,0 +1,128 @@
+# by Torben Menke https://entorb.net
+# ruff: noqa: INP001
+
+r"""
+Structure of the book: book -> parts -> chapters.
+
+built from the \part and \include lines of hpmor.tex or hpmor-1.tex etc.
+the chapter files are only read when their body is accessed
+"""
+
+import hashlib
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+from step_2 import remove_comments
+
+# hpmor root dir, independent of the working dir
+ROOT_DIR = Path(__file__).parents[2]
+
+
+class Chapter:
+    """A chapter file, its body is read on first access."""
+
+    __slots__ = ("_body", "path")
+
+    def __init__(self, path: Path) -> None:  # noqa: D107
+        self.path = path
+        self._body: str | None = None
+
+    def __repr__(self) -> str:  # noqa: D105
+        return f"Chapter({self.path.as_posix()!r})"
+
+    @property
+    def name(self) -> str:
+        """File name without extension, like hpmor-chapter-001."""
+        return self.path.stem
+
+    @property
+    def number(self) -> int | None:
+        """Chapter number from file name, None for files like hp-exam."""
+        m = re.fullmatch(r"hpmor-chapter-(\d+)", self.name)
+        return int(m.group(1)) if m else None
+
+    @property
+    def numbered(self) -> bool:
+        r"""True for a numbered \chapter, False for \chapter* like the foreword."""
+        return (
+            re.search(
+                r"\\(?:chapter|partchapter|namedpartchapter)(?:\[[^\]]*\])?\{",
+                remove_comments(self.body),
+            )
+            is not None
+        )
+
+    @property
+    def body(self) -> str:
+        """LaTeX source of the chapter file."""
+        if self._body is None:
+            self._body = self.path.read_text(encoding="utf-8").replace("\r\n", "\n")
+        return self._body
+
+    @property
+    def digest(self) -> str:
+        """sha256 of the body, for caching of converted chapters."""
+        return hashlib.sha256(self.body.encode()).hexdigest()
+
+
+class Part:
+    r"""A \part of the book, number 0 for chapters before the first \part."""
+
+    __slots__ = ("chapters", "number", "title")
+
+    def __init__(self, number: int, title: str) -> None:  # noqa: D107
+        self.number = number
+        self.title = title
+        self.chapters: list[Chapter] = []
+
+    def __repr__(self) -> str:  # noqa: D105
+        return f"Part({self.number}, {self.title!r}, {len(self.chapters)} chapters)"
+
+
+class Book:
+    """The book, as list of parts."""
+
+    __slots__ = ("parts", "path")
+
+    def __init__(self, path: Path, parts: list[Part]) -> None:  # noqa: D107
+        self.path = path
+        self.parts = parts
+
+    def __repr__(self) -> str:  # noqa: D105
+        return f"Book({self.path.as_posix()!r}, {len(self.parts)} parts)"
+
+    @property
+    def chapters(self) -> Iterator[Chapter]:
+        """All chapters of all parts."""
+        for part in self.parts:
+            yield from part.chapters
+
+    def part(self, number: int) -> Part:
+        """Return part by number, part 1-6 are the volumes hpmor-1 to -6."""
+        for part in self.parts:
+            if part.number == number:
+                return part
+        msg = f"part {number} not found in {self.path}"
+        raise KeyError(msg)
+
+
+def read_book(p: Path = ROOT_DIR / "hpmor.tex") -> Book:
+    r"""
+    Read the structure of the book from the \part and \include lines.
+
+    include paths are relative to the dir of p
+    commented lines are ignored, chapter files are not read
+    """
+    parts: list[Part] = []
+    part_number = 0
+    for line_raw in p.read_text(encoding="utf-8").splitlines():
+        line = re.sub(r"(?<!\\)%.*", "", line_raw)
+        if m := re.match(r"\s*\\part\{(.+)\}", line):
+            part_number += 1
+            parts.append(Part(part_number, m.group(1)))
+        elif m := re.match(r"\s*\\include\{(.+?)\}", line):
+            if not parts:
+                parts.append(Part(0, ""))
+            parts[-1].chapters.append(Chapter(p.parent / f"{m.group(1)}.tex"))
+    return Book(p, parts)
@@ -0,0 +1,77 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+import contextlib
+from pathlib import Path
+
+from book import read_book
+
+
+def _write(p: Path, s: str) -> None:
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(s, encoding="utf-8")
+
+
+def test_read_book(tmp_path: Path) -> None:
+    _write(
+        tmp_path / "book.tex",
+        """\\input{layout/title}
+\\include{chapters/hpmor-chapter-000}
+\\part{Teil A}
+\\include{chapters/hpmor-chapter-001}
+% \\include{chapters/hpmor-chapter-002}
+\\include{chapters/hp-exam} % comment
+\\part{Teil B}
+\\include{chapters/hpmor-chapter-003}
+""",
+    )
+    book = read_book(tmp_path / "book.tex")
+    assert [(p.number, p.title) for p in book.parts] == [
+        (0, ""),
+        (1, "Teil A"),
+        (2, "Teil B"),
+    ]
+    assert [c.name for c in book.chapters] == [
+        "hpmor-chapter-000",
+        "hpmor-chapter-001",
+        "hp-exam",
+        "hpmor-chapter-003",
+    ]
+    assert [c.number for c in book.part(1).chapters] == [1, None]
+    # chapter files are not read, they do not even exist
+    assert book.part(2).chapters[0].path == tmp_path / "chapters/hpmor-chapter-003.tex"
+
+
+def test_chapter(tmp_path: Path) -> None:
+    _write(tmp_path / "book.tex", "\\include{chapters/hpmor-chapter-001}\n")
+    _write(
+        tmp_path / "chapters/hpmor-chapter-001.tex",
+        """% \\chapter{Old}
+\\chapter[Kurz]{Titel}
+
+\\begin{chapterOpeningQuote}
+Zitat
+\\end{chapterOpeningQuote}
+% comment
+
+Absatz 1
+Zeile 2
+
+\\section{Abschnitt}
+""",
+    )
+    book = read_book(tmp_path / "book.tex")
+    assert [p.number for p in book.parts] == [0]
+    chapter = book.part(0).chapters[0]
+    assert chapter.numbered
+    digest = chapter.digest
+    assert digest == read_book(tmp_path / "book.tex").part(0).chapters[0].digest
+
+
+def test_read_book_hpmor(tmp_path: Path) -> None:
+    # independent of the working dir
+    with contextlib.chdir(tmp_path):
+        book = read_book()
+    assert [p.number for p in book.parts] == [0, 1, 2, 3, 4, 5, 6]
+    assert [p.chapters[0].number for p in book.parts[1:]] == [1, 22, 38, 64, 86, 100]
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+"""
+Compare two html files of the book, per chapter.
+
+the files are split into sections at the <h1> and <h2> headings, aligned by
+the heading text without its number, and split into paragraphs
+whitespace is normalized and each paragraph is hashed, so only sections with
+changed hashes are compared in detail, and renumbering or re-wrapping does
+not show up as change
+python3 scripts/ebook/html_diff.py hpmor-prev.html hpmor.html
+"""
+
+import difflib
+import hashlib
+import re
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+RE_HEADING = re.compile(r"<(h[12])\b[^>]*>(.*?)</\1>", flags=re.DOTALL)
+# paragraphs and other blocks start with one of these tags
+RE_BLOCK_START = re.compile(
+    r"(?=<(?:p|h[1-6]|div|hr|ul|ol|li|table|tr|blockquote|section)\b)"
+)
+RE_TAG = re.compile(r"<[^>]*>")
+RE_SPACE = re.compile(r"\s+")
+RE_NUMBER = re.compile(r"^\d+\. ")
+
+
+class Section(NamedTuple):
+    """Heading and paragraphs of a part or chapter."""
+
+    level: str  # h1, h2 or "" for front matter
+    title: str  # heading text
+    paragraphs: list[str]  # whitespace normalized html
+
+    @property
+    def key(self) -> str:
+        """Heading text without number, for aligning sections."""
+        return f"{self.level}:{RE_NUMBER.sub('', self.title)}"
+
+    @property
+    def hashes(self) -> list[str]:
+        """Hashes of the paragraphs."""
+        return [hashlib.sha256(p.encode()).hexdigest() for p in self.paragraphs]
+
+    @property
+    def digest(self) -> str:
+        """Hash of all paragraphs."""
+        return hashlib.sha256("".join(self.hashes).encode()).hexdigest()
+
+
+def _paragraphs(html: str) -> list[str]:
+    return [
+        p
+        for block in RE_BLOCK_START.split(html)
+        if (p := RE_SPACE.sub(" ", block).strip())
+    ]
+
+
+def split_sections(html: str) -> list[Section]:
+    """Split html at <h1> and <h2> headings into sections."""
+    sections = []
+    level, title, pos = "", "", 0
+    for m in RE_HEADING.finditer(html):
+        sections.append(Section(level, title, _paragraphs(html[pos : m.start()])))
+        level = m.group(1)
+        title = RE_SPACE.sub(" ", RE_TAG.sub("", m.group(2))).strip()
+        pos = m.end()
+    sections.append(Section(level, title, _paragraphs(html[pos:])))
+    return sections
+
+
+def _diff_paragraphs(old: Section, new: Section) -> Iterator[str]:
+    sm = difflib.SequenceMatcher(None, old.hashes, new.hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        if tag == "equal":
+            continue
+        yield from (f"- {p}" for p in old.paragraphs[i1:i2])
+        yield from (f"+ {p}" for p in new.paragraphs[j1:j2])
+
+
+def diff_sections(old: list[Section], new: list[Section]) -> Iterator[str]:
+    """Yield per section summary and changed paragraphs."""
+    sm = difflib.SequenceMatcher(
+        None, [s.key for s in old], [s.key for s in new], autojunk=False
+    )
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        if tag == "equal":
+            for s_old, s_new in zip(old[i1:i2], new[j1:j2], strict=True):
+                if s_old.digest == s_new.digest:
+                    continue
+                lines = list(_diff_paragraphs(s_old, s_new))
+                removed = sum(1 for line in lines if line.startswith("-"))
+                yield (
+                    f"=== {s_new.title or '(front matter)'}: "
+                    f"-{removed} +{len(lines) - removed} paragraphs"
+                )
+                yield from lines
+            continue
+        for s in old[i1:i2]:
+            yield f"=== {s.title or '(front matter)'}: removed"
+        for s in new[j1:j2]:
+            yield f"=== {s.title or '(front matter)'}: added"
+
+
+def diff_files(p_old: Path, p_new: Path) -> Iterator[str]:
+    """Yield the differences of two html files, nothing if equal."""
+    yield from diff_sections(
+        split_sections(p_old.read_text(encoding="utf-8")),
+        split_sections(p_new.read_text(encoding="utf-8")),
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:  # noqa: PLR2004
+        print(__doc__)
+        sys.exit(1)
+    p_old, p_new = Path(sys.argv[1]), Path(sys.argv[2])
+    is_equal = True
+    for line in diff_files(p_old, p_new):
+        is_equal = False
+        print(line)
+    if is_equal:
+        print(f"Files {p_old} and {p_new} have identical paragraphs")
@@ -0,0 +1,61 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+from pathlib import Path
+
+from html_diff import Section, diff_files, diff_sections, split_sections
+
+HTML = """<header><h1 class="title">Titel</h1></header>
+<h1>1. Teil</h1>
+<h2>1. Kapitel A</h2>
+<p>Eins
+zwei.</p>
+<p>Drei.</p>
+<h2>2. Kapitel B</h2>
+<p>Vier.</p>
+"""
+
+
+def test_split_sections() -> None:
+    sections = split_sections(HTML)
+    assert [(s.level, s.title) for s in sections] == [
+        ("", ""),
+        ("h1", "Titel"),
+        ("h1", "1. Teil"),
+        ("h2", "1. Kapitel A"),
+        ("h2", "2. Kapitel B"),
+    ]
+    assert sections[0].paragraphs == ["<header>"]
+    assert sections[3].paragraphs == ["<p>Eins zwei.</p>", "<p>Drei.</p>"]
+    assert sections[3].key == "h2:Kapitel A"
+
+
+def test_diff_sections_renumbered_and_rewrapped() -> None:
+    new = HTML.replace("<h2>2. Kapitel B", "<h2>3. Kapitel B").replace(
+        "Eins\nzwei", "Eins zwei"
+    )
+    assert list(diff_sections(split_sections(HTML), split_sections(new))) == []
+
+
+def test_diff_sections() -> None:
+    old = [Section("h2", "1. A", ["<p>a</p>", "<p>b</p>"]), Section("h2", "2. B", [])]
+    new = [Section("h2", "1. A", ["<p>a</p>", "<p>c</p>"]), Section("h2", "2. C", [])]
+    assert list(diff_sections(old, new)) == [
+        "=== 1. A: -1 +1 paragraphs",
+        "- <p>b</p>",
+        "+ <p>c</p>",
+        "=== 2. B: removed",
+        "=== 2. C: added",
+    ]
+
+
+def test_diff_files(tmp_path: Path) -> None:
+    p_old = tmp_path / "old.html"
+    p_new = tmp_path / "new.html"
+    p_old.write_text(HTML, encoding="utf-8")
+    p_new.write_text(HTML.replace("<p>Drei.</p>\n", ""), encoding="utf-8")
+    assert list(diff_files(p_old, p_new)) == [
+        "=== 1. Kapitel A: -1 +0 paragraphs",
+        "- <p>Drei.</p>",
+    ]
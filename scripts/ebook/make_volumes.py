@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+"""
+Make html and epub of the volumes hpmor-1 to hpmor-6.
+
+only the chapters of the volume, as listed in hpmor-1.tex etc., are converted
+the volumes are converted in parallel
+output: hpmor-1.html, hpmor-1.epub, ...
+
+python3 scripts/ebook/make_volumes.py      (all volumes)
+python3 scripts/ebook/make_volumes.py 2 3  (selected volumes)
+"""
+
+import argparse
+import re
+import subprocess
+import uuid
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+from book import read_book
+from lxml import etree  # pip install lxml
+from step_2 import cache_file, flatten, load_cache, save_cache
+from step_2 import source_file as ebook_source_file
+from step_3 import modify_tex
+from step_4 import parselify
+from step_6 import modify_html_streaming
+from step_7 import cover_file, html2epub
+
+VOLUMES = (1, 2, 3, 4, 5, 6)
+
+
+def chapters_tex(
+    ebook_tex: str, chapter_files: list[Path], part_title: str | None = None
+) -> str:
+    r"""
+    Create ebook .tex of selected chapter files.
+
+    keeps the preamble of hpmor-ebook.tex, and replaces its \part and \include
+    lines by the given \part and chapters
+    """
+    m = re.search(r"^\\(include|part)\{", ebook_tex, flags=re.MULTILINE)
+    assert m, "no chapters found"
+    preamble = ebook_tex[: m.start()]
+    lines = [] if part_title is None else [f"\\part{{{part_title}}}"]
+    lines.extend(f"\\include{{{p.with_suffix('').as_posix()}}}" for p in chapter_files)
+    return preamble + "\n".join(lines) + "\n\n\\end{document}\n"
+
+
+def volume_tex(volume: int, ebook_tex: str) -> str:
+    """Create ebook .tex of a volume, with the chapters of hpmor-<volume>.tex."""
+    part = read_book(ebook_source_file).part(volume)
+    chapters = read_book(Path(f"hpmor-{volume}.tex")).chapters
+    return chapters_tex(ebook_tex, [c.path for c in chapters], part.title)
+
+
+def volume_counters(volume: int) -> dict[str, int]:
+    """
+    Return the counters of step 6 for the volume.
+
+    h1: number of the last part before the volume
+    h2: index into volume_chapter_numbers
+    """
+    return {"h1": volume - 1, "h2": 0}
+
+
+def volume_chapter_numbers(volume: int) -> list[int]:
+    """
+    Return the numbers of the numbered chapters of the volume.
+
+    taken from the file names, like in the full book, as the volumes leave out
+    chapters, like chapter 11 (Omake)
+    """
+    chapters = read_book(Path(f"hpmor-{volume}.tex")).chapters
+    return [c.number for c in chapters if c.number is not None and c.numbered]
+
+
+def volume_book_id(volume: int) -> str:
+    """Return unique book id of the volume."""
+    return str(
+        uuid.uuid5(uuid.NAMESPACE_URL, f"https://github.com/entorb/hpmor-de/{volume}")
+    )
+
+
+def convert_volume(volume: int, cont: str, css: str) -> None:
+    """Convert flattened .tex of a volume to html and epub."""
+    tmp_dir = Path(f"tmp/hpmor-{volume}")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    # step 3 and 4
+    file_tex = tmp_dir / "hpmor-epub-4-flatten-parsel.tex"
+    file_tex.write_text(parselify(modify_tex(cont)), encoding="utf-8", newline="\n")
+    # step 5
+    file_html = tmp_dir / "hpmor-epub-5-html-unmod.html"
+    subprocess.run(  # noqa: S603
+        [  # noqa: S607
+            "sh",
+            "scripts/ebook/step_5.sh",
+            str(file_tex),
+            str(file_html),
+            f" - Buch {volume}",
+        ],
+        check=True,
+    )
+    # step 6
+    # streaming, as the volumes are converted in parallel
+    file_html_mod = Path(f"hpmor-{volume}.html")
+    with (
+        file_html.open(encoding="utf-8", newline="\n") as fh_in,
+        file_html_mod.open(mode="w", encoding="utf-8", newline="\n") as fh_out,
+    ):
+        toc = modify_html_streaming(
+            fh_in,
+            fh_out,
+            css,
+            volume_counters(volume),
+            volume_chapter_numbers(volume),
+        )
+    # step 7
+    root = etree.parse(file_html_mod, etree.HTMLParser(encoding="utf-8")).getroot()
+    cover = cover_file.read_bytes() if cover_file.is_file() else None
+    html2epub(root, toc, cover, Path(f"hpmor-{volume}.epub"), volume_book_id(volume))
+    print(f"hpmor-{volume}.epub")
+
+
+if __name__ == "__main__":
+    print("=== make volumes ===")
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "volumes",
+        nargs="*",
+        type=int,
+        choices=VOLUMES,
+        default=VOLUMES,
+        help="volumes to make, default all",
+    )
+    args = arg_parser.parse_args()
+
+    with Path("scripts/ebook/html.css").open(encoding="utf-8", newline="\n") as fh_in:
+        css = fh_in.read()
+    ebook_tex = ebook_source_file.read_text(encoding="utf-8")
+
+    # flattening is fast and shares the cache, so it is done before the pool
+    cache = load_cache(cache_file)
+    flattened = []
+    for volume in args.volumes:
+        file_tex = Path(f"tmp/hpmor-{volume}/hpmor-ebook.tex")
+        file_tex.parent.mkdir(parents=True, exist_ok=True)
+        file_tex.write_text(
+            volume_tex(volume, ebook_tex), encoding="utf-8", newline="\n"
+        )
+        flattened.append(flatten(file_tex, cache))
+    save_cache(cache_file, cache)
+
+    num_processes = min(cpu_count(), len(args.volumes))
+    with Pool(processes=num_processes) as pool:
+        pool.starmap(
+            convert_volume,
+            [(v, cont, css) for v, cont in zip(args.volumes, flattened, strict=True)],
+        )
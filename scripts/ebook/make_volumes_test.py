@@ -0,0 +1,56 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+import re
+from pathlib import Path
+
+from book import read_book
+from make_volumes import (
+    VOLUMES,
+    volume_book_id,
+    volume_chapter_numbers,
+    volume_counters,
+    volume_tex,
+)
+from step_2 import source_file
+
+
+def test_volume_tex() -> None:
+    ebook_tex = source_file.read_text(encoding="utf-8")
+    tex = volume_tex(4, ebook_tex)
+    assert tex.startswith(ebook_tex[: ebook_tex.index("\\include{chapters/")])
+    assert tex.endswith("\\end{document}\n")
+    assert re.findall(r"\\part\{(.*)\}", tex) == [
+        "Hermine Jean Granger und der Ruf des Phönix"
+    ]
+    includes = re.findall(r"\\include\{(.*)\}", tex)
+    assert includes[0] == "chapters/hpmor-chapter-064"
+    assert includes[-1] == "chapters/hpmor-chapter-085"
+    assert len(includes) == len(read_book().part(4).chapters)
+
+
+def test_volume_counters() -> None:
+    assert [volume_counters(v) for v in (1, 2, 6)] == [
+        {"h1": 0, "h2": 0},
+        {"h1": 1, "h2": 0},
+        {"h1": 5, "h2": 0},
+    ]
+
+
+def test_volume_chapter_numbers() -> None:
+    # numbered like in the full book, where step 6 counts the numbered chapters
+    full = [c.name for c in read_book().chapters if c.numbered]
+    numbers = {name: i for i, name in enumerate(full, start=1)}
+    for volume in VOLUMES:
+        chapters = read_book(Path(f"hpmor-{volume}.tex")).chapters
+        assert volume_chapter_numbers(volume) == [
+            numbers[c.name] for c in chapters if c.numbered
+        ]
+    # chapter 11 is left out of volume 1
+    assert volume_chapter_numbers(1) == [*range(1, 11), *range(12, 22)]
+    assert volume_chapter_numbers(2)[0] == 22  # noqa: PLR2004
+
+
+def test_volume_book_id() -> None:
+    assert volume_book_id(1) != volume_book_id(2)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+"""
+Preview of a single chapter as html.
+
+runs the ebook steps 2-6 on one chapter file, with the preamble of
+hpmor-ebook.tex, like latexmk -r latexmkrc does with chapter=N for the PDF
+output: tmp/preview/hpmor-chapter-<N>.html
+
+python3 scripts/ebook/preview.py --chapter 5
+python3 scripts/ebook/preview.py --chapter 5 --watch  (re-render on changes)
+"""
+
+import argparse
+import subprocess
+import time
+from pathlib import Path
+
+from make_volumes import chapters_tex
+from step_2 import cache_file, flatten, load_cache, save_cache
+from step_2 import source_file as ebook_source_file
+from step_3 import modify_tex
+from step_4 import parselify
+from step_6 import modify_html
+
+preview_dir = Path("tmp/preview")
+
+WATCH_INTERVAL = 0.5  # seconds
+
+
+def chapter_file(number: int) -> Path:
+    """Return path of chapter file."""
+    return Path(f"chapters/hpmor-chapter-{number:03d}.tex")
+
+
+def preview_chapter(number: int, css: str, cache: dict[str, dict]) -> Path:
+    """
+    Convert a single chapter to standalone html.
+
+    cache: flatten cache, only changed files are read again
+    returns the path of the html file
+    """
+    name = chapter_file(number).stem
+    preview_dir.mkdir(parents=True, exist_ok=True)
+    file_ebook_tex = preview_dir / f"{name}-ebook.tex"
+    file_ebook_tex.write_text(
+        chapters_tex(
+            ebook_source_file.read_text(encoding="utf-8"), [chapter_file(number)]
+        ),
+        encoding="utf-8",
+        newline="\n",
+    )
+    # step 2-4
+    cont = parselify(modify_tex(flatten(file_ebook_tex, cache)))
+    file_tex = preview_dir / f"{name}.tex"
+    file_tex.write_text(cont, encoding="utf-8", newline="\n")
+    # step 5
+    file_html = preview_dir / f"{name}-unmod.html"
+    subprocess.run(  # noqa: S603
+        ["sh", "scripts/ebook/step_5.sh", str(file_tex), str(file_html)],  # noqa: S607
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    # step 6, numbered like in the book
+    html, _toc = modify_html(
+        file_html.read_text(encoding="utf-8"), css, {"h1": 0, "h2": number - 1}
+    )
+    target = preview_dir / f"{name}.html"
+    target.write_text(html, encoding="utf-8", newline="\n")
+    return target
+
+
+def _render(number: int, css: str, cache: dict[str, dict]) -> None:
+    time_start = time.time()
+    try:
+        target = preview_chapter(number, css, cache)
+    except (subprocess.CalledProcessError, SystemExit) as e:
+        # keep watching, the chapter might be fixed with the next save
+        print(f"ERROR: {e}")
+        return
+    print(f"{target} ({time.time() - time_start:.2f}s)")
+
+
+def _mtime_ns(p: Path) -> int | None:
+    """Return modification time, None if the file is missing."""
+    try:
+        return p.stat().st_mtime_ns
+    except FileNotFoundError:
+        # some editors save by deleting and renaming
+        return None
+
+
+def watch(number: int, css: str, cache: dict[str, dict]) -> None:
+    """Re-render chapter, whenever it is saved, until Ctrl+C."""
+    p = chapter_file(number)
+    mtime = _mtime_ns(p)
+    print(f"watching {p}, stop via Ctrl+C")
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            mtime_new = _mtime_ns(p)
+            if mtime_new is not None and mtime_new != mtime:
+                mtime = mtime_new
+                _render(number, css, cache)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--chapter", type=int, required=True, help="number")
+    arg_parser.add_argument(
+        "--watch", action="store_true", help="re-render on changes of the chapter"
+    )
+    args = arg_parser.parse_args()
+    if not chapter_file(args.chapter).is_file():
+        arg_parser.error(f"{chapter_file(args.chapter)} not found")
+
+    with Path("scripts/ebook/html.css").open(encoding="utf-8", newline="\n") as fh_in:
+        css = fh_in.read()
+    cache = load_cache(cache_file)
+    _render(args.chapter, css, cache)
+    if args.watch:
+        watch(args.chapter, css, cache)
+    save_cache(cache_file, cache)
@@ -0,0 +1,96 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+import os
+import subprocess
+from pathlib import Path
+
+import preview
+import pytest
+from preview import _render, chapter_file, preview_chapter, watch
+
+HTML = """<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" lang="de">
+<head>
+<style>
+</style>
+</head>
+<body>
+<h2>Kapitel</h2>
+<p>Text</p>
+</body>
+</html>
+"""
+
+
+def _step_5(args: list[str], **_kwargs: object) -> None:
+    """Replace pandoc by writing the html of a chapter."""
+    assert Path(args[2]).is_file()
+    Path(args[3]).write_text(HTML, encoding="utf-8")
+
+
+def test_preview_chapter(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(preview, "preview_dir", tmp_path)
+    monkeypatch.setattr(subprocess, "run", _step_5)
+    cache: dict[str, dict] = {}
+    target = preview_chapter(5, "p {}", cache)
+    assert target == tmp_path / "hpmor-chapter-005.html"
+    html = target.read_text(encoding="utf-8")
+    # numbered like in the book
+    assert "<h2>5. Kapitel</h2>" in html
+    assert "p {}" in html
+    tex = (tmp_path / "hpmor-chapter-005.tex").read_text(encoding="utf-8")
+    assert "\\include{" not in tex
+    assert str(chapter_file(5)) in cache
+
+
+@pytest.mark.parametrize(
+    "error",
+    [subprocess.CalledProcessError(1, "pandoc"), SystemExit(1)],
+)
+def test_render_error(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    error: BaseException,
+) -> None:
+    def fail(*_args: object) -> Path:
+        raise error
+
+    monkeypatch.setattr(preview, "preview_chapter", fail)
+    _render(5, "", {})
+    assert capsys.readouterr().out.startswith("ERROR: ")
+
+
+def test_render_other_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(*_args: object) -> Path:
+        raise ValueError
+
+    monkeypatch.setattr(preview, "preview_chapter", fail)
+    with pytest.raises(ValueError):  # noqa: PT011
+        _render(5, "", {})
+
+
+def test_watch_file_missing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    p = tmp_path / "chapter.tex"
+    p.write_text("a", encoding="utf-8")
+    monkeypatch.setattr(preview, "chapter_file", lambda _number: p)
+    rendered: list[int] = []
+    monkeypatch.setattr(preview, "_render", lambda number, *_: rendered.append(number))
+    steps = iter(
+        [
+            p.unlink,  # saved by deleting and renaming
+            lambda: p.write_text("b", encoding="utf-8"),
+            lambda: os.utime(p, ns=(1, 1)),
+        ]
+    )
+
+    def sleep(_seconds: float) -> None:
+        step = next(steps, None)
+        if step is None:
+            raise KeyboardInterrupt
+        step()
+
+    monkeypatch.setattr(preview.time, "sleep", sleep)
+    watch(5, "", {})
+    assert rendered == [5, 5]
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+"""
+Extract cover from PDF to image.
+
+the title page is rendered by ghostscript directly at the target size,
+no 600 dpi intermediate image and no resizing via imagemagick
+the jpeg is cached, keyed by the hash of the first page of the PDF,
+so it is only rendered again, if the title page has changed
+alternatively, the cover can be built from the cover image assets,
+without the need of a PDF at all
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+os.chdir(Path(__file__).parent.parent.parent)
+
+source_file = Path("hpmor.pdf")
+target_file = Path("tmp/title.jpg")
+cache_dir = Path("tmp/cover-cache")
+
+COVER_SIZE = 1186  # px of longest side
+JPEG_QUALITY = 75
+
+# page size of memoir msmallroyalvopaper (156mm x 234mm) in pt,
+# used if pypdf is not installed
+PAGE_SIZE_PT = (442.2, 663.3)
+
+# image of the cover of the PDF, see layout/hp-intro.tex
+COVER_IMAGE = Path("images/cover0_black.jpg")
+COVER_BACKGROUND = "#272c36"
+
+FONT_FILE_KEYS = ("/FontFile", "/FontFile2", "/FontFile3")
+
+
+def cover_pixels(width_pt: float, height_pt: float, size: int) -> tuple[int, int]:
+    """Return the pixel size of the page, the longest side scaled to size."""
+    scale = size / max(width_pt, height_pt)
+    return round(width_pt * scale), round(height_pt * scale)
+
+
+def _resource_data(resources) -> Iterator[bytes]:  # noqa: ANN001
+    """Yield names and data of images, forms and fonts of the resources."""
+    if not resources:
+        return
+    resources = resources.get_object()
+    if "/XObject" in resources:
+        for name, ref in sorted(resources["/XObject"].items()):
+            obj = ref.get_object()
+            yield name.encode()
+            yield obj.get_data()
+            yield from _resource_data(obj.get("/Resources"))
+    if "/Font" in resources:
+        for name, ref in sorted(resources["/Font"].items()):
+            yield name.encode()
+            yield from _font_data(ref.get_object())
+
+
+def _font_data(font) -> Iterator[bytes]:  # noqa: ANN001
+    """Yield name and embedded font files of a font, glyphs of Type3 fonts."""
+    yield str(font.get("/BaseFont", "")).encode()
+    if "/DescendantFonts" in font:
+        for ref in font["/DescendantFonts"]:
+            yield from _font_data(ref.get_object())
+    if "/FontDescriptor" in font:
+        descriptor = font["/FontDescriptor"].get_object()
+        for key in FONT_FILE_KEYS:
+            if key in descriptor:
+                yield descriptor[key].get_object().get_data()
+    if "/CharProcs" in font:
+        for name, ref in sorted(font["/CharProcs"].items()):
+            yield name.encode()
+            yield ref.get_object().get_data()
+        yield from _resource_data(font.get("/Resources"))
+
+
+def first_page_key(pdf: Path) -> tuple[str, tuple[float, float]]:
+    """
+    Return hash of the first page and its size in pt.
+
+    the hash covers what ghostscript renders: the content stream, the images
+    and forms, and the embedded fonts of the first page
+    if pypdf is not installed, the whole file is hashed instead
+    """
+    try:
+        from pypdf import PdfReader  # pip install pypdf  # noqa: PLC0415
+    except ImportError:
+        print("WARN: pypdf not installed, hashing the whole PDF")
+        h = hashlib.sha256(pdf.read_bytes())
+        return h.hexdigest(), PAGE_SIZE_PT
+
+    page = PdfReader(pdf).pages[0]
+    size = (float(page.mediabox.width), float(page.mediabox.height))
+    h = hashlib.sha256(repr(size).encode())
+    contents = page.get_contents()
+    if contents is not None:
+        h.update(contents.get_data())
+    for data in _resource_data(page.get("/Resources")):
+        h.update(data)
+    return h.hexdigest(), size
+
+
+def assets_key(image: Path) -> str:
+    """Return hash of what render_assets_cover reads: image and background."""
+    h = hashlib.sha256(image.read_bytes())
+    h.update(COVER_BACKGROUND.encode())
+    return h.hexdigest()
+
+
+def settings_key(pixels: tuple[int, int]) -> str:
+    """Return the render settings, part of the cache key."""
+    return f"{pixels[0]}x{pixels[1]}-q{JPEG_QUALITY}"
+
+
+def cached_cover(key: str, target: Path, render: Callable[[Path], None]) -> bool:
+    """
+    Copy the cover of key from the cache to target.
+
+    if not cached, render is called to create it
+    returns True if the cover was taken from the cache
+    """
+    p_cache = cache_dir / f"{key}.jpg"
+    is_cached = p_cache.is_file()
+    if not is_cached:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # render to temp file, so a failed rendering is not cached
+        p_tmp = p_cache.with_suffix(".tmp.jpg")
+        render(p_tmp)
+        p_tmp.replace(p_cache)
+    target.parent.mkdir(exist_ok=True)
+    shutil.copyfile(p_cache, target)
+    return is_cached
+
+
+def render_pdf_cover(pdf: Path, target: Path, pixels: tuple[int, int]) -> None:
+    """Render first page of PDF via ghostscript directly at target size."""
+    subprocess.run(  # noqa: S603
+        [  # noqa: S607
+            "gs",
+            "-q",
+            "-dSAFER",
+            "-dBATCH",
+            "-dNOPAUSE",
+            "-sDEVICE=jpeg",
+            f"-dJPEGQ={JPEG_QUALITY}",
+            "-dTextAlphaBits=4",
+            "-dGraphicsAlphaBits=4",
+            "-dFirstPage=1",
+            "-dLastPage=1",
+            f"-g{pixels[0]}x{pixels[1]}",
+            "-dPDFFitPage",
+            "-dFIXEDMEDIA",
+            f"-sOutputFile={target}",
+            str(pdf),
+        ],
+        check=True,
+    )
+
+
+def render_assets_cover(target: Path, pixels: tuple[int, int]) -> None:
+    """
+    Build cover from the cover image, placed on the page like in the PDF.
+
+    the title text of layout/hp-title.tex is not drawn
+    """
+    subprocess.run(  # noqa: S603
+        [  # noqa: S607
+            "convert",
+            str(COVER_IMAGE),
+            "-resize",
+            f"{pixels[0]}x{pixels[1]}",
+            "-background",
+            COVER_BACKGROUND,
+            "-gravity",
+            "center",
+            "-extent",
+            f"{pixels[0]}x{pixels[1]}",
+            "-quality",
+            str(JPEG_QUALITY),
+            str(target),
+        ],
+        check=True,
+    )
+
+
+if __name__ == "__main__":
+    print("=== 1. extract cover from PDF to image ===")
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--from-assets",
+        action="store_true",
+        help="build cover from images/cover0_black.jpg instead of hpmor.pdf",
+    )
+    args = arg_parser.parse_args()
+    if not args.from_assets and not source_file.is_file():
+        # the cover of the assets has no title, so it is not used silently
+        arg_parser.error(
+            f"{source_file} not found, use --from-assets for a cover without title"
+        )
+
+    if args.from_assets:
+        pixels = cover_pixels(*PAGE_SIZE_PT, COVER_SIZE)
+        is_cached = cached_cover(
+            f"{assets_key(COVER_IMAGE)}-{settings_key(pixels)}",
+            target_file,
+            lambda p: render_assets_cover(p, pixels),
+        )
+    else:
+        key, page_size = first_page_key(source_file)
+        pixels = cover_pixels(*page_size, COVER_SIZE)
+        is_cached = cached_cover(
+            f"{key}-{settings_key(pixels)}",
+            target_file,
+            lambda p: render_pdf_cover(source_file, p, pixels),
+        )
+    print(f"{target_file} {pixels[0]}x{pixels[1]}px", "(cached)" if is_cached else "")
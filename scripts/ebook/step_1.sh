@@ -22,9 +22,13 @@ target_file="tmp/title.png"
 # attempt to perform an operation not allowed by the security policy
 
 # V2 via ghostscript
-gs -dSAFER -r600 -sDEVICE=pngalpha -dFirstPage=1 -dLastPage=1 -o $target_file $source_file
+# gs -dSAFER -r600 -sDEVICE=pngalpha -dFirstPage=1 -dLastPage=1 -o $target_file $source_file
 
 # now imagemagick can be used for converting to the proper size
 source_file="tmp/title.png"
 target_file="tmp/title.jpg"
-convert -density 150 $source_file -resize 1186x1186\> -quality 75 $target_file
+# convert -density 150 $source_file -resize 1186x1186\> -quality 75 $target_file
+
+# V3 via python: ghostscript renders directly at target size, result is cached
+# use --from-assets to build the cover from images/cover0_black.jpg instead
+python3 scripts/ebook/step_1.py
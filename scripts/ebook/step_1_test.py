@@ -0,0 +1,81 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+from pathlib import Path
+from typing import Self
+
+import pytest
+import step_1
+from step_1 import _resource_data, assets_key, cached_cover, cover_pixels
+
+
+def test_cover_pixels() -> None:
+    assert cover_pixels(442.2, 663.3, 1186) == (791, 1186)
+    assert cover_pixels(200, 100, 1000) == (1000, 500)
+
+
+def test_assets_key(tmp_path: Path) -> None:
+    p = tmp_path / "cover.jpg"
+    p.write_bytes(b"a")
+    key = assets_key(p)
+    assert key == assets_key(p)
+    p.write_bytes(b"b")
+    assert key != assets_key(p)
+
+
+class PdfObject(dict):
+    """Dictionary or stream of a PDF, like of pypdf."""
+
+    def __init__(self, data: bytes = b"", **entries: object) -> None:  # noqa: D107
+        super().__init__({f"/{k}": v for k, v in entries.items()})
+        self.data = data
+
+    def get_object(self) -> Self:  # noqa: D102
+        return self
+
+    def get_data(self) -> bytes:  # noqa: D102
+        return self.data
+
+
+def _resources(font_file: bytes) -> PdfObject:
+    font = PdfObject(
+        BaseFont="/Title",
+        FontDescriptor=PdfObject(FontFile3=PdfObject(font_file)),
+    )
+    form = PdfObject(b"form", Resources=PdfObject(Font=PdfObject(F1=font)))
+    return PdfObject(XObject=PdfObject(X1=PdfObject(b"image"), X2=form))
+
+
+def test_resource_data() -> None:
+    data = list(_resource_data(_resources(b"font")))
+    assert b"image" in data
+    assert b"font" in data
+    # a changed font changes the key of the first page
+    assert data != list(_resource_data(_resources(b"font changed")))
+    assert list(_resource_data(None)) == []
+
+
+def test_cached_cover(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(step_1, "cache_dir", tmp_path / "cache")
+    target = tmp_path / "title.jpg"
+    rendered: list[Path] = []
+
+    def render(p: Path) -> None:
+        rendered.append(p)
+        p.write_bytes(b"jpg")
+
+    assert cached_cover("k1", target, render) is False
+    assert cached_cover("k1", target, render) is True
+    assert target.read_bytes() == b"jpg"
+    assert len(rendered) == 1
+    assert cached_cover("k2", target, render) is False
+    assert len(rendered) == 2  # noqa: PLR2004
+
+    def render_fail(p: Path) -> None:
+        p.write_bytes(b"partial")
+        raise OSError
+
+    with pytest.raises(OSError):  # noqa: PT011
+        cached_cover("k3", target, render_fail)
+    assert not (tmp_path / "cache" / "k3.jpg").exists()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+r"""
+Flatten .tex files.
+
+python replacement of latexpand:
+resolves \input and \include recursively and removes comments
+the include graph is cached together with the comment-free parts of each file,
+so on rebuilds only the changed files are read and processed again
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+os.chdir(Path(__file__).parent.parent.parent)
+
+source_file = Path("scripts/ebook/hpmor-ebook.tex")
+target_file = Path("tmp/hpmor-epub-2-flatten.tex")
+cache_file = Path("tmp/hpmor-epub-2-flatten-cache.json")
+
+# a part of a file is either text or an [command, path] include
+Part = str | list[str]
+
+
+def remove_comments(s: str) -> str:
+    """
+    Remove LaTeX comments, like latexpand does.
+
+    comment-only lines are removed completely
+    a comment at the end of a line removes the linebreak as well,
+    after a command a space is kept to terminate it
+    """
+    lines_out: list[str] = []
+    for line in s.splitlines(keepends=True):
+        m = re.match(r"^((?:[^%\\\n]|\\.)*)%", line)
+        if not m:
+            lines_out.append(line)
+            continue
+        before = m.group(1)
+        if not before.strip():
+            continue
+        if re.search(r"(?<!\\)\\[a-zA-Z@]+$", before):
+            before += " "
+        lines_out.append(before)
+    return "".join(lines_out)
+
+
+def split_includes(s: str) -> list[Part]:
+    r"""Split comment-free .tex into text and \input / \include parts."""
+    parts: list[Part] = []
+    pos = 0
+    for m in re.finditer(r"\\(input|include)(?![a-zA-Z])\s*\{([^}]+)\}", s):
+        parts.extend((s[pos : m.start()], [m.group(1), m.group(2)]))
+        pos = m.end()
+    parts.append(s[pos:])
+    return parts
+
+
+def _tex_path(name: str) -> Path:
+    p = Path(name)
+    return p if p.suffix == ".tex" else p.with_name(p.name + ".tex")
+
+
+def _file_parts(p: Path, cache: dict[str, dict]) -> list[Part]:
+    """Return the parts of file p, from cache if the file is unchanged."""
+    stat = p.stat()
+    entry = cache.get(str(p))
+    if entry and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+        return entry["parts"]
+    data = p.read_bytes()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if not entry or entry["sha256"] != sha256:
+        s = remove_comments(data.decode("utf-8"))
+        # ignore all after \endinput
+        s = s.split("\\endinput", 1)[0]
+        entry = {"sha256": sha256, "parts": split_includes(s)}
+    entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    cache[str(p)] = entry
+    return entry["parts"]
+
+
+def flatten(
+    p: Path, cache: dict[str, dict] | None = None, stack: tuple[Path, ...] = ()
+) -> str:
+    r"""
+    Flatten .tex file by resolving \input and \include recursively.
+
+    cache: include graph and parts of previous runs, updated in place
+    """
+    if cache is None:
+        cache = {}
+    if p in stack:
+        msg = f"recursive include of {p}"
+        raise ValueError(msg)
+    out: list[str] = []
+    for part in _file_parts(p, cache):
+        if isinstance(part, str):
+            out.append(part)
+            continue
+        command, name = part
+        p_include = _tex_path(name)
+        if not p_include.is_file():
+            print(f"WARN: {p_include} not found, keeping \\{command}{{{name}}}")
+            out.append(f"\\{command}{{{name}}}")
+            continue
+        cont = flatten(p_include, cache, (*stack, p))
+        if command == "include":
+            cont = f"\\clearpage{{}}\n{cont}\\clearpage{{}}\n"
+        out.append(cont)
+    return "".join(out)
+
+
+def load_cache(p: Path) -> dict[str, dict]:
+    """Load include graph cache, empty if not existing."""
+    if not p.is_file():
+        return {}
+    return json.loads(p.read_text(encoding="utf-8"))
+
+
+def save_cache(p: Path, cache: dict[str, dict]) -> None:
+    """Save include graph cache."""
+    p.parent.mkdir(exist_ok=True)
+    p.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+
+
+def flatten_cached(p: Path) -> str:
+    """Flatten .tex file, using and updating the cache file."""
+    cache = load_cache(cache_file)
+    cont = flatten(p, cache)
+    save_cache(cache_file, cache)
+    return cont
+
+
+if __name__ == "__main__":
+    print("=== 2. flatten .tex files ===")
+    cont = flatten_cached(source_file)
+    with target_file.open(mode="w", encoding="utf-8", newline="\n") as fh_out:
+        fh_out.write(cont)
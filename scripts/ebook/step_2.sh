@@ -13,4 +13,8 @@ source_file="scripts/ebook/hpmor-ebook.tex"
 target_file="tmp/hpmor-epub-2-flatten.tex"
 
 # flatten the .tex files to one file
-latexpand $source_file -o $target_file
+# V1 via latexpand
+# latexpand $source_file -o $target_file
+# V2 via python, with caching of unchanged files
+# note: step_3.py flattens in memory and does not need this file
+python3 scripts/ebook/step_2.py
@@ -0,0 +1,70 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+from pathlib import Path
+
+import pytest
+from step_2 import flatten, remove_comments, split_includes
+
+
+@pytest.mark.parametrize(
+    ("text", "expected_output"),
+    [
+        ("a\n", "a\n"),
+        ("% comment\na\n", "a\n"),
+        ("  % comment\na\n", "a\n"),
+        ("a% comment\nb\n", "ab\n"),
+        ("a 50\\% b\n", "a 50\\% b\n"),
+        ("a 50\\% b% comment\nc\n", "a 50\\% bc\n"),
+        ("\\clearpage% comment\nc\n", "\\clearpage c\n"),
+        ("\\\\% comment\nc\n", "\\\\c\n"),
+    ],
+)
+def test_remove_comments(text: str, expected_output: str) -> None:
+    assert remove_comments(text) == expected_output
+
+
+def test_split_includes() -> None:
+    s = "a\\input{x}b\\include {y/z}c\\includegraphics{img.jpg}"
+    assert split_includes(s) == [
+        "a",
+        ["input", "x"],
+        "b",
+        ["include", "y/z"],
+        "c\\includegraphics{img.jpg}",
+    ]
+
+
+def test_flatten(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    Path("chapters").mkdir()
+    Path("main.tex").write_text(
+        "A\n\\input{settings}\n\\include{chapters/c1}\nB\n", encoding="utf-8"
+    )
+    Path("settings.tex").write_text("S % comment\n", encoding="utf-8")
+    Path("chapters/c1.tex").write_text("C1\n\\endinput\nignored\n", encoding="utf-8")
+    cache: dict[str, dict] = {}
+    expected = "A\nS \n\\clearpage{}\nC1\n\\clearpage{}\n\nB\n"
+    assert flatten(Path("main.tex"), cache) == expected
+    assert sorted(cache) == ["chapters/c1.tex", "main.tex", "settings.tex"]
+
+    # unchanged files are taken from the cache
+    cache["settings.tex"]["parts"] = ["cached "]
+    assert flatten(Path("main.tex"), cache) == expected.replace("S ", "cached ")
+
+    # changed files are read again
+    Path("settings.tex").write_text("S2 % comment\n", encoding="utf-8")
+    assert flatten(Path("main.tex"), cache) == expected.replace("S ", "S2 ")
+
+    # missing files are kept as command
+    Path("main.tex").write_text("\\input{missing}\n", encoding="utf-8")
+    assert flatten(Path("main.tex"), cache) == "\\input{missing}\n"
+
+
+def test_flatten_recursive(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    Path("a.tex").write_text("\\input{b}\n", encoding="utf-8")
+    Path("b.tex").write_text("\\input{a}\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="recursive include"):
+        flatten(Path("a.tex"))
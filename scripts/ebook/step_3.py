@@ -10,17 +10,16 @@
 import re
 from pathlib import Path
 
+from step_2 import flatten_cached
+from step_2 import source_file as flatten_source_file
+
 os.chdir(Path(__file__).parent.parent.parent)
 
-source_file = Path("tmp/hpmor-epub-2-flatten.tex")
 target_file = Path("tmp/hpmor-epub-3-flatten-mod.tex")
 
-if __name__ == "__main__":
-    print("=== 3. modify flattened file ===")
-
-    with source_file.open(encoding="utf-8", newline="\n") as fh_in:
-        cont = fh_in.read()
 
+def modify_tex(cont: str) -> str:
+    """Modify flattened .tex file."""
     # \today
     date_str = dt.datetime.now(dt.UTC).date().strftime("%d.%m.%Y")
     cont = cont.replace("\\today{}", date_str)
@@ -130,13 +129,31 @@
     )
 
     # remove end stuff
-    cont = re.sub(
-        r"(.*)\\end\{chapterOpeningAuthorNote\}.*?\\end\{document\}",
-        r"\1\\end{chapterOpeningAuthorNote}\n\\end{document}",
-        cont,
-        flags=re.DOTALL,
-        count=1,
-    )
+    # after the last \end{chapterOpeningAuthorNote}, up to \end{document}
+    # no regex (.*), it backtracks from every position, if there is no match
+    end_note = "\\end{chapterOpeningAuthorNote}"
+    end_doc = "\\end{document}"
+    pos_note = cont.rfind(end_note)
+    if pos_note != -1:
+        pos_doc = cont.find(end_doc, pos_note)
+        if pos_doc != -1:
+            cont = (
+                cont[:pos_note]
+                + end_note
+                + "\n"
+                + end_doc
+                + cont[pos_doc + len(end_doc) :]
+            )
+
+    return cont
+
+
+if __name__ == "__main__":
+    print("=== 3. modify flattened file ===")
+
+    # flattening in memory, tmp/hpmor-epub-2-flatten.tex is not read
+    cont = flatten_cached(flatten_source_file)
+    cont = modify_tex(cont)
 
     with target_file.open(mode="w", encoding="utf-8", newline="\n") as fh_out:
         fh_out.write(cont)
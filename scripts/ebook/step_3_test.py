@@ -0,0 +1,23 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+from step_3 import modify_tex
+
+
+def test_modify_tex_end_stuff() -> None:
+    cont = (
+        "\\begin{chapterOpeningAuthorNote}A\\end{chapterOpeningAuthorNote}\n"
+        "\\begin{chapterOpeningAuthorNote}B\\end{chapterOpeningAuthorNote}\n"
+        "end stuff\n\\end{document}\n"
+    )
+    assert modify_tex(cont) == (
+        "\\begin{chapterOpeningAuthorNote}A\\end{chapterOpeningAuthorNote}\n"
+        "\\begin{chapterOpeningAuthorNote}B\\end{chapterOpeningAuthorNote}\n"
+        "\\end{document}\n"
+    )
+
+
+def test_modify_tex_no_author_note() -> None:
+    cont = "\\chapter{X}\n\nText.\n\n\\end{document}\n"
+    assert modify_tex(cont) == cont
@@ -32,18 +32,22 @@ def convert_parsel(s: str) -> str:
     return s
 
 
+def parselify(s: str) -> str:
+    r"""Convert the text of all \parsel commands, in a single scan of s."""
+    return re.sub(
+        r"\\parsel\{([^\}\\]+)\}",
+        lambda m: "\\parsel{" + convert_parsel(m.group(1)) + "}",
+        s,
+    )
+
+
 if __name__ == "__main__":
     print("=== 4. parselify flattened file in python ===")
 
     with source_file.open(encoding="utf-8", newline="\n") as fh_in:
         cont = fh_in.read()
 
-    # \parsel
-    my_matches = re.finditer(r"(\\parsel\{([^\}\\]+)\})", cont)
-    for my_match in my_matches:
-        was = my_match.group(1)
-        womit = convert_parsel(my_match.group(2))
-        cont = cont.replace(was, "\\parsel{" + womit + "}")
+    cont = parselify(cont)
 
     with target_file.open(mode="w", encoding="utf-8", newline="\n") as fh_out:
         fh_out.write(cont)
@@ -4,7 +4,7 @@
 """Unit Tests."""
 
 import pytest
-from step_4 import convert_parsel
+from step_4 import convert_parsel, parselify
 
 
 @pytest.mark.parametrize(
@@ -31,3 +31,8 @@
 )
 def test_convert_parsel(text: str, expected: str) -> None:  # noqa: D103
     assert convert_parsel(text) == expected
+
+
+def test_parselify() -> None:  # noqa: D103
+    s = r"a \parsel{Sss} b \parsel{zz} \parsel{Sss} \textit{s}"
+    assert parselify(s) == r"a \parsel{Sssss} b \parsel{zzz} \parsel{Sssss} \textit{s}"
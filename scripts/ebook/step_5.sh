@@ -9,11 +9,14 @@ echo === 5. LaTeX -\> HTML via pandoc ===
 script_dir=$(dirname $0)
 cd $script_dir/../..
 
-source_file="tmp/hpmor-epub-4-flatten-parsel.tex"
-target_file="tmp/hpmor-epub-5-html-unmod.html"
+# optional parameters, used for volumes: source file, target file, title suffix
+source_file=${1:-"tmp/hpmor-epub-4-flatten-parsel.tex"}
+target_file=${2:-"tmp/hpmor-epub-5-html-unmod.html"}
+title_suffix=${3:-""}
 
 # extract title and author from hp-header.tex
 title=$(grep "pdftitle=" layout/hp-header.tex | awk -F '[{}]' '{print $2}')
+title="$title$title_suffix"
 author=$(grep "pdfauthor=" layout/hp-header.tex | awk -F '[{}]' '{print $2}')
 
-pandoc --standalone -V lang=de --from=latex+latex_macros $source_file -o $target_file --metadata title="$title" --metadata author="$author"
+pandoc --standalone -V lang=de --from=latex+latex_macros "$source_file" -o "$target_file" --metadata title="$title" --metadata author="$author"
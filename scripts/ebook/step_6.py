@@ -6,11 +6,15 @@
 HTML modifications.
 """
 
+import argparse
+import json
 import re
 import sys
 from pathlib import Path
+from typing import NamedTuple, TextIO
 
 from lxml import etree  # pip install lxml
+from tex_leftovers import LeftoverScanner
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from check_chapters_settings import settings
@@ -19,17 +23,90 @@
 
 source_file = Path("tmp/hpmor-epub-5-html-unmod.html")
 target_file = Path("hpmor.html")
+toc_file = Path("tmp/hpmor-epub-6-toc.json")
 
+STREAM_CHUNK_SIZE = 1 << 16
 
-def check_html(cont: str) -> None:
-    """Check html syntax."""
+
+class TocEntry(NamedTuple):
+    """Numbered part (level 1) or chapter (level 2) heading."""
+
+    level: int
+    number: int
+    title: str
+
+
+STYLE_CLASSES = ("parsel", "writtenNote", "McGonagallWhiteBoard", "headline")
+
+
+def parse_html(cont: str) -> etree._Element:
+    """
+    Parse html into an lxml tree, exit on syntax errors.
+
+    the <html> root keeps its XHTML namespace, all other elements are moved
+    out of it, so they can be addressed by plain tag names and serialized as html
+    """
     parser = etree.XMLParser(recover=False)  # Do not auto-fix errors
     try:
-        etree.fromstring(cont, parser)
+        root = etree.fromstring(cont.encode("utf-8"), parser)
     except etree.XMLSyntaxError as e:
         print("HTML Error:", e)
         sys.exit(1)
         # raise
+    for el in root.iterdescendants():
+        if isinstance(el.tag, str):
+            el.tag = etree.QName(el).localname
+    return root
+
+
+def serialize_html(root: etree._Element) -> str:
+    """
+    Serialize lxml tree as html.
+
+    html instead of xml output removes the trailing slashes of <br />, <hr />
+    and <meta /> to satisfy https://validator.w3.org
+    """
+    tree = root.getroottree()
+    return (
+        etree.tostring(
+            tree,
+            method="html",
+            encoding="unicode",
+            doctype=tree.docinfo.doctype,
+        )
+        + "\n"
+    )
+
+
+def fix_front_matter(cont: str) -> str:
+    """Cleanup of title and author leftovers from tex -> html conversion."""
+    # remove strange leftovers from tex -> html conversion
+    cont = re.sub(
+        r"(</header>).*?(<p>Fanfiction von)",
+        r"\1\n\2",
+        cont,
+        flags=re.DOTALL | re.IGNORECASE,
+        count=1,
+    )
+
+    # stray </div> leftover
+    cont = re.sub(
+        r"(github.com/rrthomas/hpmor/</a></span><br />\s+</p>)\s+</div>",
+        r"\1",
+        cont,
+        flags=re.DOTALL | re.IGNORECASE,
+        count=1,
+    )
+
+    # remove duplication of author name
+    cont = re.sub(
+        r"""<p>Fanfiction.*?<p>Basierend auf der Harry Potter Reihe von J. K. Rowling.*?</p>""",  # noqa: E501
+        "<p>Fanfiction basierend auf der Harry Potter Reihe von J. K. Rowling</p>",
+        cont,
+        flags=re.DOTALL | re.IGNORECASE,
+        count=1,
+    )
+    return cont
 
 
 def fix_ellipsis(s: str) -> str:
@@ -59,40 +136,120 @@ def fix_ellipsis(s: str) -> str:
     return s
 
 
-if __name__ == "__main__":
-    print("=== 6. HTML modifications ===")
+def remove_heading_ids(root: etree._Element) -> None:
+    """Remove ids from headings since umlaute cause problem."""
+    for el in root.iter("h1", "h2", "h3", "h4", "h5", "h6"):
+        el.attrib.pop("id", None)
 
-    with source_file.open(encoding="utf-8", newline="\n") as fh_in:
-        cont = fh_in.read()
-    print("checking source html")
-    check_html(cont)
 
-    # remove strange leftovers from tex -> html conversion
-    cont = re.sub(
-        r"(</header>).*?(<p>Fanfiction von)",
-        r"\1\n\2",
-        cont,
-        flags=re.DOTALL | re.IGNORECASE,
-        count=1,
-    )
+def number_headings(
+    root: etree._Element,
+    counters: dict[str, int] | None = None,
+    chapter_numbers: list[int] | None = None,
+) -> list[TocEntry]:
+    """
+    Add part and chapter numbers to <h1> and <h2> headings in a single pass.
 
-    # stray </div> leftover
-    cont = re.sub(
-        r"(github.com/rrthomas/hpmor/</a></span><br />\s+</p>)\s+</div>",
-        r"\1",
-        cont,
-        flags=re.DOTALL | re.IGNORECASE,
-        count=1,
-    )
+    headings with attributes, like class="unnumbered", are kept as they are
+    counters: continue numbering of previous calls, updated in place
+    chapter_numbers: numbers of the numbered chapters, for volumes that leave
+    out chapters, default: counted
+    returns the table of contents
+    """
+    toc: list[TocEntry] = []
+    if counters is None:
+        counters = {"h1": 0, "h2": 0}
+    for el in root.iter("h1", "h2"):
+        if el.attrib:
+            continue
+        counters[el.tag] += 1
+        number = counters[el.tag]
+        if el.tag == "h2" and chapter_numbers is not None:
+            number = chapter_numbers[number - 1]
+        title = "".join(el.itertext()).strip()
+        toc.append(TocEntry(level=int(el.tag[1]), number=number, title=title))
+        el.text = f"{number}. {el.text or ''}"
+    return toc
 
-    # remove duplication of author name
-    cont = re.sub(
-        r"""<p>Fanfiction.*?<p>Basierend auf der Harry Potter Reihe von J. K. Rowling.*?</p>""",  # noqa: E501
-        "<p>Fanfiction basierend auf der Harry Potter Reihe von J. K. Rowling</p>",
-        cont,
-        flags=re.DOTALL | re.IGNORECASE,
-        count=1,
-    )
+
+def remove_double_rules(root: etree._Element) -> None:
+    """Remove <hr> directly following another <hr>."""
+    for el in list(root.iter("hr")):
+        prev = el.getprevious()
+        if prev is not None and prev.tag == "hr" and prev.tail == "\n":
+            prev.tail = el.tail
+            el.getparent().remove(el)
+
+
+def join_author_comment(root: etree._Element) -> None:
+    """Fix linebreak at author's comment: join "E. Y.: " with next paragraph."""
+    for el in list(root.iter("p")):
+        prev = el.getprevious()
+        if (
+            prev is not None
+            and prev.tag == "p"
+            and prev.text == "E. Y.: "
+            and len(prev) == 0
+            and prev.tail == "\n"
+        ):
+            el.text = "E.Y.: " + (el.text or "")
+            el.getparent().remove(prev)
+
+
+def convert_style_classes(root: etree._Element) -> None:
+    """Convert "color-marked" styles of hpmor-ebook.tex back to style classes."""
+    for el in root.iter("div", "span"):
+        m = re.fullmatch(r"color: (\w+)", el.get("style", ""))
+        if m and m.group(1) in STYLE_CLASSES:
+            del el.attrib["style"]
+            el.set("class", m.group(1))
+
+
+def add_css(root: etree._Element, css: str) -> None:
+    """Append css to the <style> element in <head>."""
+    style = root.find("head/style")
+    if style is not None:
+        style.text = (style.text or "") + css + "\n"
+
+
+def modify_tree(
+    root: etree._Element,
+    counters: dict[str, int] | None = None,
+    chapter_numbers: list[int] | None = None,
+) -> list[TocEntry]:
+    """
+    Apply the tree modifications to the document or to one of its elements.
+
+    modifications only look at the element's previous sibling, not the next one,
+    so they can be applied to the elements as soon as they are parsed
+    returns the table of contents
+    """
+    # doc structure (not needed any more, using calibi --level1-toc flag instead)
+    # sed -i 's/<h1 /<h1 class="part"/g' $target_file
+    # sed -i 's/<h2 /<h2 class="chapter"/g' $target_file
+    # sed -i 's/<h3 /<h3 class="section"/g' $target_file
+    remove_heading_ids(root)
+    toc = number_headings(root, counters, chapter_numbers)
+    remove_double_rules(root)
+    join_author_comment(root)
+    convert_style_classes(root)
+    return toc
+
+
+def modify_html(
+    cont: str,
+    css: str,
+    counters: dict[str, int] | None = None,
+    chapter_numbers: list[int] | None = None,
+) -> tuple[str, list[TocEntry]]:
+    """
+    Modify html in memory: parse once, modify the tree, serialize once.
+
+    counters: numbers of the previous part and chapter, for volumes
+    chapter_numbers: numbers of the chapters, for volumes
+    returns the modified html and the table of contents
+    """
+    cont = fix_front_matter(cont)
 
     # now done via pandoc -V lang=de in step_5.sh
     # # set language
@@ -106,73 +263,186 @@ def fix_ellipsis(s: str) -> str:
     # fix spaces around ellipsis
     cont = fix_ellipsis(cont)
 
-    # doc structure (not needed any more, using calibi --level1-toc flag instead)
-    # sed -i 's/<h1 /<h1 class="part"/g' $target_file
-    # sed -i 's/<h2 /<h2 class="chapter"/g' $target_file
-    # sed -i 's/<h3 /<h3 class="section"/g' $target_file
+    # parsing checks the html syntax
+    root = parse_html(cont)
+    del cont
+    toc = modify_tree(root, counters, chapter_numbers)
+    add_css(root, css)
+    return serialize_html(root), toc
 
-    # remove ids from chapters since umlaute cause problem
-    cont = re.sub(
-        r'(<h\d)\s+id="[^"]+"',
-        r"\1",
-        cont,
-        flags=re.DOTALL | re.IGNORECASE,
-    )
-    cont = re.sub(
-        r'(<h\d\s+class="unnumbered")\s+id="[^"]+"',
-        r"\1",
-        cont,
-        flags=re.DOTALL | re.IGNORECASE,
-    )
 
-    # add part numbers
-    part_no = 0
-    while "<h1>" in cont:
-        part_no += 1
-        cont = cont.replace("<h1>", f"<h1_DONE>{part_no}. ", 1)
-    cont = cont.replace("<h1_DONE>", "<h1>")
-
-    # add chapter numbers
-    chapter_no = 0
-    while "<h2>" in cont:
-        chapter_no += 1
-        cont = cont.replace("<h2>", f"<h2_DONE>{chapter_no}. ", 1)
-    cont = cont.replace("<h2_DONE>", "<h2>")
-
-    # fix double rules
-    # cont = cont.replace("<hr />\n<hr />", "<hr />")
-    cont = re.sub(
-        r"<hr */>\n<hr */>",
-        r"<hr />",
-        cont,
-        flags=re.DOTALL | re.IGNORECASE,
+def _read_front_matter(fh_in: TextIO) -> str:
+    """Read html up to the first <h1> after the </header>, the end of front matter."""
+    cont = ""
+    while True:
+        chunk = fh_in.read(STREAM_CHUNK_SIZE)
+        cont += chunk
+        pos = cont.find("</header>")
+        if not chunk or (pos != -1 and cont.find("<h1", pos) != -1):
+            return cont
+
+
+class HtmlStreamModifier:
+    """
+    Modify the elements of html that is still parsed, writing the output as it goes.
+
+    the top-level elements of <body> are modified when they are parsed completely,
+    written one element later (when the next element can no longer modify them)
+    and then removed from the tree, so memory usage does not grow with the book
+    comments in <body> are kept, like by modify_html, comments before <html> are
+    dropped (pandoc writes none)
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        fh_out: TextIO,
+        css: str,
+        html_start_tag: str,
+        counters: dict[str, int] | None = None,
+        chapter_numbers: list[int] | None = None,
+    ) -> None:
+        self.fh_out = fh_out
+        self.css = css
+        self.html_start_tag = html_start_tag
+        self.counters = {"h1": 0, "h2": 0} if counters is None else counters
+        self.chapter_numbers = chapter_numbers
+        self.toc: list[TocEntry] = []
+        self.body: etree._Element | None = None
+        self.body_started = False
+        self.held: etree._Element | None = None
+        # written elements are moved out of the tree into a document of known
+        #  encoding, as libxml2 escapes all non-ascii chars of a document in parsing
+        self.sink = etree.fromstring(b"<sink/>")
+
+    def write(self, el: etree._Element) -> None:
+        """Write element and its tail and remove it from the tree."""
+        self.sink.append(el)
+        s = etree.tostring(el, method="html", encoding="unicode", with_tail=True)
+        self.sink.remove(el)
+        self.fh_out.write(fix_ellipsis(s))
+
+    def start(self, el: etree._Element) -> None:
+        """Handle start tag: write <html> start tag, remember <body>."""
+        parent = el.getparent()
+        if parent is None:
+            doctype = el.getroottree().docinfo.doctype
+            self.fh_out.write(f"{doctype}\n{self.html_start_tag}\n")
+        elif el.tag == "body" and parent.getparent() is None:
+            self.body = el
+
+    def end(self, el: etree._Element) -> None:
+        """Handle end tag: modify and write <head> and top-level <body> elements."""
+        parent = el.getparent()
+        if parent is None:
+            # </html>
+            self._start_body()
+            if self.held is not None:
+                self.write(self.held)
+            tail = self.body.tail if self.body is not None else ""
+            self.fh_out.write(f"</body>{tail or ''}</html>\n")
+        elif el.tag == "head" and parent.getparent() is None:
+            add_css(parent, self.css)
+            self.write(el)
+        elif parent is self.body:
+            self._start_body()
+            self.toc.extend(modify_tree(el, self.counters, self.chapter_numbers))
+            if el.getparent() is None:
+                # removed as duplicate
+                return
+            if self.held is not None and self.held.getparent() is not None:
+                self.write(self.held)
+            self.held = el
+
+    def comment(self, el: etree._Element) -> None:
+        """Handle comment: write top-level comments of <body> in order."""
+        if self.body is None or el.getparent() is not self.body:
+            # comments inside elements are written with their element
+            return
+        self._start_body()
+        # held like an element, as its tail is not parsed yet
+        if self.held is not None and self.held.getparent() is not None:
+            self.write(self.held)
+        self.held = el
+
+    def _start_body(self) -> None:
+        if not self.body_started and self.body is not None:
+            self.fh_out.write(f"<body>{self.body.text or ''}")
+            self.body_started = True
+
+
+def modify_html_streaming(
+    fh_in: TextIO,
+    fh_out: TextIO,
+    css: str,
+    counters: dict[str, int] | None = None,
+    chapter_numbers: list[int] | None = None,
+) -> list[TocEntry]:
+    """
+    Modify html element by element, using constant memory.
+
+    the output is identical to modify_html
+    counters: numbers of the previous part and chapter, for volumes
+    chapter_numbers: numbers of the chapters, for volumes
+    returns the table of contents
+    """
+    cont = fix_front_matter(_read_front_matter(fh_in))
+    # the XHTML namespace is dropped for parsing, the <html> tag is copied as it is
+    m = re.search(r"<html\b[^>]*>", cont)
+    assert m, "<html> tag not found"
+    cont = (
+        cont[: m.start()]
+        + m.group(0).replace(' xmlns="http://www.w3.org/1999/xhtml"', "")
+        + cont[m.end() :]
     )
-    # fixing linebreak at author's comment
-    cont = cont.replace("<p>E. Y.: </p>\n<p>", "<p>E.Y.: ")
+    modifier = HtmlStreamModifier(fh_out, css, m.group(0), counters, chapter_numbers)
+    parser = etree.XMLPullParser(events=("start", "end", "comment"), recover=False)
+    try:
+        while cont:
+            parser.feed(cont.encode("utf-8"))
+            for event, el in parser.read_events():
+                getattr(modifier, event)(el)
+            cont = fh_in.read(STREAM_CHUNK_SIZE)
+        parser.close()
+    except etree.XMLSyntaxError as e:
+        print("HTML Error:", e)
+        sys.exit(1)
+        # raise
+    for event, el in parser.read_events():
+        getattr(modifier, event)(el)
+    return modifier.toc
 
-    # converting "color-marked" styles of 1.sh back to proper style classes
-    cont = re.sub(
-        r'<(div|span) style="color: (parsel|writtenNote|McGonagallWhiteBoard|headline)"',  # noqa: E501
-        r'<\1 class="\2"',
-        cont,
+
+if __name__ == "__main__":
+    print("=== 6. HTML modifications ===")
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="modify html element by element, using constant memory",
     )
+    args = arg_parser.parse_args()
 
     # add css style file format for \emph in \emph
     with Path("scripts/ebook/html.css").open(encoding="utf-8", newline="\n") as fh_in:
         css = fh_in.read()
-    cont = cont.replace("</style>\n", css + "\n</style>\n")
 
-    print("checking target html")
-    check_html(cont)
+    if args.stream:
+        with (
+            source_file.open(encoding="utf-8", newline="\n") as fh_in,
+            target_file.open(mode="w", encoding="utf-8", newline="\n") as fh_out,
+        ):
+            toc = modify_html_streaming(fh_in, fh_out, css)
+    else:
+        with source_file.open(encoding="utf-8", newline="\n") as fh_in:
+            cont = fh_in.read()
+        cont, toc = modify_html(cont, css)
+        with target_file.open(mode="w", encoding="utf-8", newline="\n") as fh_out:
+            fh_out.write(cont)
 
-    # remove training slashes to satisfy https://validator.w3.org
-    cont = cont.replace("<br />", "<br>")
-    cont = cont.replace("<hr />", "<hr>")
-    cont = re.sub(
-        r"(<meta [^>]*) />",
-        r"\1>",
-        cont,
-    )
+    with toc_file.open(mode="w", encoding="utf-8", newline="\n") as fh_out:
+        json.dump([e._asdict() for e in toc], fh_out, ensure_ascii=False, indent=1)
 
-    with target_file.open(mode="w", encoding="utf-8", newline="\n") as fh_out:
-        fh_out.write(cont)
+    scanner = LeftoverScanner()
+    if scanner.scan_file(target_file):
+        print(f"WARN: leftover LaTeX commands in {target_file}:")
+        print(scanner.summary())
@@ -3,11 +3,25 @@
 
 """Unit Tests."""
 
+import io
 import sys
+from collections.abc import Callable
 from pathlib import Path
 
 import pytest
-from step_6 import fix_ellipsis
+from step_6 import (
+    TocEntry,
+    convert_style_classes,
+    fix_ellipsis,
+    join_author_comment,
+    modify_html,
+    modify_html_streaming,
+    number_headings,
+    parse_html,
+    remove_double_rules,
+    remove_heading_ids,
+    serialize_html,
+)
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from check_chapters_settings import settings
@@ -45,3 +59,110 @@
     )
     def test_fix_ellipsis_en(text: str, expected: str) -> None:
         assert fix_ellipsis(text) == expected
+
+
+def _html(body: str) -> str:
+    return (
+        '<!DOCTYPE html>\n<html xmlns="http://www.w3.org/1999/xhtml" lang="de">\n'
+        "<head>\n<style>\n</style>\n</head>\n"
+        f"<body>\n{body}</body>\n</html>\n"
+    )
+
+
+def _modify(body: str, *funcs: Callable) -> str:
+    """Parse html body, apply tree modifications, return serialized body."""
+    root = parse_html(_html(body))
+    for func in funcs:
+        func(root)
+    s = serialize_html(root)
+    return s[s.index("<body>\n") + 7 : s.index("</body>")]
+
+
+def test_parse_and_serialize_html() -> None:
+    body = '<p>a<br />b</p>\n<hr />\n<h1 id="ä">x</h1>\n'
+    assert _modify(body) == '<p>a<br>b</p>\n<hr>\n<h1 id="ä">x</h1>\n'
+
+
+def test_number_headings() -> None:
+    toc: list[TocEntry] = []
+    body = _modify(
+        '<h1 class="unnumbered" id="intro">Intro</h1>\n'
+        '<h1 id="a">Part A</h1>\n<h2 id="c1">Ch <em>1</em></h2>\n<h2>Ch 2</h2>\n'
+        "<h1>Part B</h1>\n<h2>Ch 3</h2>\n<h3>Section</h3>\n",
+        remove_heading_ids,
+        lambda root: toc.extend(number_headings(root)),
+    )
+    assert body == (
+        '<h1 class="unnumbered">Intro</h1>\n'
+        "<h1>1. Part A</h1>\n<h2>1. Ch <em>1</em></h2>\n<h2>2. Ch 2</h2>\n"
+        "<h1>2. Part B</h1>\n<h2>3. Ch 3</h2>\n<h3>Section</h3>\n"
+    )
+    assert toc == [
+        TocEntry(1, 1, "Part A"),
+        TocEntry(2, 1, "Ch 1"),
+        TocEntry(2, 2, "Ch 2"),
+        TocEntry(1, 2, "Part B"),
+        TocEntry(2, 3, "Ch 3"),
+    ]
+
+
+def test_number_headings_chapter_numbers() -> None:
+    # volume 2, without chapter 23
+    counters = {"h1": 1, "h2": 0}
+    body = _modify(
+        "<h1>Part</h1>\n<h2>Ch</h2>\n<h2>Ch</h2>\n",
+        lambda root: number_headings(root, counters, [22, 24]),
+    )
+    assert body == "<h1>2. Part</h1>\n<h2>22. Ch</h2>\n<h2>24. Ch</h2>\n"
+    assert counters == {"h1": 2, "h2": 2}
+
+
+@pytest.mark.parametrize(
+    ("body", "expected"),
+    [
+        ("<hr />\n<hr />\n<p>x</p>\n", "<hr>\n<p>x</p>\n"),
+        ("<hr />\n<p>x</p>\n<hr />\n", "<hr>\n<p>x</p>\n<hr>\n"),
+        (
+            "<p>E.\u00a0Y.:\u00a0</p>\n<p>Danke <em>sehr</em></p>\n",
+            "<p>E.Y.: Danke <em>sehr</em></p>\n",
+        ),
+        (
+            '<p><span style="color: parsel">Sss</span></p>\n',
+            '<p><span class="parsel">Sss</span></p>\n',
+        ),
+        (
+            '<div style="color: writtenNote">\n<p>x</p>\n</div>\n',
+            '<div class="writtenNote">\n<p>x</p>\n</div>\n',
+        ),
+        (
+            '<p><span style="color: red">x</span></p>\n',
+            '<p><span style="color: red">x</span></p>\n',
+        ),
+    ],
+)
+def test_tree_modifications(body: str, expected: str) -> None:
+    assert (
+        _modify(body, remove_double_rules, join_author_comment, convert_style_classes)
+        == expected
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_modify_html_streaming(
+    monkeypatch: pytest.MonkeyPatch, chunk_size: int
+) -> None:
+    monkeypatch.setattr("step_6.STREAM_CHUNK_SIZE", chunk_size)
+    cont = _html(
+        '<header id="title-block-header">\n<h1 class="title">Titel</h1>\n</header>\n'
+        '<h1 id="ä">Teil</h1>\n<h2 id="ö">Kapitel</h2>\n<p>Später…</p>\n'
+        "<hr />\n<!-- x -->\n<hr />\n<p>E.\u00a0Y.:\u00a0</p>\n<p>Danke</p>\n"
+        "<hr />\n<hr />\n<p>a<!-- y -->b</p>\n<!-- z -->\n"
+        '<div style="color: writtenNote">\n<p>x<br />y</p>\n</div>\n'
+        "<h2>Kapitel</h2>\n<p>Ende</p>\n"
+    )
+    expected, toc_expected = modify_html(cont, css="p {}")
+    fh_out = io.StringIO()
+    toc = modify_html_streaming(io.StringIO(cont), fh_out, css="p {}")
+    assert fh_out.getvalue() == expected
+    assert toc == toc_expected
+    assert len(toc) == 3  # noqa: PLR2004
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+"""
+HTML -> epub.
+
+splits hpmor.html into one xhtml file per part and chapter
+and writes them together with cover, nav and ncx into an epub 3 file
+(faster than calibre ebook-convert, which is now only used for mobi and docx)
+"""
+
+import copy
+import datetime as dt
+import json
+import os
+import uuid
+import zipfile
+from pathlib import Path
+from typing import NamedTuple
+
+from lxml import etree  # pip install lxml
+from step_6 import TocEntry
+
+os.chdir(Path(__file__).parent.parent.parent)
+
+source_file = Path("hpmor.html")
+toc_file = Path("tmp/hpmor-epub-6-toc.json")
+cover_file = Path("tmp/title.jpg")
+target_file = Path("hpmor.epub")
+
+BOOK_PRODUCER = "Torben Menke"
+BOOK_ID = str(uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/entorb/hpmor-de"))
+
+NS_XHTML = "http://www.w3.org/1999/xhtml"
+NS_EPUB = "http://www.idpf.org/2007/ops"
+NS_OPF = "http://www.idpf.org/2007/opf"
+NS_DC = "http://purl.org/dc/elements/1.1/"
+NS_NCX = "http://www.daisy.org/z3986/2005/ncx/"
+NS_CONTAINER = "urn:oasis:names:tc:opendocument:xmlns:container"
+
+
+class Section(NamedTuple):
+    """Part of the book that is written to its own xhtml file."""
+
+    file_name: str
+    title: str
+    level: int
+    elements: list[etree._Element]
+
+
+def _normalize(s: str) -> str:
+    """Collapse whitespace, incl. non-breaking spaces."""
+    return " ".join(s.split())
+
+
+def _text(el: etree._Element) -> str:
+    return _normalize("".join(el.itertext()))
+
+
+def split_html(root: etree._Element, toc: list[TocEntry]) -> list[Section]:
+    """
+    Split html body into sections, starting at each <h1> and <h2>.
+
+    numbered headings take their title and level from the toc of step_6.py
+    the elements before the first heading form the title page
+    """
+    body = root.find("body")
+    assert body is not None
+    toc_iter = iter(toc)
+    title = root.findtext("head/title") or ""
+    sections = [Section("text/title.xhtml", title, 1, [])]
+    for el in body:
+        if el.tag in ("h1", "h2") or (
+            el.tag == "section" and "footnotes" in el.get("class", "")
+        ):
+            if el.tag == "section":
+                level, title = 1, "Fußnoten"
+            elif el.attrib:
+                level, title = int(el.tag[1]), _text(el)
+            else:
+                entry = next(toc_iter)
+                level, title = entry.level, f"{entry.number}. {entry.title}"
+                if _text(el) != _normalize(title):
+                    msg = (
+                        f"heading {_text(el)!r} of {entry.level=} {entry.number=}"
+                        f" does not match the toc {title!r}"
+                    )
+                    raise ValueError(msg)
+            sections.append(
+                Section(f"text/section-{len(sections):03}.xhtml", title, level, [])
+            )
+        sections[-1].elements.append(el)
+    return sections
+
+
+def _link_targets(sections: list[Section]) -> dict[str, str]:
+    """Map element ids to the file containing them."""
+    targets: dict[str, str] = {}
+    for section in sections:
+        for el in section.elements:
+            for sub in el.iter():
+                if isinstance(sub.tag, str) and sub.get("id"):
+                    targets[sub.get("id")] = section.file_name.removeprefix("text/")
+    return targets
+
+
+def _xhtml_doc(
+    title: str, lang: str, css_href: str = "../style.css"
+) -> tuple[etree._Element, etree._Element]:
+    """Create xhtml document, returns root and body."""
+    root = etree.Element(f"{{{NS_XHTML}}}html", nsmap={None: NS_XHTML, "epub": NS_EPUB})
+    root.set("lang", lang)
+    root.set("{http://www.w3.org/XML/1998/namespace}lang", lang)
+    head = etree.SubElement(root, f"{{{NS_XHTML}}}head")
+    etree.SubElement(head, f"{{{NS_XHTML}}}title").text = title
+    etree.SubElement(
+        head,
+        f"{{{NS_XHTML}}}link",
+        rel="stylesheet",
+        type="text/css",
+        href=css_href,
+    )
+    body = etree.SubElement(root, f"{{{NS_XHTML}}}body")
+    body.text = "\n"
+    return root, body
+
+
+def _serialize_xhtml(root: etree._Element) -> bytes:
+    return etree.tostring(
+        root, xml_declaration=True, encoding="utf-8", doctype="<!DOCTYPE html>"
+    )
+
+
+def section_xhtml(section: Section, lang: str, targets: dict[str, str]) -> bytes:
+    """Create xhtml file of section, with links pointing to the split files."""
+    root, body = _xhtml_doc(section.title, lang)
+    for el in section.elements:
+        body.append(copy.deepcopy(el))
+    for el in body.iterdescendants():
+        if not isinstance(el.tag, str):
+            continue
+        el.tag = f"{{{NS_XHTML}}}{el.tag}"
+        href = el.get("href", "")
+        if href.startswith("#") and href[1:] in targets:
+            el.set("href", targets[href[1:]] + href)
+    return _serialize_xhtml(root)
+
+
+def cover_xhtml(lang: str) -> bytes:
+    """Create xhtml file showing the cover image."""
+    root, body = _xhtml_doc("Cover", lang)
+    etree.SubElement(
+        body, f"{{{NS_XHTML}}}img", src="../cover.jpg", alt="Cover", style="width:100%"
+    )
+    return _serialize_xhtml(root)
+
+
+def _nested(sections: list[Section]) -> list[tuple[Section, list[Section]]]:
+    """Group sections of level 2 below the preceding section of level 1."""
+    tree: list[tuple[Section, list[Section]]] = []
+    for section in sections:
+        if section.level > 1 and tree:
+            tree[-1][1].append(section)
+        else:
+            tree.append((section, []))
+    return tree
+
+
+def nav_xhtml(sections: list[Section], lang: str) -> bytes:
+    """Create epub 3 navigation document."""
+    root, body = _xhtml_doc("Inhalt", lang, css_href="style.css")
+    nav = etree.SubElement(body, f"{{{NS_XHTML}}}nav")
+    nav.set(f"{{{NS_EPUB}}}type", "toc")
+    nav.set("id", "toc")
+    etree.SubElement(nav, f"{{{NS_XHTML}}}h1").text = "Inhalt"
+    ol = etree.SubElement(nav, f"{{{NS_XHTML}}}ol")
+    for section, children in _nested(sections):
+        li = etree.SubElement(ol, f"{{{NS_XHTML}}}li")
+        a = etree.SubElement(li, f"{{{NS_XHTML}}}a", href=section.file_name)
+        a.text = section.title
+        if children:
+            ol_sub = etree.SubElement(li, f"{{{NS_XHTML}}}ol")
+            for child in children:
+                li_sub = etree.SubElement(ol_sub, f"{{{NS_XHTML}}}li")
+                a = etree.SubElement(li_sub, f"{{{NS_XHTML}}}a", href=child.file_name)
+                a.text = child.title
+    return _serialize_xhtml(root)
+
+
+def toc_ncx(sections: list[Section], title: str, book_id: str = BOOK_ID) -> bytes:
+    """Create epub 2 table of contents, for older readers."""
+    root = etree.Element(f"{{{NS_NCX}}}ncx", nsmap={None: NS_NCX}, version="2005-1")
+    head = etree.SubElement(root, f"{{{NS_NCX}}}head")
+    etree.SubElement(head, f"{{{NS_NCX}}}meta", name="dtb:uid", content=book_id)
+    doc_title = etree.SubElement(root, f"{{{NS_NCX}}}docTitle")
+    etree.SubElement(doc_title, f"{{{NS_NCX}}}text").text = title
+    nav_map = etree.SubElement(root, f"{{{NS_NCX}}}navMap")
+    play_order = 0
+
+    def _nav_point(parent: etree._Element, section: Section) -> etree._Element:
+        nonlocal play_order
+        play_order += 1
+        nav_point = etree.SubElement(
+            parent,
+            f"{{{NS_NCX}}}navPoint",
+            id=f"nav-{play_order}",
+            playOrder=str(play_order),
+        )
+        nav_label = etree.SubElement(nav_point, f"{{{NS_NCX}}}navLabel")
+        etree.SubElement(nav_label, f"{{{NS_NCX}}}text").text = section.title
+        etree.SubElement(nav_point, f"{{{NS_NCX}}}content", src=section.file_name)
+        return nav_point
+
+    for section, children in _nested(sections):
+        nav_point = _nav_point(nav_map, section)
+        for child in children:
+            _nav_point(nav_point, child)
+    return etree.tostring(root, xml_declaration=True, encoding="utf-8")
+
+
+def content_opf(  # noqa: PLR0913
+    sections: list[Section],
+    title: str,
+    author: str,
+    lang: str,
+    *,
+    has_cover: bool,
+    modified: dt.datetime,
+    book_id: str = BOOK_ID,
+) -> bytes:
+    """Create package document with metadata, manifest and spine."""
+    root = etree.Element(
+        f"{{{NS_OPF}}}package",
+        nsmap={None: NS_OPF, "dc": NS_DC},
+        version="3.0",
+        attrib={"unique-identifier": "book-id"},
+    )
+    metadata = etree.SubElement(root, f"{{{NS_OPF}}}metadata")
+    etree.SubElement(
+        metadata, f"{{{NS_DC}}}identifier", id="book-id"
+    ).text = f"urn:uuid:{book_id}"
+    etree.SubElement(metadata, f"{{{NS_DC}}}title").text = title
+    etree.SubElement(metadata, f"{{{NS_DC}}}creator").text = author
+    etree.SubElement(
+        metadata, f"{{{NS_DC}}}contributor", id="producer"
+    ).text = BOOK_PRODUCER
+    etree.SubElement(
+        metadata, f"{{{NS_OPF}}}meta", refines="#producer", property="role"
+    ).text = "bkp"
+    etree.SubElement(metadata, f"{{{NS_DC}}}language").text = lang
+    etree.SubElement(
+        metadata, f"{{{NS_OPF}}}meta", property="dcterms:modified"
+    ).text = modified.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    manifest = etree.SubElement(root, f"{{{NS_OPF}}}manifest")
+    spine = etree.SubElement(root, f"{{{NS_OPF}}}spine", toc="ncx")
+
+    def _item(item_id: str, href: str, media_type: str, **kwargs: str) -> None:
+        etree.SubElement(
+            manifest,
+            f"{{{NS_OPF}}}item",
+            id=item_id,
+            href=href,
+            attrib={"media-type": media_type, **kwargs},
+        )
+
+    _item("nav", "nav.xhtml", "application/xhtml+xml", properties="nav")
+    _item("ncx", "toc.ncx", "application/x-dtbncx+xml")
+    _item("css", "style.css", "text/css")
+    if has_cover:
+        etree.SubElement(
+            metadata, f"{{{NS_OPF}}}meta", name="cover", content="cover-image"
+        )
+        _item("cover-image", "cover.jpg", "image/jpeg", properties="cover-image")
+        _item("cover", "text/cover.xhtml", "application/xhtml+xml")
+        etree.SubElement(spine, f"{{{NS_OPF}}}itemref", idref="cover")
+    for i, section in enumerate(sections):
+        _item(f"s{i:03}", section.file_name, "application/xhtml+xml")
+        etree.SubElement(spine, f"{{{NS_OPF}}}itemref", idref=f"s{i:03}")
+    return etree.tostring(root, xml_declaration=True, encoding="utf-8")
+
+
+def container_xml() -> bytes:
+    """Create META-INF/container.xml pointing to the package document."""
+    root = etree.Element(
+        f"{{{NS_CONTAINER}}}container", nsmap={None: NS_CONTAINER}, version="1.0"
+    )
+    rootfiles = etree.SubElement(root, f"{{{NS_CONTAINER}}}rootfiles")
+    etree.SubElement(
+        rootfiles,
+        f"{{{NS_CONTAINER}}}rootfile",
+        attrib={
+            "full-path": "OEBPS/content.opf",
+            "media-type": "application/oebps-package+xml",
+        },
+    )
+    return etree.tostring(root, xml_declaration=True, encoding="utf-8")
+
+
+def html2epub(
+    root: etree._Element,
+    toc: list[TocEntry],
+    cover: bytes | None,
+    target: Path,
+    book_id: str = BOOK_ID,
+) -> None:
+    """
+    Convert html tree to epub file.
+
+    book_id: unique id of the book, different for each volume
+    """
+    title = root.findtext("head/title") or ""
+    author = root.xpath("string(head/meta[@name='author']/@content)")
+    lang = root.get("lang") or "de"
+    css = "\n".join(style.text or "" for style in root.iterfind("head/style"))
+    sections = split_html(root, toc)
+    targets = _link_targets(sections)
+
+    files: dict[str, bytes] = {
+        "META-INF/container.xml": container_xml(),
+        "OEBPS/content.opf": content_opf(
+            sections,
+            title,
+            author,
+            lang,
+            has_cover=cover is not None,
+            modified=dt.datetime.now(dt.UTC),
+            book_id=book_id,
+        ),
+        "OEBPS/toc.ncx": toc_ncx(sections, title, book_id),
+        "OEBPS/nav.xhtml": nav_xhtml(sections, lang),
+        "OEBPS/style.css": css.encode("utf-8"),
+    }
+    if cover is not None:
+        files["OEBPS/cover.jpg"] = cover
+        files["OEBPS/text/cover.xhtml"] = cover_xhtml(lang)
+    for section in sections:
+        files[f"OEBPS/{section.file_name}"] = section_xhtml(section, lang, targets)
+
+    with zipfile.ZipFile(target, mode="w") as zf:
+        # mimetype must be the first file and uncompressed
+        zf.writestr(
+            zipfile.ZipInfo("mimetype"),
+            "application/epub+zip",
+            compress_type=zipfile.ZIP_STORED,
+        )
+        for name, data in files.items():
+            zf.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
+
+
+if __name__ == "__main__":
+    print("=== 7. HTML -> epub ===")
+
+    root = etree.parse(source_file, etree.HTMLParser(encoding="utf-8")).getroot()
+    with toc_file.open(encoding="utf-8") as fh_in:
+        toc = [TocEntry(**e) for e in json.load(fh_in)]
+    cover = cover_file.read_bytes() if cover_file.is_file() else None
+    if cover is None:
+        print(f"WARN: {cover_file} not found, epub without cover")
+    html2epub(root, toc, cover, target_file)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+"""
+Export epub -> mobi, docx, fb2 in parallel.
+
+all conversions only read hpmor.epub, so they run concurrently
+formats whose input has not changed since their last successful build are skipped
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+os.chdir(Path(__file__).parent.parent.parent)
+
+source_file = Path("hpmor.epub")
+state_file = Path("tmp/hpmor-epub-7-export.json")
+
+# target file -> command
+EXPORTS = {
+    # note: fonts are not included for some strange reason, so not using special
+    #  fonts for headlines, writtenNotes and McGonagallWhiteBoard any more in html.css
+    "hpmor.mobi": ["ebook-convert", str(source_file), "hpmor.mobi"],
+    "hpmor.docx": ["ebook-convert", str(source_file), "hpmor.docx"],
+    # ebook-convert does not support fb2
+    "hpmor.fb2": ["pandoc", "--standalone", str(source_file), "-o", "hpmor.fb2"],
+}
+
+
+class ExportResult(NamedTuple):
+    """Result of one format conversion."""
+
+    target: str
+    status: str  # ok, failed, skipped
+    returncode: int
+    seconds: float
+    stderr: str = ""
+
+
+def epub_hash(p: Path) -> str:
+    """
+    Hash the contents of an epub file.
+
+    the zip metadata and the modification timestamp in the opf are ignored,
+    as they change on each build, even for the same content
+    """
+    h = hashlib.sha256()
+    with zipfile.ZipFile(p) as zf:
+        for info in sorted(zf.infolist(), key=lambda i: i.filename):
+            data = zf.read(info)
+            if info.filename.endswith(".opf"):
+                data = re.sub(
+                    rb'<meta property="dcterms:modified">[^<]*</meta>', b"", data
+                )
+            h.update(info.filename.encode())
+            h.update(data)
+    return h.hexdigest()
+
+
+def _run(target: str, cmd: list[str]) -> ExportResult:
+    time_start = time.time()
+    try:
+        process = subprocess.run(  # noqa: S603
+            cmd, check=False, capture_output=True, text=True
+        )
+        returncode, stderr = process.returncode, process.stderr
+    except FileNotFoundError as e:
+        returncode, stderr = 127, str(e)
+    status = "ok" if returncode == 0 else "failed"
+    return ExportResult(target, status, returncode, time.time() - time_start, stderr)
+
+
+def export_formats(
+    source: Path,
+    exports: dict[str, list[str]],
+    state: Path,
+    workers: int,
+    *,
+    force: bool = False,
+) -> list[ExportResult]:
+    """
+    Run the export commands concurrently, using a pool of workers.
+
+    the hash of the source file of each successful export is stored in state
+    returns the results in the order of exports
+    """
+    source_hash = epub_hash(source)
+    hashes: dict[str, str] = (
+        json.loads(state.read_text(encoding="utf-8")) if state.is_file() else {}
+    )
+    results: dict[str, ExportResult] = {}
+    todo: dict[str, list[str]] = {}
+    for target, cmd in exports.items():
+        if not force and hashes.get(target) == source_hash and Path(target).is_file():
+            results[target] = ExportResult(target, "skipped", 0, 0.0)
+        else:
+            todo[target] = cmd
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for result in executor.map(_run, todo.keys(), todo.values()):
+            results[result.target] = result
+            if result.status == "ok":
+                hashes[result.target] = source_hash
+            else:
+                hashes.pop(result.target, None)
+
+    state.parent.mkdir(exist_ok=True)
+    state.write_text(json.dumps(hashes, indent=1), encoding="utf-8")
+    return [results[target] for target in exports]
+
+
+if __name__ == "__main__":
+    print("=== 7. epub -> mobi, docx, fb2 ===")
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(len(EXPORTS), os.cpu_count() or 1),
+        help="number of conversions to run in parallel",
+    )
+    arg_parser.add_argument(
+        "--force", action="store_true", help="convert even if epub is unchanged"
+    )
+    args = arg_parser.parse_args()
+
+    results = export_formats(
+        source_file, EXPORTS, state_file, args.workers, force=args.force
+    )
+    for r in results:
+        print(f"{r.target:12} {r.status:8} {r.seconds:6.1f}s  exit code {r.returncode}")
+        if r.status == "failed":
+            print(r.stderr)
+    if any(r.status == "failed" for r in results):
+        raise SystemExit(1)
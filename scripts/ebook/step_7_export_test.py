@@ -0,0 +1,58 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+import sys
+import zipfile
+from pathlib import Path
+
+from step_7_export import epub_hash, export_formats
+
+
+def _write_epub(p: Path, text: str, modified: str) -> None:
+    with zipfile.ZipFile(p, mode="w") as zf:
+        zf.writestr("mimetype", "application/epub+zip")
+        zf.writestr(
+            "OEBPS/content.opf",
+            f'<meta property="dcterms:modified">{modified}</meta>',
+        )
+        zf.writestr("OEBPS/text/a.xhtml", text)
+
+
+def test_epub_hash(tmp_path: Path) -> None:
+    _write_epub(tmp_path / "1.epub", "a", "2025-01-01T00:00:00Z")
+    _write_epub(tmp_path / "2.epub", "a", "2025-12-31T00:00:00Z")
+    _write_epub(tmp_path / "3.epub", "b", "2025-01-01T00:00:00Z")
+    assert epub_hash(tmp_path / "1.epub") == epub_hash(tmp_path / "2.epub")
+    assert epub_hash(tmp_path / "1.epub") != epub_hash(tmp_path / "3.epub")
+
+
+def test_export_formats(tmp_path: Path) -> None:
+    source = tmp_path / "in.epub"
+    state = tmp_path / "state.json"
+    _write_epub(source, "a", "2025-01-01T00:00:00Z")
+    targets = [str(tmp_path / f"out.{ext}") for ext in ("a", "b")]
+    exports = {
+        targets[0]: [sys.executable, "-c", f"open({targets[0]!r}, 'w')"],
+        targets[1]: [sys.executable, "-c", "raise SystemExit(3)"],
+    }
+    results = export_formats(source, exports, state, workers=2)
+    assert [(r.status, r.returncode) for r in results] == [("ok", 0), ("failed", 3)]
+
+    # unchanged input: successful format is skipped, failed one is retried
+    results = export_formats(source, exports, state, workers=2)
+    assert [r.status for r in results] == ["skipped", "failed"]
+    results = export_formats(source, exports, state, workers=2, force=True)
+    assert [r.status for r in results] == ["ok", "failed"]
+
+    # changed input
+    _write_epub(source, "b", "2025-01-01T00:00:00Z")
+    results = export_formats(source, exports, state, workers=2)
+    assert [r.status for r in results] == ["ok", "failed"]
+
+    exports[targets[1]] = ["command-that-does-not-exist"]
+    results = export_formats(source, exports, state, workers=1)
+    assert [(r.status, r.returncode) for r in results] == [
+        ("skipped", 0),
+        ("failed", 127),
+    ]
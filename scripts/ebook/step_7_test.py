@@ -0,0 +1,85 @@
+# ruff: noqa: INP001, D103
+# cspell:disable
+
+"""Unit Tests."""
+
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from lxml import etree
+from step_6 import TocEntry
+from step_7 import html2epub, split_html
+
+HTML = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<title>Buch</title>
+<meta name="author" content="Autor">
+<style>p { margin: 0; }</style>
+</head>
+<body>
+<header><h1 class="title">Buch</h1></header>
+<p>Vorne</p>
+<h1 class="unnumbered">Vorwort</h1>
+<p>Text</p>
+<h1>1. Teil</h1>
+<h2>1. Kapitel</h2>
+<p>Eins<a href="#fn1" id="fnref1"><sup>1</sup></a><br>x</p>
+<h2>2. Kapitel</h2>
+<p>Zwei</p>
+<section id="footnotes" class="footnotes">
+<ol><li id="fn1"><p>Fußnote<a href="#fnref1">↩</a></p></li></ol>
+</section>
+</body>
+</html>
+"""
+TOC = [TocEntry(1, 1, "Teil"), TocEntry(2, 1, "Kapitel"), TocEntry(2, 2, "Kapitel")]
+
+
+def _root() -> etree._Element:
+    return etree.parse(io.StringIO(HTML), etree.HTMLParser()).getroot()
+
+
+def test_split_html() -> None:
+    sections = split_html(_root(), TOC)
+    assert [(s.title, s.level, len(s.elements)) for s in sections] == [
+        ("Buch", 1, 2),
+        ("Vorwort", 1, 2),
+        ("1. Teil", 1, 1),
+        ("1. Kapitel", 2, 2),
+        ("2. Kapitel", 2, 2),
+        ("Fußnoten", 1, 1),
+    ]
+
+
+def test_split_html_whitespace() -> None:
+    toc = [*TOC[:2], TocEntry(2, 2, "Kapitel\u00a0 ")]
+    assert split_html(_root(), toc)[4].title == "2. Kapitel\u00a0 "
+
+
+def test_split_html_mismatch() -> None:
+    toc = [*TOC[:2], TocEntry(2, 2, "Anders")]
+    with pytest.raises(ValueError, match=r"entry.number=2 does not match"):
+        split_html(_root(), toc)
+
+
+def test_html2epub(tmp_path: Path) -> None:
+    target = tmp_path / "test.epub"
+    html2epub(_root(), TOC, cover=b"jpg", target=target)
+    with zipfile.ZipFile(target) as zf:
+        first = zf.infolist()[0]
+        assert first.filename == "mimetype"
+        assert first.compress_type == zipfile.ZIP_STORED
+        assert zf.read("mimetype") == b"application/epub+zip"
+        assert zf.read("OEBPS/cover.jpg") == b"jpg"
+        # all xml files are well-formed
+        for name in zf.namelist():
+            if name.endswith((".xhtml", ".opf", ".ncx", ".xml")):
+                etree.fromstring(zf.read(name))
+        chapter = zf.read("OEBPS/text/section-003.xhtml").decode()
+        assert '<a href="section-005.xhtml#fn1" id="fnref1">' in chapter
+        assert "<br/>" in chapter
+        nav = zf.read("OEBPS/nav.xhtml").decode()
+        assert '<a href="text/section-002.xhtml">1. Teil</a><ol><li>' in nav
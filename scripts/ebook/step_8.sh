@@ -14,4 +14,5 @@ wget --quiet https://github.com/entorb/hpmor-de/releases/latest/download/hpmor.h
 # WorkInProgress https://github.com/entorb/hpmor-de/releases/download/WorkInProgress/hpmor.html
 
 echo ==== 8.2 diff ====
-diff -U 0 -s hpmor-prev.html $source_file >$target_file
+# diff -U 0 -s hpmor-prev.html $source_file >$target_file
+python3 scripts/ebook/html_diff.py hpmor-prev.html $source_file >$target_file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+
+r"""
+Find leftover LaTeX commands in converted files.
+
+counts the \commands per name and keeps the first location of each,
+files are read line by line, so memory does not grow with the file size
+used by both ebook pipelines, can be called for files as well
+fail_fast: exit at the first leftover, for verifying a conversion
+otherwise: full report, like of the files given as parameters
+python3 scripts/ebook/tex_leftovers.py hpmor.html
+"""
+
+import re
+import sys
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+RE_COMMAND = re.compile(r"\\[a-zA-Z0-9]+")
+
+
+class Location(NamedTuple):
+    """File and line of a leftover command."""
+
+    source: str
+    line: int
+
+
+class LeftoverScanner:
+    """Count leftover LaTeX commands in text."""
+
+    def __init__(  # noqa: D107
+        self, pattern: re.Pattern[str] = RE_COMMAND, *, fail_fast: bool = False
+    ) -> None:
+        self.pattern = pattern
+        self.fail_fast = fail_fast
+        self.counts: Counter[str] = Counter()
+        self.first: dict[str, Location] = {}
+
+    def scan(self, text: str, source: str, first_line: int = 1) -> int:
+        """Scan text, return number of leftovers found in it."""
+        found = 0
+        line, pos = first_line, 0
+        for m in self.pattern.finditer(text):
+            command = m.group(0)
+            self.counts[command] += 1
+            found += 1
+            if command not in self.first:
+                line += text.count("\n", pos, m.start())
+                pos = m.start()
+                self.first[command] = Location(source, line)
+            if self.fail_fast:
+                self.check()
+        return found
+
+    def scan_lines(self, lines: Iterable[str], source: str) -> int:
+        """Scan text line by line, return number of leftovers found in it."""
+        return sum(
+            self.scan(line, source, line_no) for line_no, line in enumerate(lines, 1)
+        )
+
+    def scan_file(self, p: Path) -> int:
+        """Scan file line by line, return number of leftovers found in it."""
+        with p.open(encoding="utf-8", newline="\n") as fh:
+            return self.scan_lines(fh, str(p))
+
+    def summary(self) -> str:
+        """Leftovers as table: count, command, first location."""
+        return "\n".join(
+            f"{count}\t{command}\t{self.first[command].source}:"
+            f"{self.first[command].line}"
+            for command, count in self.counts.most_common()
+        )
+
+    def check(self) -> None:
+        """Exit with summary, if any leftovers were found, full report at the end."""
+        if self.counts:
+            print(self.summary())
+            print(
+                f"Error: {self.counts.total()} unhandled LaTeX commands "
+                f"({len(self.counts)} distinct) found, see above"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    scanner = LeftoverScanner()
+    for file_name in sys.argv[1:]:
+        scanner.scan_file(Path(file_name))
+    scanner.check()
@@ -0,0 +1,51 @@
+# ruff: noqa: INP001, D103
+
+"""Unit Tests."""
+
+from pathlib import Path
+
+import pytest
+from tex_leftovers import LeftoverScanner, Location
+
+
+def test_scan() -> None:
+    scanner = LeftoverScanner()
+    assert scanner.scan("a\n\\foo b \\bar\n\\foo\n\\baz", "x.html", 10) == 4  # noqa: PLR2004
+    assert scanner.scan("no commands", "y.html") == 0
+    assert scanner.scan("\\bar \\qux1", "y.html") == 2  # noqa: PLR2004
+    assert scanner.counts == {"\\foo": 2, "\\bar": 2, "\\baz": 1, "\\qux1": 1}
+    assert scanner.first == {
+        "\\foo": Location("x.html", 11),
+        "\\bar": Location("x.html", 11),
+        "\\baz": Location("x.html", 13),
+        "\\qux1": Location("y.html", 1),
+    }
+    assert scanner.summary().splitlines()[0] == "2\t\\foo\tx.html:11"
+
+
+def test_scan_file(tmp_path: Path) -> None:
+    p = tmp_path / "a.html"
+    p.write_text("<p>a</p>\n<p>\\emph{b}</p>\n<p>\\emph{c}</p>\n", encoding="utf-8")
+    scanner = LeftoverScanner()
+    assert scanner.scan_file(p) == 2  # noqa: PLR2004
+    assert scanner.first["\\emph"] == Location(str(p), 2)
+
+
+def test_check(capsys: pytest.CaptureFixture[str]) -> None:
+    scanner = LeftoverScanner()
+    scanner.scan("ok", "a")
+    scanner.check()
+    scanner.scan("\\foo", "a")
+    with pytest.raises(SystemExit):
+        scanner.check()
+    assert "1 unhandled LaTeX commands (1 distinct)" in capsys.readouterr().out
+
+
+def test_fail_fast(capsys: pytest.CaptureFixture[str]) -> None:
+    scanner = LeftoverScanner(fail_fast=True)
+    scanner.scan("ok", "a")
+    with pytest.raises(SystemExit):
+        scanner.scan_lines(["x", "\\foo \\bar", "\\baz"], "a")
+    # stopped at the first leftover
+    assert scanner.first == {"\\foo": Location("a", 2)}
+    assert "1\t\\foo\ta:2" in capsys.readouterr().out
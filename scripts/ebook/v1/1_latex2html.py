@@ -1,22 +1,31 @@
 #!/usr/bin/env python3
 # by Torben Menke https://entorb.net
-# ruff: noqa: E501, D103, N806, N816, C901, PLR0915, RUF001, RUF003, PTH103, PTH122, PTH123, PTH207, DTZ011, E741, PERF401, PLW0603
+# ruff: noqa: E501, D103, N816, PLR0915, RUF001, RUF003, PTH103, PTH113, PTH123, DTZ011
 """
 Converter script.
 
-reads latex code in ../chapters
+reads the chapters of hpmor.tex via the document model of book.py
 converts to html
 as preparation for conversion into epub format
-output dir: output/
+output dir: tmp/v1/
 
-run from within ebook dir via
-python3 1_latex2html.py
+python3 scripts/ebook/v1/1_latex2html.py
 """
 
-import glob
+import hashlib
+import json
 import os
 import re
+import sys
 from datetime import date
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from book import read_book
+from tex_leftovers import LeftoverScanner
+
+os.chdir(Path(__file__).parents[3])
 
 # Notes
 # footnotes are converted to inline text
@@ -27,9 +36,8 @@
 
 today = date.today()
 
-dir_tex_source = "../chapters/"
-dir_tmp = "tmp"
-dir_out = "output"
+dir_tmp = "tmp/v1/chapters"
+dir_out = "tmp/v1"
 for my_dir in (dir_tmp, dir_out):
     os.makedirs(my_dir, exist_ok=True)
 
@@ -136,7 +144,6 @@
 html_end = """</body>\n</html>"""
 
 
-counter_chapter = 0
 # counter_footnotes = 0
 
 
@@ -215,7 +222,7 @@ def simplify_tex(s: str) -> str:
     return s
 
 
-def tex2html(s: str) -> str:
+def tex2html(s: str, chapter_number: int | None = None) -> str:
     #
     # Bulk text replacements
     #
@@ -233,23 +240,12 @@ def tex2html(s: str) -> str:
     # paper notes in Chapter 13
     if "Asking the Wrong Questions" in s:
         # \begin{align*} -> writtenNote
-        myMatches = re.finditer(
+        s = re.sub(
             r"\\begin\{align\*\}.+?\\end\{align\*\}",
+            lambda m: convert_align(m.group(0)),
             s,
             flags=re.DOTALL | re.IGNORECASE,
         )
-        for myMatch in myMatches:
-            was = myMatch.group(0)
-            womit = was
-            womit = womit.replace("align*", "writtenNote")
-            womit = re.sub(r"\\hbox\{(.*?)\}", r"\1", womit)
-            womit = re.sub(r"\\intertext\{(.*?)\}", r"\1<br/>", womit, flags=re.DOTALL)
-            womit = re.sub(r"\\multicolumn\{2\}\{c\}\{(.*?)\}", r"\1", womit)
-            womit = womit.replace("\\scshape", "")
-            womit = womit.replace("\\centering", "")
-            womit = womit.replace("&", "")
-            womit = womit.replace("[1.5ex]", "")
-            s = s.replace(was, womit)
         s = re.sub(
             r"\\begin\{center\}\s*\\scshape (\\MakeUppercase\{Warning\}.*?)\\end\{center\}",
             r"\\begin{writtenNote}\1\\end{writtenNote}",
@@ -357,27 +353,26 @@ def tex2html(s: str) -> str:
     #
 
     # \chapters
-    myMatches = re.finditer(r"(\\chapter\{([^\}]+)\})", s)
-    for myMatch in myMatches:
-        was = myMatch.group(1)
-        womit = convert_chapter(myMatch.group(2))
-        s = s.replace(was, womit)
-    myMatches = re.finditer(r"(\\partchapter\{(.+?)\}\{(.+?)\})", s)
-    for myMatch in myMatches:
-        was = myMatch.group(1)
-        womit = convert_chapter(myMatch.group(2) + ", Part " + myMatch.group(3))
-        s = s.replace(was, womit)
+    # replacements via callback, in a single scan of s
+    s = re.sub(
+        r"\\chapter\{([^\}]+)\}",
+        lambda m: convert_chapter(m.group(1), chapter_number),
+        s,
+    )
+    s = re.sub(
+        r"\\partchapter\{(.+?)\}\{(.+?)\}",
+        lambda m: convert_chapter(m.group(1) + ", Part " + m.group(2), chapter_number),
+        s,
+    )
     # \namedpartchapter{The Stanford Prison Experiment}{TSPE}{VI}{Constrained Optimization}
-    myMatches = re.finditer(
-        r"(\\namedpartchapter\{([^\}]+)\}\{([^\}]+)\}\{([^\}]+)\}\{([^\}]+)\})",
+    s = re.sub(
+        r"\\namedpartchapter\{([^\}]+)\}\{([^\}]+)\}\{([^\}]+)\}\{([^\}]+)\}",
+        lambda m: convert_chapter(
+            m.group(1) + ", Part " + m.group(3) + ": " + m.group(4),
+            chapter_number,
+        ),
         s,
     )
-    for myMatch in myMatches:
-        was = myMatch.group(1)
-        womit = convert_chapter(
-            myMatch.group(2) + ", Part " + myMatch.group(4) + ": " + myMatch.group(5),
-        )
-        s = s.replace(was, womit)
 
     # simple commands without parameters
     # \am and pm
@@ -586,11 +581,7 @@ def tex2html(s: str) -> str:
     s = re.sub(r"\s*\\item(.+?)\n", r"<li>\1</li>\n", s)
 
     # \parsel
-    myMatches = re.finditer(r"(\\parsel\{([^\}\\]+)\})", s)
-    for myMatch in myMatches:
-        was = myMatch.group(1)
-        womit = convert_parsel(myMatch.group(2))
-        s = s.replace(was, womit)
+    s = re.sub(r"\\parsel\{([^\}\\]+)\}", lambda m: convert_parsel(m.group(1)), s)
 
     # \later
     s = re.sub(
@@ -600,29 +591,14 @@ def tex2html(s: str) -> str:
         flags=re.DOTALL | re.IGNORECASE,
     )
 
-    # footnotes_authorsnotetext
-    myMatches = re.finditer(
-        r"(\\authorsnotetext\{([^\}\\]+?)\})",
-        s,
-        flags=re.DOTALL | re.IGNORECASE,
-    )
-    for myMatch in myMatches:
-        was = myMatch.group(1)
-        womit = f" [Author's Note: <i>{myMatch.group(2).strip()}</i>] "
-        # womit = convert_footnotes(myMatch.group(2), authorsnote=True)
-        s = s.replace(was, womit)
-
-    # footnotetext
-    myMatches = re.finditer(
-        r"(\\footnotetext\{([^\}\\]+?)\})",
+    # footnotes_authorsnotetext and footnotetext
+    # womit = convert_footnotes(m.group(2), authorsnote=m.group(1) == "authorsnotetext")
+    s = re.sub(
+        r"\\(authorsnotetext|footnotetext)\{([^\}\\]+?)\}",
+        lambda m: f" [Author's Note: <i>{m.group(2).strip()}</i>] ",
         s,
         flags=re.DOTALL | re.IGNORECASE,
     )
-    for myMatch in myMatches:
-        was = myMatch.group(1)
-        womit = f" [Author's Note: <i>{myMatch.group(2).strip()}</i>] "
-        # womit = convert_footnotes(myMatch.group(2), authorsnote=False)
-        s = s.replace(was, womit)
 
     # leftovers
     s = re.sub(r"\{\s*\}", r"", s, flags=re.DOTALL)
@@ -649,11 +625,23 @@ def tex2html(s: str) -> str:
     return s
 
 
-def convert_chapter(s: str) -> str:
-    global counter_chapter
-    counter_chapter += 1
+def convert_align(s: str) -> str:
+    s = s.replace("align*", "writtenNote")
+    s = re.sub(r"\\hbox\{(.*?)\}", r"\1", s)
+    s = re.sub(r"\\intertext\{(.*?)\}", r"\1<br/>", s, flags=re.DOTALL)
+    s = re.sub(r"\\multicolumn\{2\}\{c\}\{(.*?)\}", r"\1", s)
+    s = s.replace("\\scshape", "")
+    s = s.replace("\\centering", "")
+    s = s.replace("&", "")
+    s = s.replace("[1.5ex]", "")
+    return s
+
+
+def convert_chapter(s: str, chapter_number: int | None) -> str:
     # chapter class is used in calibre to detect chapters
-    out = f'<h2 class="chapter">{counter_chapter}. {s}</h2>'
+    if chapter_number is not None:
+        s = f"{chapter_number}. {s}"
+    out = f'<h2 class="chapter">{s}</h2>'
     return out
 
 
@@ -692,99 +680,90 @@ def convert_parsel(s: str) -> str:
 #     return out
 
 
-def find_tex_commands(s: str) -> list:
-    l = []
-
-    myMatches = re.findall(r"\\[a-zA-Z0-9]+", s)
-    for myMatch in myMatches:
-        l.append(str(myMatch))
+def latex2html_chapter(body: str, chapter_number: int | None) -> str:
+    """
+    Convert the LaTeX body of a chapter file to html.
 
-    return l
+    pure function, so it can run in a process pool
+    """
+    cont = simplify_tex(body)
+    cont = tex2html(cont, chapter_number)
+    return cont
 
 
-fhAll = open(  # noqa: SIM115
-    f"{dir_out}/hpmor.html",
-    mode="w",
-    encoding="utf-8",
-    newline="\n",
-)
-fhAll.write(html_start)
-fhAll.write(html_preamble)
+def chapter_cache_key(
+    chapter_digest: str, chapter_number: int | None, converter_digest: str
+) -> str:
+    """Hash of chapter source, chapter number and this converter script."""
+    h = hashlib.sha256(converter_digest.encode())
+    h.update(f"{chapter_number}:{chapter_digest}".encode())
+    return h.hexdigest()
 
 
-l_tex_commands_unhandled = []
-
-for fileIn in sorted(glob.glob(f"{dir_tex_source}/hpmor-chapter-*.tex")):
-    # for fileIn in sorted(glob.glob(f"../chapters/hpmor-chapter-100.tex")):
-    (filePath, fileName) = os.path.split(fileIn)
-    (fileBaseName, fileExtension) = os.path.splitext(fileName)
-    fileOut = f"{dir_tmp}/{fileBaseName}.html"
-    with open(fileIn, encoding="utf-8", newline="\n") as fh:
+def read_cached_chapter(file_name: str, key: str, cache: dict) -> str | None:
+    """Return html of the tmp file of a chapter, if its cache key matches."""
+    if cache.get(file_name) != key or not os.path.isfile(file_name):
+        return None
+    with open(file_name, encoding="utf-8") as fh:
         cont = fh.read()
-    cont = simplify_tex(cont)
-    cont = tex2html(cont)
-
-    l = find_tex_commands(cont)
-    l_tex_commands_unhandled.extend(l)
-    if len(l) > 0:
-        print(
-            f"WARN: there are leftover LaTeX commands in file {fileOut}:\n"
-            + ", ".join(l),
-        )
-
-    with open(fileOut, mode="w", encoding="utf-8", newline="\n") as fh:
-        fh.write(html_start + cont + html_end)
-
-    if fileBaseName == "hpmor-chapter-001":
-        cont = (
-            "<h1 class='part'>Book 1: <br/>Harry James Potter-Evans-Verres<br/> and the Methods of Rationality</h1>\n"
-            + cont
-        )
-    elif fileBaseName == "hpmor-chapter-022":
-        cont = (
-            "<h1 class='part'>Book 2: <br/>Harry James Potter-Evans-Verres<br/> and the Professor's Games</h1>\n"
-            + cont
-        )
-    elif fileBaseName == "hpmor-chapter-038":
-        cont = (
-            "<h1 class='part'>Book 3: <br/>Harry James Potter-Evans-Verres<br/> and the Shadows of Death</h1>\n"
-            + cont
-        )
-    elif fileBaseName == "hpmor-chapter-065":
-        cont = (
-            "<h1 class='part'>Book 4: <br/>Hermione Jean Granger<br/> and the Phoenix's Call</h1>\n"
-            + cont
-        )
-    elif fileBaseName == "hpmor-chapter-086":
-        cont = (
-            "<h1 class='part'>Book 5: <br/>Harry James Potter-Evans-Verres<br/> and the Last Enemy</h1>\n"
-            + cont
-        )
-    elif fileBaseName == "hpmor-chapter-100":
-        cont = (
-            "<h1 class='part'>Book 6: <br/>Harry James Potter-Evans-Verres<br/> and the Philosopher's Stone</h1>\n"
-            + cont
-        )
-
-    fhAll.write(cont)
-
-fhAll.write(html_end)
-fhAll.close()
-
-d_tex_commands_unhandled = {}
-for item in l_tex_commands_unhandled:
-    if item in d_tex_commands_unhandled:
-        d_tex_commands_unhandled[item] += 1
-    else:
-        d_tex_commands_unhandled[item] = 1
-# sort values reversed
-for key, value in sorted(
-    d_tex_commands_unhandled.items(),
-    key=lambda item: item[1],
-    reverse=True,
-):
-    print(f"{value}\t{key}")
-
-assert len(d_tex_commands_unhandled) == 0, (
-    "Error: unhandled LaTeX commands found, see above"
-)
+    return cont[len(html_start) : -len(html_end)]
+
+
+if __name__ == "__main__":
+    file_cache = f"{dir_tmp}/cache.json"
+    cache = {}
+    if os.path.isfile(file_cache):
+        with open(file_cache, encoding="utf-8") as fh:
+            cache = json.load(fh)
+    with open(__file__, "rb") as fh:
+        converter_digest = hashlib.sha256(fh.read()).hexdigest()
+
+    book = read_book()
+    chapters = list(book.chapters)
+    keys = [chapter_cache_key(c.digest, c.number, converter_digest) for c in chapters]
+    file_names = [f"{dir_tmp}/{c.name}.html" for c in chapters]
+    results = {}
+    for i in range(len(chapters)):
+        cont = read_cached_chapter(file_names[i], keys[i], cache)
+        if cont is not None:
+            results[i] = cont
+
+    # convert changed chapters in parallel
+    todo = [i for i in range(len(chapters)) if i not in results]
+    print(f"converting {len(todo)} of {len(chapters)} chapters")
+    if todo:
+        num_processes = min(cpu_count(), len(todo))
+        with Pool(processes=num_processes) as pool:
+            converted = pool.starmap(
+                latex2html_chapter,
+                [(chapters[i].body, chapters[i].number) for i in todo],
+            )
+        for i, result in zip(todo, converted, strict=True):
+            results[i] = result
+            with open(file_names[i], mode="w", encoding="utf-8", newline="\n") as fh:
+                fh.write(html_start + result + html_end)
+            cache[file_names[i]] = keys[i]
+        with open(file_cache, mode="w", encoding="utf-8", newline="\n") as fh:
+            json.dump(cache, fh, indent=1)
+
+    # write in chapter order
+    # leftover LaTeX commands are checked per chapter, with line in its tmp file
+    # the conversion fails at the first one
+    scanner = LeftoverScanner(fail_fast=True)
+    first_line = html_start.count("\n") + 1
+    i = 0
+    with open(
+        f"{dir_out}/hpmor.html", mode="w", encoding="utf-8", newline="\n"
+    ) as fhAll:
+        fhAll.write(html_start)
+        fhAll.write(html_preamble)
+        for part in book.parts:
+            if part.number > 0:
+                fhAll.write(
+                    f"<h1 class='part'>Buch {part.number}: <br/>{part.title}</h1>\n"
+                )
+            for _chapter in part.chapters:
+                scanner.scan(results[i], file_names[i], first_line)
+                fhAll.write(results[i])
+                i += 1
+        fhAll.write(html_end)
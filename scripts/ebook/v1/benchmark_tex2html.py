@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# by Torben Menke https://entorb.net
+"""
+Benchmark of the chapter conversion of 1_latex2html.py.
+
+converts the largest chapter, repeated 1, 4, 16, 64 times
+optionally pass a chapter number to use instead
+the time per size should stay constant (linear scaling),
+a growing value indicates quadratic behavior
+
+run from hpmor root dir via
+python3 scripts/ebook/v1/benchmark_tex2html.py
+"""
+
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+spec = importlib.util.spec_from_file_location(
+    "latex2html", Path(__file__).parent / "1_latex2html.py"
+)
+assert spec is not None
+assert spec.loader is not None
+latex2html = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(latex2html)  # this changes dir to hpmor root
+
+REPEATS = (1, 4, 16, 64)
+
+
+def benchmark(body: str, repeats: tuple[int, ...] = REPEATS) -> list[float]:
+    """Return seconds per MB of source for each repetition of body."""
+    results: list[float] = []
+    for n in repeats:
+        s = "\n\n".join([body] * n)
+        time_start = time.perf_counter()
+        latex2html.latex2html_chapter(s, 1)
+        seconds = time.perf_counter() - time_start
+        mb = len(s.encode()) / 1e6
+        results.append(seconds / mb)
+        print(f"{n}x {mb:5.2f} MB {seconds:6.3f}s {seconds / mb:6.3f}s/MB")
+    return results
+
+
+if __name__ == "__main__":
+    chapters = list(latex2html.read_book().chapters)
+    if len(sys.argv) > 1:
+        # optionally: chapter number as parameter
+        chapter = next(c for c in chapters if c.number == int(sys.argv[1]))
+    else:
+        chapter = max(chapters, key=lambda c: c.path.stat().st_size)
+    print(f"chapter: {chapter.path}")
+    results = benchmark(chapter.body)
+    # allow some noise, but not quadratic growth
+    # the first run is ignored, as it includes the compilation of the regexes
+    if results[-1] > 2 * results[1]:
+        print("ERROR: conversion time does not scale linearly")
+        sys.exit(1)
@@ -8,5 +8,6 @@ sudo apt-get install texlive-extra-utils pandoc calibre imagemagick ghostscript
 # pandoc calibre : for ebook converting
 # texlive-extra-utils : for latexpand
 # imagemagick ghostscript : for pdf title page to image conversion
+# optional: pip install pypdf : to cache the title page image independent of the rest of the PDF
 
 pip install -r python-requirements.txt
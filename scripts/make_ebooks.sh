@@ -8,11 +8,19 @@ cd $script_dir/..
 # image on last page
 
 sh scripts/ebook/step_1.sh
-sh scripts/ebook/step_2.sh
+
+# volumes: sh scripts/make_ebooks.sh 1 2 ... makes hpmor-1.epub, hpmor-2.epub ...
+if [ $# -gt 0 ]; then
+  python3 scripts/ebook/make_volumes.py "$@"
+  exit
+fi
+
+# step 2 (flatten) is done in memory by step 3
+# sh scripts/ebook/step_2.sh
 python3 scripts/ebook/step_3.py
 python3 scripts/ebook/step_4.py
 sh scripts/ebook/step_5.sh
-python3 scripts/ebook/step_6.py
+python3 scripts/ebook/step_6.py --stream
 sh scripts/ebook/step_7.sh
 echo optionally run scripts/ebook/step_8.sh to compare HTML to latest release
 